@@ -0,0 +1,38 @@
+import time
+import numexpr
+from coed.vars import Variables
+from shallowflow.base.conditions import NumExpr
+
+
+class Context(object):
+    """
+    Minimal flow context, providing the variables.
+    """
+
+    def __init__(self):
+        self.variables = Variables()
+
+
+# compares expanding the variables and evaluating the expression from scratch
+# with evaluating the compiled NumExpr condition
+num_evals = 1000000
+context = Context()
+context.variables.set("i", "0")
+context.variables.set("max", "100")
+expression = "(@{i} < @{max}) & (@{i} >= 0)"
+condition = NumExpr({"expression": expression})
+condition.flow_context = context
+
+start = time.perf_counter()
+for i in range(num_evals):
+    bool(numexpr.evaluate(context.variables.expand(expression)))
+duration_expand = time.perf_counter() - start
+
+start = time.perf_counter()
+for i in range(num_evals):
+    condition.evaluate(None)
+duration_compiled = time.perf_counter() - start
+
+print("%20s %15s %15s" % ("mode", "total sec", "usec/eval"))
+print("%20s %15.3f %15.3f" % ("expand+evaluate", duration_expand, duration_expand / num_evals * 1000000))
+print("%20s %15.3f %15.3f" % ("compiled", duration_compiled, duration_compiled / num_evals * 1000000))
@@ -0,0 +1,49 @@
+import time
+from shallowflow.base.controls import Flow, Sleep, run_flow
+from shallowflow.base.options import snapshot_options
+from shallowflow.base.sinks import Null
+from shallowflow.base.sources import ForLoop
+from shallowflow.base.transformers import IncStorage, IncVariable, SetStorage
+
+# compares reading the options that the actors use when processing a token
+# via the option manager with reading them from the snapshot taken at setup
+num_tokens = 100000
+actors = {
+    "IncStorage": (IncStorage(options={"storage_name": "count"}), ["inc_value", "storage_name"]),
+    "IncVariable": (IncVariable(options={"var_name": "i"}), ["inc_value", "var_name", "is_float"]),
+    "SetStorage": (SetStorage(options={"storage_name": "last"}), ["storage_name"]),
+    "Sleep": (Sleep(options={"seconds": 0.0}), ["seconds"]),
+}
+print("%20s %20s %20s" % ("actor", "get usec/token", "snapshot usec/token"))
+for name in actors:
+    actor, names = actors[name]
+    opts = snapshot_options(actor)
+    start = time.perf_counter()
+    for i in range(num_tokens):
+        for n in names:
+            actor.get(n)
+    duration_get = time.perf_counter() - start
+    start = time.perf_counter()
+    for i in range(num_tokens):
+        for n in names:
+            getattr(opts, n)
+    duration_snapshot = time.perf_counter() - start
+    print("%20s %20.3f %20.3f" % (name, duration_get / num_tokens * 1000000, duration_snapshot / num_tokens * 1000000))
+
+# the overall throughput of a flow using these actors
+flow = Flow().manage([
+    ForLoop(options={"end": num_tokens}),
+    IncStorage(options={"storage_name": "count"}),
+    SetStorage(options={"storage_name": "last"}),
+    IncVariable(options={"var_name": "i"}),
+    Sleep(options={"seconds": 0.0}),
+    Null(),
+])
+start = time.perf_counter()
+msg = run_flow(flow)
+duration = time.perf_counter() - start
+if msg is not None:
+    print(msg)
+print("%20s %20.3f" % ("flow usec/token", duration / num_tokens * 1000000))
+flow.wrap_up()
+flow.clean_up()
@@ -0,0 +1,26 @@
+import time
+from shallowflow.base.controls import Flow, Sequence
+from shallowflow.base.sources import ForLoop
+from shallowflow.base.transformers import PassThrough
+
+# measures the per-token overhead of the director for growing sequences of actors:
+# the time per token and actor should stay (roughly) flat
+print("%10s %10s %15s %20s" % ("actors", "tokens", "msec/token", "usec/token/actor"))
+for num_actors in [10, 100, 1000, 10000]:
+    num_tokens = max(10, 200000 // num_actors)
+    flow = Flow().manage([
+        ForLoop({"start": 1, "end": num_tokens}),
+        Sequence().manage([PassThrough() for _ in range(num_actors)]),
+    ])
+    msg = flow.setup()
+    if msg is not None:
+        print(msg)
+        break
+    start = time.perf_counter()
+    msg = flow.execute()
+    duration = time.perf_counter() - start
+    if msg is not None:
+        print(msg)
+    flow.wrap_up()
+    flow.clean_up()
+    print("%10d %10d %15.3f %20.3f" % (num_actors, num_tokens, duration / num_tokens * 1000, duration / num_tokens / num_actors * 1000000))
@@ -0,0 +1,30 @@
+import time
+from shallowflow.base.controls import Flow, WhileLoop, run_flow
+from shallowflow.base.conditions import NumExpr
+from shallowflow.base.sources import Start, GetVariable
+from shallowflow.base.transformers import SetVariable, IncVariable
+
+# compares the while_loop.py pattern, scaled up, using string-based variables
+# with using typed variables (keeping the counter as integer)
+num_iterations = 1000000
+durations = dict()
+for typed in [False, True]:
+    flow = Flow(options={"typed_variables": typed}).manage([
+        Start(),
+        SetVariable(options={"var_name": "i", "var_value": "1"}),
+        WhileLoop(options={"condition": NumExpr(options={"expression": "@{i} <= %d" % num_iterations})}).manage([
+            GetVariable(options={"var_name": "i"}),
+            IncVariable(options={"var_name": "i"}),
+        ]),
+    ])
+    start = time.perf_counter()
+    msg = run_flow(flow)
+    durations[typed] = time.perf_counter() - start
+    if msg is not None:
+        print(msg)
+    flow.wrap_up()
+    flow.clean_up()
+
+print("%20s %15s %15s" % ("variables", "total sec", "usec/iteration"))
+print("%20s %15.3f %15.3f" % ("string", durations[False], durations[False] / num_iterations * 1000000))
+print("%20s %15.3f %15.3f" % ("typed", durations[True], durations[True] / num_iterations * 1000000))
@@ -119,7 +119,9 @@ class Or(AbstractBooleanCondition):
         result = False
         for cond in conds:
             cond.flow_context = self.flow_context
-            result = result or cond.evaluate(o)
+            if cond.evaluate(o):
+                result = True
+                break
         return result
 
 
@@ -0,0 +1,18 @@
+def evaluate_batch(condition, items, func=None):
+    """
+    Evaluates the condition for each of the items. Uses the condition's own batch
+    evaluation (method evaluate_batch) if available, otherwise evaluates the items one by one.
+
+    :param condition: the condition to evaluate (flow_context must be set)
+    :type condition: AbstractBooleanCondition
+    :param items: the objects to evaluate
+    :type items: list
+    :param func: the callable to use for evaluating a single item instead of the condition's evaluate method, e.g., a compiled condition
+    :return: the list of evaluation results
+    :rtype: list
+    """
+    if hasattr(condition, "evaluate_batch"):
+        return [bool(x) for x in condition.evaluate_batch(items)]
+    if func is None:
+        func = condition.evaluate
+    return [bool(func(x)) for x in items]
@@ -0,0 +1,167 @@
+from ._Basic import AlwaysTrue, AlwaysFalse, Not, And, Or
+from ._NumExpr import NumExpr, compile_expression
+
+
+def _constant(value):
+    """
+    Returns a callable that always returns the specified value.
+
+    :param value: the value to return
+    :type value: bool
+    :return: the callable
+    """
+    if value:
+        return lambda o: True
+    else:
+        return lambda o: False
+
+
+def _is_plain_numexpr(condition):
+    """
+    Returns whether the condition is a NumExpr condition that evaluates a single value.
+
+    :param condition: the condition to check
+    :type condition: AbstractBooleanCondition
+    :return: True if not in array mode
+    :rtype: bool
+    """
+    return (type(condition) is NumExpr) and not condition.get("array_mode")
+
+
+def _short_circuit(funcs, is_and):
+    """
+    Combines the callables using AND or OR with short-circuit semantics.
+
+    :param funcs: the callables to combine
+    :type funcs: list
+    :param is_and: whether to use AND or OR
+    :type is_and: bool
+    :return: the combined callable
+    """
+    if len(funcs) == 1:
+        return funcs[0]
+    if is_and:
+        def _and(o):
+            for f in funcs:
+                if not f(o):
+                    return False
+            return True
+        return _and
+    else:
+        def _or(o):
+            for f in funcs:
+                if f(o):
+                    return True
+            return False
+        return _or
+
+
+def _merge_numexpr(items, is_and, flow_context):
+    """
+    Merges consecutive NumExpr conditions into a single expression, using & or |.
+    Should the merged expression fail (e.g., due to a missing variable in a branch
+    that would have been short-circuited), the conditions get evaluated individually.
+
+    :param items: the list of (callable, condition) tuples
+    :type items: list
+    :param is_and: whether to combine using AND or OR
+    :type is_and: bool
+    :param flow_context: the actor that evaluates the condition
+    :type flow_context: Actor
+    :return: the list of callables
+    :rtype: list
+    """
+    result = []
+    group = []
+    for item in items + [None]:
+        if (item is not None) and _is_plain_numexpr(item[1]):
+            group.append(item)
+            continue
+        if len(group) == 1:
+            result.append(group[0][0])
+        elif len(group) > 1:
+            # comparing against 0 turns numeric results into booleans, avoiding bitwise operations
+            operator = " & " if is_and else " | "
+            expr = operator.join(["((%s) != 0)" % str(x[1].get("expression")) for x in group])
+            merged = NumExpr({"expression": expr})
+            merged.flow_context = flow_context
+            fallback = _short_circuit([x[0] for x in group], is_and)
+
+            def _merged(o, merged=merged, fallback=fallback):
+                try:
+                    return merged.evaluate(o)
+                except Exception:
+                    return fallback(o)
+
+            result.append(_merged)
+        group = []
+        if item is not None:
+            result.append(item[0])
+    return result
+
+
+def _compile(condition, flow_context):
+    """
+    Compiles the condition.
+
+    :param condition: the condition to compile
+    :type condition: AbstractBooleanCondition
+    :param flow_context: the actor that evaluates the condition
+    :type flow_context: Actor
+    :return: the tuple of callable and constant result (None if not constant)
+    :rtype: tuple
+    """
+    cls = type(condition)
+
+    if cls is AlwaysTrue:
+        return _constant(True), True
+
+    if cls is AlwaysFalse:
+        return _constant(False), False
+
+    if cls is Not:
+        func, const = _compile(condition.get("condition"), flow_context)
+        if const is not None:
+            return _constant(not const), not const
+        return (lambda o: not func(o)), None
+
+    if (cls is And) or (cls is Or):
+        is_and = cls is And
+        items = []
+        for sub in condition.get("conditions"):
+            func, const = _compile(sub, flow_context)
+            if const is None:
+                items.append((func, sub))
+            elif const != is_and:
+                # False for AND, True for OR decides the outcome
+                return _constant(const), const
+        if len(items) == 0:
+            return _constant(is_and), is_and
+        return _short_circuit(_merge_numexpr(items, is_and, flow_context), is_and), None
+
+    condition.flow_context = flow_context
+    if _is_plain_numexpr(condition):
+        compiled = compile_expression(str(condition.get("expression")))
+        if compiled.compilable and (len(compiled.names) == 0) and (len(compiled.identifiers) == 0):
+            try:
+                const = bool(compiled.evaluate(None))
+                return _constant(const), const
+            except Exception:
+                pass
+    return condition.evaluate, None
+
+
+def compile_condition(condition, flow_context):
+    """
+    Compiles the (nested) condition into a single callable that takes the current object
+    and returns a bool. And/Or get evaluated with short-circuit semantics, constant
+    sub-conditions get folded and consecutive NumExpr conditions within And/Or get merged
+    into a single expression. All other conditions get evaluated as is.
+
+    :param condition: the condition to compile
+    :type condition: AbstractBooleanCondition
+    :param flow_context: the actor that evaluates the condition
+    :type flow_context: Actor
+    :return: the callable
+    """
+    return _compile(condition, flow_context)[0]
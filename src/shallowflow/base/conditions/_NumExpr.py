@@ -1,9 +1,299 @@
+import re
+import threading
 import numexpr
+import numpy as np
 from coed.config import Option
 from shallowflow.api.condition import AbstractBooleanCondition
+from shallowflow.api.container import AbstractContainer
+from shallowflow.base.variables import ExpandsVariables, compile_template
 
+# the pattern for variable references in expressions
+VARIABLE_PATTERN = re.compile(r"@\{([^}]+)\}")
 
-class NumExpr(AbstractBooleanCondition):
+# the pattern for string literals in expressions
+STRING_PATTERN = re.compile(r"'[^']*'|\"[^\"]*\"")
+
+# the pattern for characters that variable references cannot be bound as operands next to
+# (including other variable references)
+ADJACENT_PATTERN = re.compile(r"[\w.@}]")
+
+# the pattern for identifiers in expressions (ignoring function calls)
+IDENTIFIER_PATTERN = re.compile(r"\b([A-Za-z_]\w*)\b(?!\s*\()")
+
+# the array types supported by numexpr: dtype -> (dtype to cast to, signature type)
+ARRAY_TYPES = {
+    np.dtype(np.bool_): (np.bool_, bool),
+    np.dtype(np.int8): (np.int32, np.int32),
+    np.dtype(np.int16): (np.int32, np.int32),
+    np.dtype(np.int32): (np.int32, np.int32),
+    np.dtype(np.int64): (np.int64, np.int64),
+    np.dtype(np.uint8): (np.int32, np.int32),
+    np.dtype(np.uint16): (np.int32, np.int32),
+    np.dtype(np.uint32): (np.int64, np.int64),
+    np.dtype(np.uint64): (np.float64, np.float64),
+    np.dtype(np.float16): (np.float32, float),
+    np.dtype(np.float32): (np.float32, float),
+    np.dtype(np.float64): (np.float64, np.float64),
+    np.dtype(np.complex128): (np.complex128, complex),
+}
+
+# the maximum number of compiled programs/expressions to cache
+MAX_CACHE_SIZE = 1024
+
+# the maximum number of string values to cache the operands for
+MAX_OPERAND_CACHE_SIZE = 65536
+
+# (rewritten expression, signature) -> numexpr program
+_programs = dict()
+
+# expression -> CompiledExpression
+_expressions = dict()
+
+# string value -> (operand, signature type) or NOT_NUMERIC
+_string_operands = dict()
+
+# marker for string values that cannot be used as operands
+NOT_NUMERIC = object()
+
+_cache_lock = threading.Lock()
+
+
+def _parse_operand(value):
+    """
+    Turns the variable value into a numexpr operand. Strings get parsed as boolean,
+    integer or float.
+
+    :param value: the value to convert
+    :return: the tuple of 0-dimensional array and signature type, None if not numeric
+    :rtype: tuple
+    """
+    if isinstance(value, (bool, np.bool_)):
+        return np.asarray(value, dtype=np.bool_), bool
+    if isinstance(value, (int, np.integer)):
+        try:
+            return np.asarray(value, dtype=np.int64), np.int64
+        except OverflowError:
+            return None
+    if isinstance(value, (float, np.floating)):
+        return np.asarray(value, dtype=np.float64), np.float64
+    if isinstance(value, str):
+        value = value.strip()
+        if value in ("True", "False"):
+            return np.asarray(value == "True", dtype=np.bool_), bool
+        try:
+            return _parse_operand(int(value))
+        except ValueError:
+            pass
+        try:
+            return _parse_operand(float(value))
+        except ValueError:
+            pass
+    return None
+
+
+def to_operand(value):
+    """
+    Turns the variable value into a numexpr operand. Strings get parsed as boolean,
+    integer or float, with the results being cached.
+
+    :param value: the value to convert
+    :return: the tuple of 0-dimensional array and signature type, None if not numeric
+    :rtype: tuple
+    """
+    if not isinstance(value, str):
+        return _parse_operand(value)
+    result = _string_operands.get(value)
+    if result is None:
+        result = _parse_operand(value)
+        if result is None:
+            result = NOT_NUMERIC
+        if len(_string_operands) >= MAX_OPERAND_CACHE_SIZE:
+            _string_operands.clear()
+        _string_operands[value] = result
+    if result is NOT_NUMERIC:
+        return None
+    return result
+
+
+def to_array_operand(value):
+    """
+    Turns the value (e.g., token or container value) into a numexpr array operand.
+
+    :param value: the value to convert
+    :return: the tuple of array and signature type
+    :rtype: tuple
+    :raises: TypeError if the type of the data cannot be used by numexpr
+    """
+    array = np.asarray(value)
+    if array.dtype.kind == "S":
+        return array, bytes
+    if array.dtype.kind == "U":
+        return array, str
+    if array.dtype not in ARRAY_TYPES:
+        raise TypeError("Unsupported data type for numexpr: %s" % str(array.dtype))
+    dtype, sig_type = ARRAY_TYPES[array.dtype]
+    if array.dtype != dtype:
+        array = array.astype(dtype)
+    return array, sig_type
+
+
+def select_masked(data, mask):
+    """
+    Returns the elements of the data (array, list or tuple) for which the boolean mask is True.
+
+    :param data: the data to select from
+    :param mask: the boolean mask
+    :type mask: np.ndarray
+    :return: the selected elements, same type as the data
+    """
+    if isinstance(data, np.ndarray):
+        return data[mask]
+    result = [x for x, m in zip(data, mask) if m]
+    if isinstance(data, tuple):
+        result = tuple(result)
+    return result
+
+
+def get_program(expression, signature):
+    """
+    Returns the compiled numexpr program for the expression and signature, compiles it if necessary.
+
+    :param expression: the expression (without variable references)
+    :type expression: str
+    :param signature: the tuple of (name, dtype) tuples
+    :type signature: tuple
+    :return: the program
+    :rtype: numexpr.NumExpr
+    """
+    key = (expression, signature)
+    program = _programs.get(key)
+    if program is None:
+        program = numexpr.NumExpr(expression, signature=list(signature))
+        with _cache_lock:
+            if len(_programs) >= MAX_CACHE_SIZE:
+                _programs.clear()
+            _programs[key] = program
+    return program
+
+
+class CompiledExpression(object):
+    """
+    Expression with the variable references replaced by local names, which get bound
+    to the variable values (converted to numbers) when evaluating the compiled program.
+    Expressions that rely on the values being substituted as text (e.g., "1@{a}" or
+    "@{a}.5") cannot be compiled, neither can negative values be bound (e.g., "@{x}**2"
+    with x=-2 evaluates to -4 as text).
+    """
+
+    def __init__(self, expression):
+        """
+        Parses the expression.
+
+        :param expression: the expression to compile
+        :type expression: str
+        """
+        self.expression = expression
+        self.template = compile_template(expression)
+        self.names = []
+        self.locals = []
+        prefix = "v_"
+        while prefix in expression:
+            prefix = "v" + prefix
+        mapping = dict()
+
+        def _replace(match):
+            name = match.group(1)
+            if name not in mapping:
+                mapping[name] = "%s%d_%s" % (prefix, len(self.names), re.sub(r"\W", "_", name))
+                self.names.append(name)
+                self.locals.append(mapping[name])
+            return mapping[name]
+
+        self.rewritten = VARIABLE_PATTERN.sub(_replace, expression)
+        self.identifiers = []
+        for name in IDENTIFIER_PATTERN.findall(STRING_PATTERN.sub("", self.rewritten)):
+            if (name not in self.locals) and (name not in self.identifiers) and (name not in ("True", "False")):
+                self.identifiers.append(name)
+        self._constant = None
+        self._programs = dict()
+        # variables inside string literals can only be expanded
+        self.compilable = True
+        for literal in STRING_PATTERN.findall(expression):
+            if VARIABLE_PATTERN.search(literal) is not None:
+                self.compilable = False
+                break
+        # variables that form a token with their surroundings (e.g., "1@{a}", "@{a}@{b}") can only be expanded
+        for match in VARIABLE_PATTERN.finditer(expression):
+            before = expression[match.start() - 1:match.start()]
+            after = expression[match.end():match.end() + 1]
+            if (ADJACENT_PATTERN.match(before) is not None) or (ADJACENT_PATTERN.match(after) is not None):
+                self.compilable = False
+                break
+
+    def evaluate(self, variables, arrays=None):
+        """
+        Evaluates the expression using the current values of the variables.
+
+        :param variables: the variables to use
+        :type variables: Variables
+        :param arrays: the additional operands (name -> (array, signature type)), e.g., the token
+        :type arrays: dict
+        :return: the result of the evaluation, None if the values of the variables cannot be used as operands
+                 (not numeric or negative)
+        """
+        if not self.compilable:
+            return None
+        if (len(self.names) == 0) and not arrays:
+            if self._constant is None:
+                self._constant = get_program(self.rewritten, ())()
+            return self._constant
+        operands = []
+        types = []
+        for name in self.names:
+            if not variables.has(name):
+                return None
+            operand = to_operand(variables.get(name))
+            if operand is None:
+                return None
+            # negative values bind tighter as operands than as text (e.g., with '**')
+            if (operand[1] is not bool) and (operand[0] < 0):
+                return None
+            operands.append(operand[0])
+            types.append(operand[1])
+        signature = list(zip(self.locals, types))
+        if arrays:
+            for name in arrays:
+                operands.append(arrays[name][0])
+                types.append((name, arrays[name][1]))
+                signature.append((name, arrays[name][1]))
+        types = tuple(types)
+        program = self._programs.get(types)
+        if program is None:
+            program = get_program(self.rewritten, tuple(signature))
+            self._programs[types] = program
+        return program(*operands)
+
+
+def compile_expression(expression):
+    """
+    Returns the compiled expression, using the cache.
+
+    :param expression: the expression to compile
+    :type expression: str
+    :return: the compiled expression
+    :rtype: CompiledExpression
+    """
+    result = _expressions.get(expression)
+    if result is None:
+        result = CompiledExpression(expression)
+        with _cache_lock:
+            if len(_expressions) >= MAX_CACHE_SIZE:
+                _expressions.clear()
+            _expressions[expression] = result
+    return result
+
+
+class NumExpr(AbstractBooleanCondition, ExpandsVariables):
     """
     Evaluates expressions using numexpr.
 
@@ -26,15 +316,165 @@ class NumExpr(AbstractBooleanCondition):
         """
         super()._define_options()
         self._option_manager.add(Option("expression", str, "True", "The expression to evaluate (must return a boolean); variables get expanded before evaluation"))
+        self._option_manager.add(Option("array_mode", bool, False, "If enabled, the current object gets bound as operand and the expression gets evaluated element-wise; for containers, the values named like identifiers in the expression get bound instead"))
+        self._option_manager.add(Option("token_name", str, "x", "The name under which to bind the current object in array mode"))
+
+    @property
+    def expanded_options(self):
+        """
+        Returns the names of the options whose variables get expanded at execution time.
+
+        :return: the option names
+        :rtype: list
+        """
+        return ["expression"]
+
+    def _initialize(self):
+        """
+        Initializes the members.
+        """
+        super()._initialize()
+        self._compiled = None
+
+    def _compile(self):
+        """
+        Returns the compiled expression.
+
+        :return: the compiled expression
+        :rtype: CompiledExpression
+        """
+        expr = str(self.get("expression"))
+        compiled = self._compiled
+        if (compiled is None) or (compiled.expression != expr):
+            compiled = compile_expression(expr)
+            self._compiled = compiled
+        return compiled
+
+    def _bind(self, o, compiled):
+        """
+        Binds the current object as array operand(s).
+
+        :param o: the current object from the owning actor
+        :param compiled: the compiled expression
+        :type compiled: CompiledExpression
+        :return: the operands (name -> (array, signature type))
+        :rtype: dict
+        """
+        result = dict()
+        if isinstance(o, AbstractContainer):
+            for name in compiled.identifiers:
+                if o.has(name):
+                    result[name] = to_array_operand(o.get(name))
+        else:
+            result[self.get("token_name")] = to_array_operand(o)
+        return result
+
+    def evaluate_mask(self, o):
+        """
+        Evaluates the expression element-wise on the current object (array mode),
+        using a single numexpr call.
+
+        :param o: the current object from the owning actor, e.g., an array or a container
+        :return: the boolean mask
+        :rtype: np.ndarray
+        """
+        compiled = self._compile()
+        arrays = self._bind(o, compiled)
+        result = compiled.evaluate(self.variables, arrays=arrays)
+        if result is None:
+            local_dict = dict()
+            for name in arrays:
+                local_dict[name] = arrays[name][0]
+            result = numexpr.evaluate(compiled.template.render(self.variables), local_dict=local_dict)
+        result = np.asarray(result)
+        if result.dtype != np.bool_:
+            result = result.astype(np.bool_)
+        return result
+
+    def _stack(self, items, compiled):
+        """
+        Stacks the items into array operands for evaluating them with a single numexpr call.
+
+        :param items: the objects to stack
+        :type items: list
+        :param compiled: the compiled expression
+        :type compiled: CompiledExpression
+        :return: the operands (name -> (array, signature type)), None if the items cannot be stacked
+        :rtype: dict
+        :raises: TypeError/ValueError if the items cannot be converted into arrays
+        """
+        if isinstance(items[0], AbstractContainer):
+            result = dict()
+            for name in compiled.identifiers:
+                present = [isinstance(x, AbstractContainer) and x.has(name) for x in items]
+                if not any(present):
+                    continue
+                if not all(present):
+                    return None
+                data = np.asarray([x.get(name) for x in items])
+                if data.ndim != 1:
+                    return None
+                result[name] = to_array_operand(data)
+            return result
+        if any([isinstance(x, AbstractContainer) for x in items]):
+            return None
+        data = np.asarray(items)
+        if (data.dtype.kind == "O") or (data.ndim == 0):
+            return None
+        return {self.get("token_name"): to_array_operand(data)}
+
+    def evaluate_batch(self, items):
+        """
+        Evaluates the condition for each of the items. In array mode, the items get stacked
+        and evaluated with a single numexpr call (if they are of the same shape and the
+        expression does not reduce). Otherwise, the expression only depends on the variables
+        and gets evaluated once for the whole batch.
+
+        :param items: the objects to evaluate
+        :type items: list
+        :return: the list of evaluation results
+        :rtype: list
+        """
+        if len(items) == 0:
+            return []
+        if not self.get("array_mode"):
+            return [self.evaluate(items[0])] * len(items)
+        compiled = self._compile()
+        arrays = None
+        if ("sum(" not in compiled.rewritten) and ("prod(" not in compiled.rewritten):
+            try:
+                arrays = self._stack(items, compiled)
+            except (TypeError, ValueError):
+                arrays = None
+        if arrays is None:
+            return [self.evaluate(x) for x in items]
+        result = compiled.evaluate(self.variables, arrays=arrays)
+        if result is None:
+            local_dict = dict()
+            for name in arrays:
+                local_dict[name] = arrays[name][0]
+            result = numexpr.evaluate(compiled.template.render(self.variables), local_dict=local_dict)
+        result = np.asarray(result)
+        if result.ndim == 0:
+            return [bool(result)] * len(items)
+        result = result.reshape((len(items), -1)).astype(np.bool_)
+        return result.all(axis=1).tolist()
 
     def _do_evaluate(self, o):
         """
-        Evaluates the condition.
+        Evaluates the condition. The expression gets compiled once, with numeric variable
+        values being passed to the compiled program. Falls back on expanding the variables
+        in the expression if not all of them are numeric.
+        In array mode, the condition is met if it holds for all elements.
 
         :param o: the current object from the owning actor
         :return: the result of the evaluation
         :rtype: bool
         """
-        expr = self.variables.expand(str(self.get("expression")))
-        result = bool(numexpr.evaluate(expr))
-        return result
+        if self.get("array_mode"):
+            return bool(self.evaluate_mask(o).all())
+        compiled = self._compile()
+        result = compiled.evaluate(self.variables)
+        if result is None:
+            result = numexpr.evaluate(compiled.template.render(self.variables))
+        return bool(result)
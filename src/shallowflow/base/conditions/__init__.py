@@ -1,2 +1,4 @@
-from ._NumExpr import NumExpr
+from ._NumExpr import NumExpr, select_masked
 from ._Basic import AlwaysTrue, AlwaysFalse, And, Not, Or
+from ._Compiler import compile_condition
+from ._Batch import evaluate_batch
@@ -1,17 +1,164 @@
+import threading
+import time
+import traceback
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor
+from coed.config import Option
 from shallowflow.api.control import MutableActorHandler, AbstractDirector, ActorHandlerInfo
 from shallowflow.api.transformer import InputConsumer
 from shallowflow.api.compatibility import Unknown, is_compatible
 from shallowflow.api.performance import actual_num_threads, num_threads_option
+from shallowflow.base.directors import Flushable, find_worker_pool, active_profiler
+from ._SubFlowProcess import SubFlowProcess
 
 STATE_INPUT = "input"
 
 
 class BranchDirector(AbstractDirector):
     """
-    Director for the Branch actor.
+    Director for the Branch actor. When using multiple threads, the branches get executed
+    in the worker pool shared across the flow, with the calling thread helping out.
+    Records the wall time of each branch.
     """
 
+    def __init__(self, owner):
+        """
+        Initializes the director.
+
+        :param owner: the owning actor
+        :type owner: Actor
+        """
+        super().__init__(owner)
+        self._branch_times = dict()
+        self._lock = threading.Lock()
+
+    @property
+    def branch_times(self):
+        """
+        Returns the accumulated wall times of the branches.
+
+        :return: the dictionary of branch full name -> (number of executions, total seconds, maximum seconds)
+        :rtype: dict
+        """
+        with self._lock:
+            return dict(self._branch_times)
+
+    def record_branch_time(self, actor, seconds):
+        """
+        Records the wall time of executing a branch.
+
+        :param actor: the branch that was executed
+        :type actor: Actor
+        :param seconds: the wall time in seconds
+        :type seconds: float
+        """
+        with self._lock:
+            count, total, maximum = self._branch_times.get(actor.full_name, (0, 0.0, 0.0))
+            self._branch_times[actor.full_name] = (count + 1, total + seconds, max(maximum, seconds))
+        if self._owner.is_debug:
+            self.log("Branch %s took %.3f seconds" % (actor.full_name, seconds))
+
+    def _execute_branch(self, actor):
+        """
+        Executes a single branch and records its wall time.
+
+        :param actor: the branch to execute
+        :type actor: Actor
+        :return: None if successfully executed, otherwise error message
+        :rtype: str
+        """
+        profiler = active_profiler()
+        start = time.perf_counter()
+        try:
+            if profiler is None:
+                result = actor.execute()
+            else:
+                result = profiler.execute(actor, has_input=isinstance(actor, InputConsumer))
+        except Exception:
+            result = "Failed to execute branch %s:\n%s" % (actor.full_name, traceback.format_exc())
+        self.record_branch_time(actor, time.perf_counter() - start)
+        return result
+
+    def _execute_branches(self, branches, running, errors):
+        """
+        Executes the queued up branches until none are left. If a branch fails and it
+        is supposed to stop the flow on errors, the queued up branches get discarded
+        and the running ones get stopped.
+
+        :param branches: the queue of branches to execute
+        :type branches: deque
+        :param running: the set of branches currently executing
+        :type running: set
+        :param errors: the list of (branch, error message) tuples
+        :type errors: list
+        """
+        while not self.is_stopped:
+            try:
+                actor = branches.popleft()
+            except IndexError:
+                break
+            with self._lock:
+                running.add(actor)
+            msg = self._execute_branch(actor)
+            with self._lock:
+                running.discard(actor)
+                if msg is not None:
+                    errors.append((actor, msg))
+                    fail_fast = actor.get("stop_flow_on_error")
+                else:
+                    fail_fast = False
+                if fail_fast:
+                    branches.clear()
+                    others = list(running)
+            if fail_fast:
+                for other in others:
+                    other.stop_execution()
+
+    def _execute_threaded(self, actors, num_threads, executor):
+        """
+        Executes the actors using the supplied executor. The calling thread executes
+        branches as well, which avoids deadlocks with nested branches when all the
+        workers of the pool are busy.
+
+        :param actors: the actors to execute
+        :type actors: list
+        :param num_threads: the maximum number of branches to execute concurrently
+        :type num_threads: int
+        :param executor: the executor to use for submitting the branches
+        :return: None if successfully executed, otherwise error message
+        :rtype: str
+        """
+        branches = deque([x for x in actors if not x.is_skipped])
+        running = set()
+        errors = []
+        futures = []
+        for i in range(min(num_threads, len(branches)) - 1):
+            futures.append(executor.submit(self._execute_branches, branches, running, errors))
+        self._execute_branches(branches, running, errors)
+        # workers that haven't started yet are no longer required
+        for future in futures:
+            if not future.cancel():
+                future.result()
+        return self.combine_errors(errors)
+
+    def combine_errors(self, errors):
+        """
+        Turns the errors of the branches into a single error message.
+
+        :param errors: the list of (branch, error message) tuples
+        :type errors: list
+        :return: None if no errors, otherwise error message
+        :rtype: str
+        """
+        if len(errors) == 0:
+            return None
+        if len(errors) == 1:
+            return errors[0][1]
+        result = "%d branches failed:" % len(errors)
+        for actor, msg in errors:
+            result += "\n- %s: %s" % (actor.full_name, msg)
+        return result
+
     def _do_execute(self, actors):
         """
         Executes the specified list of actors.
@@ -29,23 +176,21 @@ class BranchDirector(AbstractDirector):
                     break
                 if actor.is_skipped:
                     continue
-                result = actor.execute()
+                result = self._execute_branch(actor)
                 if result is not None:
                     break
         else:
-            with ThreadPoolExecutor(max_workers=num_threads) as executor:
-                for actor in actors:
-                    if self.is_stopped:
-                        break
-                    if actor.is_skipped:
-                        continue
-                    # don't use lambda!
-                    executor.submit(actor.execute)
+            pool = find_worker_pool(self._owner)
+            if pool is not None:
+                result = self._execute_threaded(actors, num_threads, pool)
+            else:
+                with ThreadPoolExecutor(max_workers=num_threads) as executor:
+                    result = self._execute_threaded(actors, num_threads, executor)
 
         return result
 
 
-class Branch(MutableActorHandler, InputConsumer):
+class Branch(MutableActorHandler, InputConsumer, Flushable):
     """
     Forwards the input data to all of its sub-actors.
     """
@@ -65,6 +210,15 @@ class Branch(MutableActorHandler, InputConsumer):
         """
         super()._define_options()
         self._option_manager.add(num_threads_option())
+        self._option_manager.add(Option(name="use_processes", value_type=bool, def_value=False,
+                                        help="If enabled, each branch gets executed in its own worker process (started at setup) rather than using threads"))
+
+    def _initialize(self):
+        """
+        Initializes the members.
+        """
+        super()._initialize()
+        self._processes = None
 
     @property
     def actor_handler_info(self):
@@ -172,8 +326,65 @@ class Branch(MutableActorHandler, InputConsumer):
                 for actor in self.actors:
                     if not isinstance(actor, InputConsumer):
                         result = "Sub-actor does not accept input: %s" % actor.full_name
+        if result is None:
+            if self.get("use_processes"):
+                result = self._start_processes()
         return result
 
+    def _start_processes(self):
+        """
+        Starts a worker process for each of the (non-skipped) branches.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        self._stop_processes()
+        self._processes = []
+        for actor in self.actors:
+            if actor.is_skipped:
+                continue
+            try:
+                process = SubFlowProcess([actor], name=actor.full_name)
+            except Exception:
+                return self._handle_exception("Failed to serialize branch: %s" % actor.full_name)
+            self._processes.append((actor, process))
+            msg = process.start()
+            if msg is not None:
+                self._stop_processes()
+                return "Failed to start worker process for branch %s: %s" % (actor.full_name, msg)
+        return None
+
+    def _stop_processes(self):
+        """
+        Stops all the worker processes, if any.
+        """
+        if self._processes is not None:
+            for _, process in self._processes:
+                process.stop()
+        self._processes = None
+
+    def _execute_processes(self):
+        """
+        Sends the current input to all the worker processes and waits for them to finish.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        variables = dict()
+        for k in self.variables.keys():
+            variables[k] = self.variables.get(k)
+        for _, process in self._processes:
+            process.submit(self._input, variables=variables)
+        errors = []
+        for actor, process in self._processes:
+            msg, _ = process.result(is_stopped=lambda: self.is_stopped)
+            # the time the branch itself took in its worker, not the time spent waiting for it
+            if process.last_duration is not None:
+                self._director.record_branch_time(actor, process.last_duration)
+            if msg is not None:
+                errors.append((actor, msg))
+        return self._director.combine_errors(errors)
+
     def _new_director(self):
         """
         Returns the director to use for executing the actors.
@@ -214,7 +425,10 @@ class Branch(MutableActorHandler, InputConsumer):
         """
         result = None
         if self._can_execute_actors():
-            result = self._director.execute(self.actors)
+            if self._processes is not None:
+                result = self._execute_processes()
+            else:
+                result = self._director.execute(self.actors)
         return result
 
     def _post_execute(self):
@@ -223,10 +437,37 @@ class Branch(MutableActorHandler, InputConsumer):
         """
         self._input = None
 
+    def flush(self):
+        """
+        Signals the end of the stream: flushes the branches, one after the other.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        errors = []
+        if self._processes is not None:
+            for actor, process in self._processes:
+                if self.is_stopped:
+                    break
+                msg, _ = process.flush(is_stopped=lambda: self.is_stopped)
+                if msg is not None:
+                    errors.append((actor, msg))
+        else:
+            for actor in self.actors:
+                if self.is_stopped:
+                    break
+                if actor.is_skipped or not isinstance(actor, Flushable):
+                    continue
+                msg = actor.flush()
+                if msg is not None:
+                    errors.append((actor, msg))
+        return self._director.combine_errors(errors)
+
     def wrap_up(self):
         """
         For finishing up the execution.
         Does not affect graphical output.
         """
         self._input = None
+        self._stop_processes()
         super().wrap_up()
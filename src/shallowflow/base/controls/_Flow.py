@@ -1,12 +1,16 @@
+from coed.config import Option
 from coed.vars import Variables
 from shallowflow.api.control import MutableActorHandler, ActorHandlerInfo
 from shallowflow.api.io import save_actor
 from shallowflow.api.scope import ScopeHandler
-from shallowflow.api.storage import StorageHandler, Storage
-from shallowflow.base.directors import SequentialDirector
+from shallowflow.api.performance import actual_num_threads, num_threads_option
+from shallowflow.api.storage import StorageHandler
+from shallowflow.base.storage import ShardedStorage, SpillStorage
+from shallowflow.base.variables import TypedVariables, VariableIndex, VariableIndexHandler
+from shallowflow.base.directors import PipelinedDirector, pipelined_option, queue_size_option, WorkerPool, WorkerPoolHandler
 
 
-class Flow(MutableActorHandler, StorageHandler, ScopeHandler):
+class Flow(MutableActorHandler, StorageHandler, ScopeHandler, WorkerPoolHandler, VariableIndexHandler):
     """
     Encapsulates a complete flow.
     """
@@ -20,13 +24,85 @@ class Flow(MutableActorHandler, StorageHandler, ScopeHandler):
         """
         return "Encapsulates a complete flow."
 
+    def _define_options(self):
+        """
+        For configuring the options.
+        """
+        super()._define_options()
+        self._option_manager.add(pipelined_option())
+        self._option_manager.add(queue_size_option())
+        # the size of the worker pool that is shared by the actors of the flow (when root actor)
+        self._option_manager.add(num_threads_option())
+        self._option_manager.add(Option(name="storage_max_memory", value_type=int, def_value=-1,
+                                        help="The maximum number of bytes (estimated) that the storage keeps in memory before spilling the least recently used items to disk, ignored if <=0"))
+        self._option_manager.add(Option(name="storage_spill_dir", value_type=str, def_value="",
+                                        help="The directory to spill storage items to, uses a temporary directory if empty"))
+        self._option_manager.add(Option(name="typed_variables", value_type=bool, def_value=False,
+                                        help="If enabled, variables keep native values (e.g., numbers) rather than strings, which only get turned into strings when expanded"))
+
     def _initialize(self):
         """
         Initializes the members.
         """
         super()._initialize()
-        self._storage = Storage()
+        self._storage = ShardedStorage()
+        self._storage_config = None
         self._callable_names = set()
+        self._worker_pool = None
+        self._variable_index = None
+
+    def setup(self):
+        """
+        Prepares the actor for use.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        # sub-actors may hold on to the storage/variables during their setup
+        self._configure_storage()
+        if self.get("typed_variables") != isinstance(self.variables, TypedVariables):
+            if self.get("typed_variables"):
+                variables = TypedVariables()
+                variables.merge(self.variables)
+            else:
+                variables = Variables()
+                for key in self.variables.keys():
+                    variables.set(key, self.variables.get_string(key))
+            self.update_variables(variables)
+        result = super().setup()
+        if result is None:
+            self._director.compile(self.actors)
+            self._variable_index = VariableIndex(self)
+            self._variable_index.detach(self.variables)
+        if result is None:
+            if (self.root is self) and (self._worker_pool is None):
+                self._worker_pool = WorkerPool(actual_num_threads(self.get("num_threads")))
+                self._worker_pool.start()
+        return result
+
+    def _configure_storage(self):
+        """
+        Switches to a storage with a memory budget or back to the default storage,
+        depending on the options. The storage only gets replaced if the storage options
+        changed since the last setup. Any existing storage items get carried over.
+        """
+        max_memory = self.get("storage_max_memory")
+        spill_dir = self.get("storage_spill_dir")
+        if len(spill_dir) == 0:
+            spill_dir = None
+        config = (max_memory, spill_dir) if (max_memory > 0) else None
+        if config == self._storage_config:
+            return
+        self._storage_config = config
+        if max_memory > 0:
+            storage = SpillStorage(max_memory, spill_dir=spill_dir)
+        else:
+            storage = ShardedStorage()
+        for key in self._storage.keys():
+            storage.set(key, self._storage.get(key))
+        if isinstance(self._storage, SpillStorage):
+            self._storage.close()
+        self._storage = storage
 
     def _new_director(self):
         """
@@ -35,7 +111,7 @@ class Flow(MutableActorHandler, StorageHandler, ScopeHandler):
         :return: the director
         :rtype: AbstractDirector
         """
-        return SequentialDirector(owner=self, allows_standalones=True, requires_source=True, requires_sink=False)
+        return PipelinedDirector(owner=self, allows_standalones=True, requires_source=True, requires_sink=False)
 
     @property
     def actor_handler_info(self):
@@ -60,6 +136,18 @@ class Flow(MutableActorHandler, StorageHandler, ScopeHandler):
             self.update_variables(self.variables)
         return result
 
+    def update_variables(self, variables):
+        """
+        Sets the variables to use for the actor and its sub-actors. Once the variable index
+        is available, the actors no longer listen to changes of the variables themselves.
+
+        :param variables: the variables to use
+        :type variables: Variables
+        """
+        super().update_variables(variables)
+        if self._variable_index is not None:
+            self._variable_index.detach(variables)
+
     @property
     def storage(self):
         """
@@ -70,6 +158,46 @@ class Flow(MutableActorHandler, StorageHandler, ScopeHandler):
         """
         return self._storage
 
+    @property
+    def variable_index(self):
+        """
+        Returns the index of the variables referenced by the actors, built at setup.
+
+        :return: the index, None if not set up
+        :rtype: VariableIndex
+        """
+        return self._variable_index
+
+    @property
+    def worker_pool(self):
+        """
+        Returns the worker pool shared by the actors of the flow.
+
+        :return: the pool, None if not the root actor or not set up
+        :rtype: WorkerPool
+        """
+        return self._worker_pool
+
+    def wrap_up(self):
+        """
+        For finishing up the execution.
+        Does not affect graphical output.
+        """
+        super().wrap_up()
+        if self._worker_pool is not None:
+            self._worker_pool.shutdown()
+            self._worker_pool = None
+        if isinstance(self._storage, SpillStorage) and self.is_debug:
+            self.log("Storage statistics: %s" % str(self._storage.statistics))
+
+    def clean_up(self):
+        """
+        For cleaning up the actor, removes any storage items that were spilled to disk.
+        """
+        super().clean_up()
+        if isinstance(self._storage, SpillStorage):
+            self._storage.close()
+
     def is_callable_name_used(self, handler, actor):
         """
         Returns whether a callable name is already in use.
@@ -119,10 +247,11 @@ def run_flow(flow, variables=None, dump_file=None):
         if msg is not None:
             print(msg)
 
+    # the actors referencing the variables get configured with them at setup
+    if variables is not None:
+        flow.variables.merge(variables)
     msg = flow.setup()
     if msg is None:
-        if variables is not None:
-            flow.variables.merge(variables)
         msg = flow.execute()
         if msg is not None:
             return "Failed to execute flow: %s" % msg
@@ -2,11 +2,12 @@ from shallowflow.api.actor import InputConsumer
 from coed.config import Option, get_class_name
 from shallowflow.api.container import AbstractContainer
 from shallowflow.api.control import ActorHandlerInfo
-from shallowflow.base.directors import SequentialDirector
+from shallowflow.base.directors import SequentialDirector, Flushable
+from shallowflow.base.options import snapshot_options
 from ._Tee import AbstractTee
 
 
-class GetContainerValue(AbstractTee):
+class GetContainerValue(AbstractTee, Flushable):
     """
     Lets the user obtain a value from a container passing through.
     Can either be processed in a sub-flow or by the following actor(s).
@@ -34,6 +35,13 @@ class GetContainerValue(AbstractTee):
         self.option_manager.add(Option(name="ignore_missing", value_type=bool, def_value=False,
                                        help="Whether to ignore missing container values or generate an error"))
 
+    def _initialize(self):
+        """
+        Initializes the members.
+        """
+        super()._initialize()
+        self._opts = None
+
     def _new_director(self):
         """
         Returns the director to use for executing the actors.
@@ -80,6 +88,34 @@ class GetContainerValue(AbstractTee):
         if result is None:
             if len(self.get("value_name")) == 0:
                 result = "No value name provided!"
+        if result is None:
+            self._director.compile(self.actors)
+            self._opts = snapshot_options(self)
+        return result
+
+    @property
+    def reapplied_options(self):
+        """
+        Returns the names of the options that get refreshed by reapply_options.
+
+        :return: the option names
+        :rtype: list
+        """
+        return super().reapplied_options + ["value_name"]
+
+    def reapply_options(self):
+        """
+        Refreshes the state derived from the options after variables that they reference have changed.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        result = super().reapply_options()
+        if result is None:
+            if len(self.get("value_name")) == 0:
+                result = "No value name provided!"
+        if result is None:
+            self._opts = snapshot_options(self)
         return result
 
     def _do_execute(self):
@@ -94,18 +130,19 @@ class GetContainerValue(AbstractTee):
         if not isinstance(self._input, AbstractContainer):
             result = "Input is not a container, but: %s" % get_class_name(self._input)
 
-        name = self.get("value_name")
+        opts = self._opts
+        name = opts.value_name
         if result is None:
             if not self._input.has(name):
                 msg = "Value not found in container: %s" % name
-                if self.get("ignore_missing"):
+                if opts.ignore_missing:
                     self.log(msg)
                 else:
                     result = msg
 
         if result is None:
             value = self._input.get(name)
-            if self.get("switch_outputs"):
+            if opts.switch_outputs:
                 subflow = self._input
                 forward = value
             else:
@@ -119,3 +156,14 @@ class GetContainerValue(AbstractTee):
                 self._output = forward
 
         return result
+
+    def flush(self):
+        """
+        Signals the end of the stream: flushes the sub-actors.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        if len(self.actors) == 0:
+            return None
+        return self._director.flush(self.actors)
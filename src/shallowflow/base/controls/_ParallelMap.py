@@ -0,0 +1,151 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from queue import Queue
+from coed.config import Option
+from shallowflow.api.performance import actual_num_threads
+from ._Prefetch import Prefetch
+from ._SubFlowProcess import SubFlowProcess
+
+
+class ParallelMap(Prefetch):
+    """
+    Executes the sub-actors on multiple tokens concurrently, using threads or worker processes.
+    """
+
+    def description(self):
+        """
+        Returns a description for the object.
+
+        :return: the object description
+        :rtype: str
+        """
+        return "Executes the sub-actors on multiple tokens concurrently, using threads or worker processes. "\
+               + "Each worker uses its own copy of the sub-actors, which uses the values of the flow's "\
+               + "variables at the time the token arrived. With threads, the copies share the storage with "\
+               + "the flow; worker processes use their own storage. "\
+               + "The output gets forwarded in the order of the incoming tokens (using a reorder buffer), "\
+               + "unless 'unordered' is enabled, in which case the output gets forwarded as soon as it is available. "\
+               + "At most 'max_tokens' tokens are in flight at any time."
+
+    def _define_options(self):
+        """
+        For configuring the options.
+        """
+        super()._define_options()
+        self._option_manager.add(Option(name="use_processes", value_type=bool, def_value=False,
+                                        help="If enabled, worker processes (started at setup) are used rather than threads; the number of processes is determined by 'num_threads'"))
+        self._option_manager.add(Option(name="unordered", value_type=bool, def_value=False,
+                                        help="If enabled, the output gets forwarded as soon as it is available rather than in the order of the incoming tokens"))
+
+    def _initialize(self):
+        """
+        Initializes the members.
+        """
+        super()._initialize()
+        self._processes = None
+
+    def _start_workers(self):
+        """
+        Creates the workers (copies of the sub-actors or worker processes) and starts the thread pool.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        if not self.get("use_processes"):
+            return super()._start_workers()
+        self._stop_workers()
+        num_processes = actual_num_threads(self.get("num_threads"))
+        actors = [x for x in self.actors if not x.is_skipped]
+        self._processes = []
+        self._available = Queue()
+        for i in range(num_processes):
+            try:
+                process = SubFlowProcess(actors, name="%s-%d" % (self.full_name, i))
+            except Exception:
+                return self._handle_exception("Failed to serialize sub-actors!")
+            self._processes.append(process)
+            msg = process.start()
+            if msg is not None:
+                return "Failed to start worker process #%d: %s" % (i, msg)
+            self._available.put(process)
+        self._executor = ThreadPoolExecutor(max_workers=num_processes, thread_name_prefix="shallowflow-parallelmap")
+        return None
+
+    def _stop_workers(self):
+        """
+        Shuts down the thread pool and discards the workers.
+        """
+        super()._stop_workers()
+        if self._processes is not None:
+            for process in self._processes:
+                process.stop()
+            self._processes = None
+
+    def _flush_workers(self):
+        """
+        Flushes the copies of the sub-actors or the worker processes, once all tokens
+        have been processed, and buffers their output. Errors get recorded.
+        """
+        if self._processes is None:
+            super()._flush_workers()
+            return
+        for process in self._processes:
+            msg, output = process.flush(is_stopped=lambda: self.is_stopped)
+            if msg is not None:
+                self.log(msg)
+                self._errors.append(msg)
+            self._buffer.extend(self._estimate(output))
+
+    def _process_remote(self, token, variables):
+        """
+        Processes the token with one of the available worker processes.
+
+        :param token: the token to process
+        :param variables: the current variables (name -> value)
+        :type variables: dict
+        :return: the tuple of error message (None if successful) and list of (output, estimated bytes) tuples
+        :rtype: tuple
+        """
+        process = self._available.get()
+        try:
+            process.submit(token, variables=variables)
+            msg, output = process.result(is_stopped=lambda: self.is_stopped)
+        finally:
+            self._available.put(process)
+        return msg, self._estimate(output)
+
+    def _submit(self, token):
+        """
+        Submits the token for processing in the background.
+
+        :param token: the token to process
+        :return: the future of the processing
+        :rtype: Future
+        """
+        if self._processes is None:
+            return super()._submit(token)
+        # the variables get captured at the time the token arrives
+        return self._executor.submit(self._process_remote, token, self._variable_values())
+
+    def _collect(self, block):
+        """
+        Moves the output of a processed token into the output buffer. Unless unordered,
+        this is the oldest token.
+
+        :param block: whether to wait for a token to be processed
+        :type block: bool
+        :return: True if a token was collected
+        :rtype: bool
+        """
+        if not self.get("unordered"):
+            return super()._collect(block)
+        if len(self._in_flight) == 0:
+            return False
+        done = [x for x in self._in_flight if x.done()]
+        if len(done) == 0:
+            if not block:
+                return False
+            done = [x for x in wait(list(self._in_flight), return_when=FIRST_COMPLETED).done]
+        future = done[0]
+        self._in_flight.remove(future)
+        self._collect_result(future)
+        return True
@@ -0,0 +1,445 @@
+import numbers
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from coed.class_utils import class_name_to_type
+from coed.config import Option
+from shallowflow.api.control import MutableActorHandler, ActorHandlerInfo
+from shallowflow.api.actor import InputConsumer
+from shallowflow.api.compatibility import Unknown
+from shallowflow.api.container import AbstractContainer
+from shallowflow.api.performance import actual_num_threads
+from shallowflow.api.storage import StorageUser
+from shallowflow.base.directors import SequentialDirector, Flushable
+from ._SubFlowCopies import SubFlowCopies
+from ._SubFlowProcess import SubFlowProcess, execute_sub_flow, flush_sub_flow
+
+
+def merge_values(values):
+    """
+    Merges the values of a storage item from the partitions: numbers get summed up,
+    lists concatenated and dictionaries combined. For any other type, the last value wins.
+
+    :param values: the values to merge, in the order of the partitions
+    :type values: list
+    :return: the merged value
+    """
+    if len(values) == 1:
+        return values[0]
+    if all([isinstance(x, numbers.Number) and not isinstance(x, bool) for x in values]):
+        return sum(values)
+    if all([isinstance(x, list) for x in values]):
+        result = []
+        for value in values:
+            result.extend(value)
+        return result
+    if all([isinstance(x, dict) for x in values]):
+        result = dict()
+        for value in values:
+            result.update(value)
+        return result
+    return values[-1]
+
+
+class Partition(MutableActorHandler, InputConsumer, StorageUser, Flushable, SubFlowCopies):
+    """
+    Routes each token to one of several replicas of the sub-actors, based on its key.
+    """
+
+    def description(self):
+        """
+        Returns a description for the object.
+
+        :return: the object description
+        :rtype: str
+        """
+        return "Routes each token to one of several replicas of the sub-actors, based on the hash of its key "\
+               + "(the token itself, the value of a container field or the result of a key function), "\
+               + "i.e., tokens with the same key always get processed by the same replica and in order. "\
+               + "Each replica runs in its own thread or worker process and has its own private storage. "\
+               + "When wrapping up, the storage items of the replicas get merged into the storage of the flow "\
+               + "(numbers get summed up, lists concatenated, dictionaries combined, otherwise the last value wins; "\
+               + "or using a custom function that takes the list of values and returns the merged value). "\
+               + "Any output generated by the sub-actors gets discarded."
+
+    def _define_options(self):
+        """
+        For configuring the options.
+        """
+        super()._define_options()
+        self._option_manager.add(Option(name="num_partitions", value_type=int, def_value=-1,
+                                        help="The number of replicas, uses the number of CPUs if <=0"))
+        self._option_manager.add(Option(name="key_field", value_type=str, def_value="",
+                                        help="The name of the container value to use as key; the token itself is used if empty and no key function specified"))
+        self._option_manager.add(Option(name="key_function", value_type=str, def_value="",
+                                        help="The dotted path of the function that returns the key for a token (module.function), takes precedence over the key field"))
+        self._option_manager.add(Option(name="use_processes", value_type=bool, def_value=False,
+                                        help="If enabled, each replica gets executed in its own worker process (started at setup) rather than a thread"))
+        self._option_manager.add(Option(name="max_pending", value_type=int, def_value=10, lower=1,
+                                        help="The maximum number of tokens that can be queued up per replica"))
+        self._option_manager.add(Option(name="merge", value_type=str, def_value="",
+                                        help="The dotted path of the function for merging the list of values of a storage item (module.function); uses the default merge if empty"))
+
+    def _initialize(self):
+        """
+        Initializes the members.
+        """
+        super()._initialize()
+        self._replicas = None
+        self._executors = None
+        self._pending = None
+        self._key_function = None
+        self._merge = None
+        self._errors = []
+
+    def reset(self):
+        """
+        Resets the state of the actor.
+        """
+        super().reset()
+        self._input = None
+
+    @property
+    def actor_handler_info(self):
+        """
+        Returns meta-info about itself.
+
+        :return: the info
+        :rtype: ActorHandlerInfo
+        """
+        return ActorHandlerInfo(can_contain_standalones=False, can_contain_source=False)
+
+    @property
+    def uses_storage(self):
+        """
+        Returns whether storage is used.
+
+        :return: True if used
+        :rtype: bool
+        """
+        return not self.is_skipped
+
+    def input(self, data):
+        """
+        Sets the input data to consume.
+
+        :param data: the data to consume
+        :type data: object
+        """
+        self._input = data
+
+    def accepts(self):
+        """
+        Returns the types that are accepted.
+
+        :return: the list of types
+        :rtype: list
+        """
+        if len(self) == 0:
+            return [Unknown]
+        else:
+            return self.actors[0].accepts()
+
+    def _new_director(self):
+        """
+        Returns the director to use for checking the actors.
+
+        :return: the director
+        :rtype: AbstractDirector
+        """
+        return SequentialDirector(owner=self, allows_standalones=False, requires_source=False, requires_sink=False)
+
+    def _check_actors(self, actors):
+        """
+        Performs checks on the sub-actors.
+
+        :param actors: the actors to check
+        :type actors: list
+        :return: None if successful check, otherwise error message
+        :rtype: str
+        """
+        result = super()._check_actors(actors)
+        if result is None:
+            if len(self.actors) > 0:
+                if not isinstance(self.actors[0], InputConsumer):
+                    result = "First sub-actor does not accept input: %s" % self.actors[0].full_name
+        return result
+
+    def setup(self):
+        """
+        Prepares the actor for use.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        result = super().setup()
+        if result is None:
+            if self.storage_handler is None:
+                result = "No storage handler available!"
+        if result is None:
+            result = self._director.compile(self.actors).check_result
+        if result is None:
+            self._key_function = None
+            if len(self.get("key_function")) > 0:
+                try:
+                    self._key_function = class_name_to_type(self.get("key_function"))
+                except Exception:
+                    result = self._handle_exception("Failed to locate key function: %s" % self.get("key_function"))
+        if result is None:
+            self._merge = merge_values
+            if len(self.get("merge")) > 0:
+                try:
+                    self._merge = class_name_to_type(self.get("merge"))
+                except Exception:
+                    result = self._handle_exception("Failed to locate merge function: %s" % self.get("merge"))
+        if result is None:
+            result = self._start_replicas()
+        return result
+
+    def _start_replicas(self):
+        """
+        Creates the replicas of the sub-actors (or starts the worker processes) and their threads.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        self._stop_replicas()
+        num_partitions = actual_num_threads(self.get("num_partitions"))
+        actors = [x for x in self.actors if not x.is_skipped]
+        self._replicas = []
+        self._executors = []
+        self._pending = []
+        if self.get("use_processes"):
+            for i in range(num_partitions):
+                try:
+                    process = SubFlowProcess(actors, name="%s-%d" % (self.full_name, i))
+                except Exception:
+                    return self._handle_exception("Failed to serialize sub-actors!")
+                self._replicas.append(process)
+                msg = process.start()
+                if msg is not None:
+                    return "Failed to start worker process for partition #%d: %s" % (i, msg)
+        else:
+            # each replica uses its own storage
+            self._replicas, msg = self._copy_actors(num_partitions)
+            if msg is not None:
+                return msg
+        for i in range(num_partitions):
+            self._executors.append(ThreadPoolExecutor(max_workers=1, thread_name_prefix="shallowflow-partition-%d" % i))
+            self._pending.append(deque())
+        return None
+
+    def _stop_replicas(self):
+        """
+        Shuts down the threads and discards the replicas (or stops the worker processes).
+        """
+        if self._executors is not None:
+            for executor in self._executors:
+                executor.shutdown(wait=True, cancel_futures=True)
+            self._executors = None
+        if self._replicas is not None:
+            for replica in self._replicas:
+                if isinstance(replica, SubFlowProcess):
+                    replica.stop()
+            self._discard_copies([x for x in self._replicas if not isinstance(x, SubFlowProcess)])
+            self._replicas = None
+        self._pending = None
+
+    def _key(self, token):
+        """
+        Determines the key of the token.
+
+        :param token: the token to get the key for
+        :return: the key
+        """
+        if self._key_function is not None:
+            return self._key_function(token)
+        if len(self.get("key_field")) > 0:
+            if not isinstance(token, AbstractContainer):
+                raise TypeError("Key field requires container, but received: %s" % str(type(token)))
+            return token.get(self.get("key_field"))
+        return token
+
+    def _process_local(self, replica, token, variables):
+        """
+        Processes the token with the replica of the sub-actors.
+
+        :param replica: the tuple of container and collector
+        :type replica: tuple
+        :param token: the token to process
+        :param variables: the variables at the time the token arrived (name -> value)
+        :type variables: dict
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        if self.is_stopped:
+            return None
+        msg, _ = execute_sub_flow(replica[0], replica[1], token, variables=variables)
+        return msg
+
+    def _process_remote(self, process, token, variables):
+        """
+        Processes the token with the worker process.
+
+        :param process: the worker process
+        :type process: SubFlowProcess
+        :param token: the token to process
+        :param variables: the current variables (name -> value)
+        :type variables: dict
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        if self.is_stopped:
+            return None
+        process.submit(token, variables=variables)
+        msg, _ = process.result(is_stopped=lambda: self.is_stopped)
+        return msg
+
+    def _collect(self, future):
+        """
+        Waits for the token to be processed and records any error.
+
+        :param future: the future of the processing
+        :type future: Future
+        """
+        try:
+            msg = future.result()
+        except CancelledError:
+            return
+        if msg is not None:
+            self.log(msg)
+            self._errors.append(msg)
+
+    def _wait_all(self):
+        """
+        Waits for all the queued up tokens to be processed.
+        """
+        if self._pending is None:
+            return
+        for pending in self._pending:
+            while len(pending) > 0:
+                self._collect(pending.popleft())
+
+    def _do_execute(self):
+        """
+        Performs the actual execution.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        result = self._pop_errors()
+        if len(self.actors) == 0:
+            return result
+        try:
+            index = hash(self._key(self._input)) % len(self._replicas)
+        except Exception:
+            return self._handle_exception("Failed to determine partition for token!")
+        pending = self._pending[index]
+        while len(pending) >= self.get("max_pending"):
+            self._collect(pending.popleft())
+        replica = self._replicas[index]
+        # the variables get captured at the time the token arrives
+        if isinstance(replica, SubFlowProcess):
+            pending.append(self._executors[index].submit(self._process_remote, replica, self._input, self._variable_values()))
+        else:
+            pending.append(self._executors[index].submit(self._process_local, replica, self._input, self._variable_values()))
+        return result
+
+    def _post_execute(self):
+        """
+        After the actual code got executed.
+        """
+        self._input = None
+        super()._post_execute()
+
+    def flush(self):
+        """
+        Signals the end of the stream: waits for all the queued up tokens to be processed
+        and flushes the replicas of the sub-actors.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        if self._replicas is None:
+            return None
+        self._wait_all()
+        if not self.is_stopped:
+            for replica in self._replicas:
+                if isinstance(replica, SubFlowProcess):
+                    msg, _ = replica.flush(is_stopped=lambda: self.is_stopped)
+                else:
+                    msg, _ = flush_sub_flow(replica[0], replica[1])
+                if msg is not None:
+                    self.log(msg)
+                    self._errors.append(msg)
+        return self._pop_errors()
+
+    def _merge_storages(self):
+        """
+        Merges the storage items of the replicas into the storage of the flow.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        errors = []
+        items = []
+        for replica in self._replicas:
+            if isinstance(replica, SubFlowProcess):
+                msg, storage_items = replica.get_storage(is_stopped=lambda: self.is_stopped)
+                if msg is not None:
+                    errors.append(msg)
+                items.append(storage_items)
+            else:
+                storage = replica[0].storage
+                items.append(dict([(k, storage.get(k)) for k in storage.keys()]))
+        names = []
+        for storage_items in items:
+            for name in storage_items:
+                if name not in names:
+                    names.append(name)
+        storage = self.storage_handler.storage
+        for name in names:
+            values = []
+            if storage.has(name):
+                values.append(storage.get(name))
+            for storage_items in items:
+                if name in storage_items:
+                    values.append(storage_items[name])
+            try:
+                storage.set(name, self._merge(values))
+            except Exception:
+                errors.append(self._handle_exception("Failed to merge storage item: %s" % name))
+        if len(errors) > 0:
+            return "\n".join(errors)
+        return None
+
+    def stop_execution(self):
+        """
+        Stops the actor execution.
+        """
+        if self._pending is not None:
+            for pending in self._pending:
+                for future in pending:
+                    future.cancel()
+        if self._replicas is not None:
+            for replica in self._replicas:
+                if not isinstance(replica, SubFlowProcess):
+                    replica[0].stop_execution()
+        super().stop_execution()
+
+    def wrap_up(self):
+        """
+        For finishing up the execution: merges the storage items of the replicas into
+        the storage of the flow. Does not affect graphical output.
+        """
+        self._input = None
+        if self._replicas is not None:
+            self._wait_all()
+            msg = self._pop_errors()
+            if msg is not None:
+                self.log(msg)
+            if self.storage_handler is not None:
+                msg = self._merge_storages()
+                if msg is not None:
+                    self.log(msg)
+        self._stop_replicas()
+        super().wrap_up()
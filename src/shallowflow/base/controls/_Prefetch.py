@@ -0,0 +1,350 @@
+import threading
+from collections import deque
+from concurrent.futures import CancelledError, wait
+from coed.config import Option
+from shallowflow.api.control import MutableActorHandler, ActorHandlerInfo
+from shallowflow.api.actor import InputConsumer, OutputProducer
+from shallowflow.api.compatibility import Unknown
+from shallowflow.api.performance import num_threads_option
+from shallowflow.base.directors import SequentialDirector, Flushable
+from shallowflow.base.memory import estimate_size
+from ._SubFlowCopies import SubFlowCopies
+from ._SubFlowProcess import execute_sub_flow, flush_sub_flow
+
+
+class Prefetch(MutableActorHandler, InputConsumer, OutputProducer, Flushable, SubFlowCopies):
+    """
+    Executes the sub-actors speculatively on the incoming tokens in the background,
+    forwarding the generated output in the original order.
+    """
+
+    def description(self):
+        """
+        Returns a description for the object.
+
+        :return: the object description
+        :rtype: str
+        """
+        return "Executes the sub-actors speculatively on the incoming tokens in a background thread pool, "\
+               + "forwarding the generated output in the original order. "\
+               + "Each thread uses its own copy of the sub-actors, sharing the storage with the flow and "\
+               + "using the values of the flow's variables at the time the data arrived. "\
+               + "Output gets forwarded once the oldest token has been processed or the budget of tokens "\
+               + "in flight/buffered bytes has been exhausted. "\
+               + "The remaining output gets forwarded once the end of the stream has been reached."
+
+    def _define_options(self):
+        """
+        For configuring the options.
+        """
+        super()._define_options()
+        self._option_manager.add(num_threads_option())
+        self._option_manager.add(Option(name="max_tokens", value_type=int, def_value=10, lower=1,
+                                        help="The maximum number of tokens that can be in flight"))
+        self._option_manager.add(Option(name="max_memory", value_type=int, def_value=-1,
+                                        help="The maximum number of bytes of (estimated) output to buffer, ignored if <=0"))
+
+    def _initialize(self):
+        """
+        Initializes the members.
+        """
+        super()._initialize()
+        self._executor = None
+        self._clones = None
+        self._available = None
+        self._in_flight = deque()
+        self._buffer = deque()
+        self._buffered_bytes = 0
+        self._errors = []
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """
+        Resets the state of the actor.
+        """
+        super().reset()
+        self._input = None
+
+    @property
+    def actor_handler_info(self):
+        """
+        Returns meta-info about itself.
+
+        :return: the info
+        :rtype: ActorHandlerInfo
+        """
+        return ActorHandlerInfo(can_contain_standalones=False, can_contain_source=False)
+
+    def input(self, data):
+        """
+        Sets the input data to consume.
+
+        :param data: the data to consume
+        :type data: object
+        """
+        self._input = data
+
+    def accepts(self):
+        """
+        Returns the types that are accepted.
+
+        :return: the list of types
+        :rtype: list
+        """
+        if len(self) == 0:
+            return [Unknown]
+        else:
+            return self.actors[0].accepts()
+
+    def generates(self):
+        """
+        Returns the types that get generated.
+
+        :return: the list of types
+        :rtype: list
+        """
+        if (len(self) > 0) and isinstance(self.actors[-1], OutputProducer):
+            return self.actors[-1].generates()
+        else:
+            return [Unknown]
+
+    def _new_director(self):
+        """
+        Returns the director to use for checking the actors.
+
+        :return: the director
+        :rtype: AbstractDirector
+        """
+        return SequentialDirector(owner=self, allows_standalones=False, requires_source=False, requires_sink=False)
+
+    def _check_actors(self, actors):
+        """
+        Performs checks on the sub-actors.
+
+        :param actors: the actors to check
+        :type actors: list
+        :return: None if successful check, otherwise error message
+        :rtype: str
+        """
+        result = super()._check_actors(actors)
+        if result is None:
+            if len(self.actors) > 0:
+                if not isinstance(self.actors[0], InputConsumer):
+                    result = "First sub-actor does not accept input: %s" % self.actors[0].full_name
+        return result
+
+    def setup(self):
+        """
+        Prepares the actor for use.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        result = super().setup()
+        if result is None:
+            result = self._director.compile(self.actors).check_result
+        if result is None:
+            result = self._start_workers()
+        return result
+
+    def _stop_workers(self):
+        """
+        Shuts down the thread pool and discards the copies of the sub-actors, as well as any buffered output.
+        """
+        super()._stop_workers()
+        self._in_flight.clear()
+        self._buffer.clear()
+        self._buffered_bytes = 0
+
+    def _process(self, token, variables):
+        """
+        Processes the token with one of the available copies of the sub-actors.
+
+        :param token: the token to process
+        :param variables: the variables at the time the token arrived (name -> value)
+        :type variables: dict
+        :return: the tuple of error message (None if successful) and list of (output, estimated bytes) tuples
+        :rtype: tuple
+        """
+        clone = self._available.get()
+        try:
+            msg, output = execute_sub_flow(clone[0], clone[1], token, variables=variables)
+        finally:
+            self._available.put(clone)
+        return msg, self._estimate(output)
+
+    def _estimate(self, output):
+        """
+        Estimates the size of the output items, if there is a memory budget,
+        and accounts for them as buffered.
+
+        :param output: the list of output items
+        :type output: list
+        :return: the list of (output, estimated bytes) tuples
+        :rtype: list
+        """
+        if self.get("max_memory") <= 0:
+            return [(x, 0) for x in output]
+        result = [(x, estimate_size(x)) for x in output]
+        with self._lock:
+            self._buffered_bytes += sum([x[1] for x in result])
+        return result
+
+    def _collect(self, block):
+        """
+        Moves the output of the oldest token into the output buffer, if it has been processed.
+
+        :param block: whether to wait for the oldest token to be processed
+        :type block: bool
+        :return: True if the oldest token was collected
+        :rtype: bool
+        """
+        if len(self._in_flight) == 0:
+            return False
+        if not block and not self._in_flight[0].done():
+            return False
+        self._collect_result(self._in_flight.popleft())
+        return True
+
+    def _collect_result(self, future):
+        """
+        Moves the output of the processed token into the output buffer.
+
+        :param future: the future of the processed token
+        :type future: Future
+        """
+        try:
+            msg, output = future.result()
+        except CancelledError:
+            return
+        if msg is not None:
+            self.log(msg)
+            self._errors.append(msg)
+        self._buffer.extend(output)
+
+    def _do_execute(self):
+        """
+        Performs the actual execution.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        result = self._pop_errors()
+        if len(self.actors) == 0:
+            return result
+        self._in_flight.append(self._submit(self._input))
+        return result
+
+    def _submit(self, token):
+        """
+        Submits the token for processing in the background.
+
+        :param token: the token to process
+        :return: the future of the processing
+        :rtype: Future
+        """
+        # the variables get captured at the time the token arrives
+        return self._executor.submit(self._process, token, self._variable_values())
+
+    def _post_execute(self):
+        """
+        After the actual code got executed.
+        """
+        self._input = None
+        super()._post_execute()
+
+    def _is_budget_exhausted(self):
+        """
+        Returns whether the budget of tokens in flight or buffered bytes has been exhausted.
+
+        :return: True if exhausted
+        :rtype: bool
+        """
+        if len(self._in_flight) >= self.get("max_tokens"):
+            return True
+        max_memory = self.get("max_memory")
+        if max_memory > 0:
+            with self._lock:
+                return self._buffered_bytes >= max_memory
+        return False
+
+    def has_output(self):
+        """
+        Returns whether output data is available.
+
+        :return: true if available
+        :rtype: bool
+        """
+        while (len(self._buffer) == 0) and self._collect(False):
+            pass
+        if len(self._buffer) > 0:
+            return True
+        return (len(self._in_flight) > 0) and self._is_budget_exhausted()
+
+    def output(self):
+        """
+        Returns the next output data, waits for the oldest token to be processed if necessary.
+
+        :return: the data, None if nothing available
+        :rtype: object
+        """
+        while (len(self._buffer) == 0) and self._collect(True):
+            pass
+        if len(self._buffer) == 0:
+            return None
+        result, size = self._buffer.popleft()
+        if size > 0:
+            with self._lock:
+                self._buffered_bytes -= size
+        return result
+
+    def flush(self):
+        """
+        Signals the end of the stream: waits for all the tokens in flight to be processed
+        and flushes the copies of the sub-actors.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        if self._executor is None:
+            return None
+        wait(list(self._in_flight))
+        while self._collect(False):
+            pass
+        if not self.is_stopped:
+            self._flush_workers()
+        return self._pop_errors()
+
+    def _flush_workers(self):
+        """
+        Flushes the copies of the sub-actors, once all tokens have been processed,
+        and buffers their output. Errors get recorded.
+        """
+        if self._clones is None:
+            return
+        for container, collector in self._clones:
+            msg, output = flush_sub_flow(container, collector)
+            if msg is not None:
+                self.log(msg)
+                self._errors.append(msg)
+            self._buffer.extend(self._estimate(output))
+
+    def stop_execution(self):
+        """
+        Stops the actor execution.
+        """
+        for future in self._in_flight:
+            future.cancel()
+        if self._clones is not None:
+            for container, _ in self._clones:
+                container.stop_execution()
+        super().stop_execution()
+
+    def wrap_up(self):
+        """
+        For finishing up the execution.
+        Does not affect graphical output.
+        """
+        self._input = None
+        self._stop_workers()
+        super().wrap_up()
@@ -0,0 +1,280 @@
+import math
+import numpy as np
+from coed.class_utils import class_name_to_type
+from coed.config import Option
+from shallowflow.api.control import MutableActorHandler, ActorHandlerInfo
+from shallowflow.api.actor import InputConsumer, OutputProducer
+from shallowflow.api.compatibility import Unknown
+from shallowflow.api.performance import num_threads_option
+from shallowflow.base.directors import SequentialDirector
+from ._SubFlowCopies import SubFlowCopies
+from ._SubFlowProcess import execute_sub_flow, flush_sub_flow
+
+
+def concatenate(parts):
+    """
+    Concatenates the outputs generated for the chunks. Numpy arrays get concatenated
+    into a single array, otherwise a list gets generated (lists and tuples get expanded).
+
+    :param parts: the outputs, in the order of the chunks
+    :type parts: list
+    :return: the combined output
+    """
+    if (len(parts) > 0) and all([isinstance(x, np.ndarray) for x in parts]):
+        return np.concatenate(parts)
+    result = []
+    for part in parts:
+        if isinstance(part, (list, tuple, np.ndarray)):
+            result.extend(part)
+        else:
+            result.append(part)
+    return result
+
+
+class ScatterGather(MutableActorHandler, InputConsumer, OutputProducer, SubFlowCopies):
+    """
+    Splits the incoming list/array into chunks, executes the sub-actors on the chunks in parallel
+    and combines the output into a single token.
+    """
+
+    def description(self):
+        """
+        Returns a description for the object.
+
+        :return: the object description
+        :rtype: str
+        """
+        return "Splits the incoming list, tuple or array into chunks, executes the sub-actors on the chunks "\
+               + "in parallel and combines their output (in the order of the chunks) into a single token. "\
+               + "Each thread uses its own copy of the sub-actors, sharing the storage with the flow and "\
+               + "using the values of the flow's variables at the time the data arrived. "\
+               + "By default, the output gets concatenated (arrays into an array, everything else into a list); "\
+               + "a custom function that takes the list of outputs and returns the combined token can be "\
+               + "supplied instead via its dotted path (e.g., 'mymodule.combine')."
+
+    def _define_options(self):
+        """
+        For configuring the options.
+        """
+        super()._define_options()
+        self._option_manager.add(num_threads_option())
+        self._option_manager.add(Option(name="chunk_size", value_type=int, def_value=-1,
+                                        help="The maximum number of items per chunk; if <=0, the data gets split evenly across the threads"))
+        self._option_manager.add(Option(name="combine", value_type=str, def_value="",
+                                        help="The dotted path of the function for combining the list of outputs into a single token (module.function); concatenates if empty"))
+
+    def _initialize(self):
+        """
+        Initializes the members.
+        """
+        super()._initialize()
+        self._executor = None
+        self._clones = None
+        self._available = None
+        self._errors = []
+        self._combine = None
+
+    def reset(self):
+        """
+        Resets the state of the actor.
+        """
+        super().reset()
+        self._input = None
+        self._output = []
+
+    @property
+    def actor_handler_info(self):
+        """
+        Returns meta-info about itself.
+
+        :return: the info
+        :rtype: ActorHandlerInfo
+        """
+        return ActorHandlerInfo(can_contain_standalones=False, can_contain_source=False)
+
+    def input(self, data):
+        """
+        Sets the input data to consume.
+
+        :param data: the data to consume
+        :type data: object
+        """
+        self._input = data
+
+    def accepts(self):
+        """
+        Returns the types that are accepted.
+
+        :return: the list of types
+        :rtype: list
+        """
+        return [list, tuple, np.ndarray]
+
+    def generates(self):
+        """
+        Returns the types that get generated.
+
+        :return: the list of types
+        :rtype: list
+        """
+        return [Unknown]
+
+    def _new_director(self):
+        """
+        Returns the director to use for checking the actors.
+
+        :return: the director
+        :rtype: AbstractDirector
+        """
+        return SequentialDirector(owner=self, allows_standalones=False, requires_source=False, requires_sink=False)
+
+    def _check_actors(self, actors):
+        """
+        Performs checks on the sub-actors.
+
+        :param actors: the actors to check
+        :type actors: list
+        :return: None if successful check, otherwise error message
+        :rtype: str
+        """
+        result = super()._check_actors(actors)
+        if result is None:
+            if len(self.actors) > 0:
+                if not isinstance(self.actors[0], InputConsumer):
+                    result = "First sub-actor does not accept input: %s" % self.actors[0].full_name
+                elif not isinstance(self.actors[-1], OutputProducer):
+                    result = "Last sub-actor does not generate output: %s" % self.actors[-1].full_name
+        return result
+
+    def setup(self):
+        """
+        Prepares the actor for use.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        result = super().setup()
+        if result is None:
+            result = self._director.compile(self.actors).check_result
+        if result is None:
+            self._combine = concatenate
+            if len(self.get("combine")) > 0:
+                try:
+                    self._combine = class_name_to_type(self.get("combine"))
+                except Exception:
+                    result = self._handle_exception("Failed to locate combine function: %s" % self.get("combine"))
+        if result is None:
+            result = self._start_workers()
+        return result
+
+    def _split(self, data):
+        """
+        Splits the data into chunks.
+
+        :param data: the list, tuple or array to split
+        :return: the list of chunks
+        :rtype: list
+        """
+        chunk_size = self.get("chunk_size")
+        if chunk_size <= 0:
+            chunk_size = max(1, int(math.ceil(len(data) / len(self._clones))))
+        return [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+
+    def _process(self, chunk, variables):
+        """
+        Processes the chunk with one of the available copies of the sub-actors.
+        Each chunk is a complete stream, i.e., the copy gets flushed afterwards.
+
+        :param chunk: the chunk to process
+        :param variables: the variables at the time the data arrived (name -> value)
+        :type variables: dict
+        :return: the tuple of error message (None if successful) and list of generated output
+        :rtype: tuple
+        """
+        if self.is_stopped:
+            return None, []
+        clone = self._available.get()
+        try:
+            msg, output = execute_sub_flow(clone[0], clone[1], chunk, variables=variables)
+            if msg is None:
+                msg, flushed = flush_sub_flow(clone[0], clone[1])
+                output.extend(flushed)
+            return msg, output
+        finally:
+            self._available.put(clone)
+
+    def _do_execute(self):
+        """
+        Performs the actual execution.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        if len(self.actors) == 0:
+            return None
+        if not isinstance(self._input, (list, tuple, np.ndarray)):
+            return "Expected list, tuple or array, but received: %s" % str(type(self._input))
+        variables = self._variable_values()
+        futures = [self._executor.submit(self._process, x, variables) for x in self._split(self._input)]
+        errors = []
+        parts = []
+        for future in futures:
+            msg, output = future.result()
+            if msg is not None:
+                errors.append(msg)
+            parts.extend(output)
+        if len(errors) > 0:
+            return "\n".join(errors)
+        if self.is_stopped:
+            return None
+        try:
+            self._output.append(self._combine(parts))
+        except Exception:
+            return self._handle_exception("Failed to combine output of %d chunk(s)!" % len(futures))
+        return None
+
+    def _post_execute(self):
+        """
+        After the actual code got executed.
+        """
+        self._input = None
+        super()._post_execute()
+
+    def has_output(self):
+        """
+        Returns whether output data is available.
+
+        :return: true if available
+        :rtype: bool
+        """
+        return len(self._output) > 0
+
+    def output(self):
+        """
+        Returns the next output data.
+
+        :return: the data, None if nothing available
+        :rtype: object
+        """
+        if len(self._output) > 0:
+            return self._output.pop(0)
+        else:
+            return None
+
+    def stop_execution(self):
+        """
+        Stops the actor execution.
+        """
+        if self._clones is not None:
+            for container, _ in self._clones:
+                container.stop_execution()
+        super().stop_execution()
+
+    def wrap_up(self):
+        """
+        For finishing up the execution.
+        Does not affect graphical output.
+        """
+        self._input = None
+        self._stop_workers()
+        super().wrap_up()
@@ -1,12 +1,13 @@
 from shallowflow.api.actor import InputConsumer
 from shallowflow.api.control import MutableActorHandler, ActorHandlerInfo
 from shallowflow.api.compatibility import Unknown
-from shallowflow.base.directors import SequentialDirector
+from shallowflow.base.directors import PipelinedDirector, Flushable, pipelined_option, queue_size_option
+from shallowflow.base.variables import ReappliesOptions
 
 STATE_INPUT = "input"
 
 
-class Sequence(MutableActorHandler, InputConsumer):
+class Sequence(MutableActorHandler, InputConsumer, Flushable, ReappliesOptions):
     """
     Executes the sub-actors one after the other, with the output of an actor being the input for the next; the first actor must accept input.
     """
@@ -20,6 +21,14 @@ class Sequence(MutableActorHandler, InputConsumer):
         """
         return "Executes the sub-actors one after the other, with the output of an actor being the input for the next; the first actor must accept input."
 
+    def _define_options(self):
+        """
+        For configuring the options.
+        """
+        super()._define_options()
+        self._option_manager.add(pipelined_option())
+        self._option_manager.add(queue_size_option())
+
     def reset(self):
         """
         Resets the state of the actor.
@@ -70,6 +79,37 @@ class Sequence(MutableActorHandler, InputConsumer):
             del state[STATE_INPUT]
         super()._restore_state(state)
 
+    def setup(self):
+        """
+        Prepares the actor for use.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        result = super().setup()
+        if result is None:
+            self._director.compile(self.actors)
+        return result
+
+    @property
+    def reapplied_options(self):
+        """
+        Returns the names of the options that get refreshed by reapply_options.
+
+        :return: the option names
+        :rtype: list
+        """
+        return []
+
+    def reapply_options(self):
+        """
+        Refreshes the state derived from the options after variables that they reference have changed.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        return None
+
     def _new_director(self):
         """
         Returns the director to use for executing the actors.
@@ -77,7 +117,7 @@ class Sequence(MutableActorHandler, InputConsumer):
         :return: the director
         :rtype: AbstractDirector
         """
-        return SequentialDirector(owner=self, allows_standalones=False, requires_source=False, requires_sink=False)
+        return PipelinedDirector(owner=self, allows_standalones=False, requires_source=False, requires_sink=False)
 
     def accepts(self):
         """
@@ -102,3 +142,14 @@ class Sequence(MutableActorHandler, InputConsumer):
         if len(self.actors) > 0:
             self.actors[0].input(self._input)
         return result
+
+    def flush(self):
+        """
+        Signals the end of the stream: flushes the sub-actors.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        if len(self.actors) == 0:
+            return None
+        return self._director.flush(self.actors)
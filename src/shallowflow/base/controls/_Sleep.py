@@ -2,6 +2,7 @@ from time import sleep
 from coed.config import Option
 from shallowflow.api.transformer import AbstractSimpleTransformer
 from shallowflow.api.compatibility import Unknown
+from shallowflow.base.options import snapshot_options
 
 
 class Sleep(AbstractSimpleTransformer):
@@ -26,6 +27,13 @@ class Sleep(AbstractSimpleTransformer):
         self._option_manager.add(Option(name="seconds", value_type=float, def_value=1.0, lower=0.0,
                                         help="The number of seconds to wait"))
 
+    def _initialize(self):
+        """
+        Initializes the members.
+        """
+        super()._initialize()
+        self._opts = None
+
     def accepts(self):
         """
         Returns the types that are accepted.
@@ -44,6 +52,18 @@ class Sleep(AbstractSimpleTransformer):
         """
         return [Unknown]
 
+    def setup(self):
+        """
+        Prepares the actor for use.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        result = super().setup()
+        if result is None:
+            self._opts = snapshot_options(self)
+        return result
+
     def _do_execute(self):
         """
         Performs the actual execution.
@@ -51,7 +71,7 @@ class Sleep(AbstractSimpleTransformer):
         :return: None if successful, otherwise error message
         :rtype: str
         """
-        seconds = self.get("seconds")
+        seconds = self._opts.seconds
         if seconds > 0:
             sleep(seconds)
         self._output.append(self._input)
@@ -1,9 +1,10 @@
 from coed.config import Option
 from shallowflow.api.sink import AbstractSimpleSink
 from shallowflow.api.compatibility import Unknown
+from shallowflow.base.variables import ExpandsVariables, compile_template
 
 
-class Stop(AbstractSimpleSink):
+class Stop(AbstractSimpleSink, ExpandsVariables):
     """
     Stops the flow.
     """
@@ -25,6 +26,16 @@ class Stop(AbstractSimpleSink):
         self._option_manager.add(Option(name="message", value_type=str, def_value="",
                                         help="The optional message to output; variables get expanded"))
 
+    @property
+    def expanded_options(self):
+        """
+        Returns the names of the options whose variables get expanded at execution time.
+
+        :return: the option names
+        :rtype: list
+        """
+        return ["message"]
+
     def accepts(self):
         """
         Returns the types that are accepted.
@@ -34,6 +45,25 @@ class Stop(AbstractSimpleSink):
         """
         return [Unknown]
 
+    def _initialize(self):
+        """
+        Initializes the members.
+        """
+        super()._initialize()
+        self._message = None
+
+    def setup(self):
+        """
+        Prepares the actor for use.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        result = super().setup()
+        if result is None:
+            self._message = compile_template(self.get("message"))
+        return result
+
     def _do_execute(self):
         """
         Performs the actual execution.
@@ -41,7 +71,7 @@ class Stop(AbstractSimpleSink):
         :return: None if successful, otherwise error message
         :rtype: str
         """
-        msg = self.variables.expand(self.get("message"))
+        msg = self._message.render(self.variables)
         if len(msg) > 0:
             self.log(msg)
         if self.root is not None:
@@ -0,0 +1,129 @@
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+from coed.config import optionhandler_to_dict, dict_to_optionhandler
+from shallowflow.api.performance import actual_num_threads
+from shallowflow.api.storage import StorageHandler
+from ._SubFlowProcess import new_sub_flow
+
+
+class SubFlowCopies(object):
+    """
+    Mixin for actor handlers that execute copies of their sub-actors in background threads,
+    each copy being a sub-flow with its own variables. Like with worker processes, the current
+    values of the flow's variables get captured when a token gets submitted (see _variable_values)
+    and applied to the copy before it processes the token.
+    The actor handler needs to initialize the member _errors, as well as _executor, _clones
+    and _available when using the thread pool of _start_workers.
+    """
+
+    def _find_storage(self):
+        """
+        Locates the storage of the flow.
+
+        :return: the storage, None if not available
+        :rtype: Storage
+        """
+        handler = self.parent
+        while handler is not None:
+            if isinstance(handler, StorageHandler):
+                return handler.storage
+            handler = handler.parent
+        return None
+
+    def _copy_actors(self, num, storage=None):
+        """
+        Creates the specified number of copies of the (non-skipped) sub-actors and sets them up.
+        Each copy gets initialized with the current values of the variables.
+
+        :param num: the number of copies to create
+        :type num: int
+        :param storage: the storage to share, each copy uses its own storage if None
+        :type storage: Storage
+        :return: the tuple of the list of (container, collector) tuples and error message (None if successful)
+        :rtype: tuple
+        """
+        result = []
+        try:
+            actor_dicts = [optionhandler_to_dict(x) for x in self.actors if not x.is_skipped]
+        except Exception:
+            return result, self._handle_exception("Failed to serialize sub-actors!")
+        variables = self._variable_values()
+        for i in range(num):
+            try:
+                actors = [dict_to_optionhandler(x) for x in actor_dicts]
+            except Exception:
+                return result, self._handle_exception("Failed to copy sub-actors!")
+            container, collector, msg = new_sub_flow(actors, variables=variables, storage=storage)
+            result.append((container, collector))
+            if msg is not None:
+                return result, "Failed to set up copy of sub-actors: %s" % msg
+        return result, None
+
+    def _discard_copies(self, copies):
+        """
+        Wraps up and cleans up the copies of the sub-actors.
+
+        :param copies: the list of (container, collector) tuples
+        :type copies: list
+        """
+        for container, _ in copies:
+            container.wrap_up()
+            container.clean_up()
+
+    def _variable_values(self):
+        """
+        Returns the current values of the variables, e.g., for applying them to the copies
+        of the sub-actors or sending them to worker processes.
+
+        :return: the variables (name -> value)
+        :rtype: dict
+        """
+        result = dict()
+        for k in self.variables.keys():
+            result[k] = self.variables.get(k)
+        return result
+
+    def _start_workers(self):
+        """
+        Creates a copy of the sub-actors for each thread, sharing the storage of the flow,
+        and starts the thread pool.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        self._stop_workers()
+        num_threads = actual_num_threads(self.get("num_threads"))
+        self._clones, msg = self._copy_actors(num_threads, storage=self._find_storage())
+        if msg is not None:
+            return msg
+        self._available = Queue()
+        for clone in self._clones:
+            self._available.put(clone)
+        self._executor = ThreadPoolExecutor(max_workers=num_threads,
+                                            thread_name_prefix="shallowflow-" + type(self).__name__.lower())
+        return None
+
+    def _stop_workers(self):
+        """
+        Shuts down the thread pool and discards the copies of the sub-actors.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        if self._clones is not None:
+            self._discard_copies(self._clones)
+            self._clones = None
+        self._available = None
+
+    def _pop_errors(self):
+        """
+        Returns the errors that were encountered in the background and clears them.
+
+        :return: None if no errors, otherwise error message
+        :rtype: str
+        """
+        if len(self._errors) == 0:
+            return None
+        result = "\n".join(self._errors)
+        self._errors = []
+        return result
@@ -0,0 +1,474 @@
+import logging
+import multiprocessing
+import time
+import traceback
+from coed.config import optionhandler_to_dict, dict_to_optionhandler
+from coed.vars import Variables
+from shallowflow.api.actor import OutputProducer
+from shallowflow.api.sink import AbstractSimpleSink
+from shallowflow.api.storage import StorageHandler
+from shallowflow.base.storage import ShardedStorage
+from shallowflow.base.variables import TypedVariables
+from shallowflow.api.compatibility import Unknown
+from ._Sequence import Sequence
+
+# the number of seconds to wait for a result before checking whether to abandon waiting
+POLL_INTERVAL = 0.1
+
+MSG_READY = "ready"
+MSG_TOKEN = "token"
+MSG_FLUSH = "flush"
+MSG_RESULT = "result"
+MSG_STOP = "stop"
+MSG_STORAGE = "storage"
+
+
+class SubFlowContainer(Sequence, StorageHandler):
+    """
+    Sequence with its own storage, for executing a sub-flow in isolation.
+    """
+
+    def description(self):
+        """
+        Returns a description for the object.
+
+        :return: the object description
+        :rtype: str
+        """
+        return "Sequence with its own storage, for executing a sub-flow in isolation."
+
+    def _initialize(self):
+        """
+        Initializes the members.
+        """
+        super()._initialize()
+        self._storage = ShardedStorage()
+
+    @property
+    def storage(self):
+        """
+        Returns the storage.
+
+        :return: the storage
+        :rtype: Storage
+        """
+        return self._storage
+
+    @storage.setter
+    def storage(self, storage):
+        """
+        Sets the storage to use, e.g., for sharing the storage of the flow.
+
+        :param storage: the storage
+        :type storage: Storage
+        """
+        self._storage = storage
+
+
+class OutputCollector(AbstractSimpleSink):
+    """
+    Collects all the data that it receives.
+    """
+
+    def description(self):
+        """
+        Returns a description for the object.
+
+        :return: the object description
+        :rtype: str
+        """
+        return "Collects all the data that it receives."
+
+    def reset(self):
+        """
+        Resets the state of the actor.
+        """
+        super().reset()
+        self.collected = []
+
+    def accepts(self):
+        """
+        Returns the types that are accepted.
+
+        :return: the list of types
+        :rtype: list
+        """
+        return [Unknown]
+
+    def _do_execute(self):
+        """
+        Performs the actual execution.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        self.collected.append(self._input)
+        return None
+
+
+def new_sub_flow(actors, variables=None, storage=None):
+    """
+    Creates a new sub-flow container for the (unmanaged) actors and sets it up.
+    If the last actor generates output, an OutputCollector gets appended.
+
+    :param actors: the actors to manage
+    :type actors: list
+    :param variables: the variables to initialize the sub-flow with (name -> value) or the Variables instance to share
+    :type variables: dict or Variables
+    :param storage: the storage to share, uses its own storage if None
+    :type storage: Storage
+    :return: the tuple of container, collector (None if last actor does not generate output) and setup error message
+    :rtype: tuple
+    """
+    collector = None
+    actors = list(actors)
+    if (len(actors) > 0) and isinstance(actors[-1], OutputProducer):
+        collector = OutputCollector()
+        actors.append(collector)
+    container = SubFlowContainer().manage(actors)
+    if isinstance(variables, Variables):
+        container.update_variables(variables)
+    elif variables is not None:
+        container.update_variables(TypedVariables())
+        for k in variables:
+            container.variables.set(k, variables[k])
+    if storage is not None:
+        container.storage = storage
+    msg = container.setup()
+    return container, collector, msg
+
+
+def update_sub_flow_variables(container, variables):
+    """
+    Updates the variables of the sub-flow with the supplied values, only variables
+    whose values differ get set (i.e., only affected actors get re-applied).
+
+    :param container: the sub-flow to update
+    :type container: SubFlowContainer
+    :param variables: the variables (name -> value)
+    :type variables: dict
+    """
+    current = container.variables
+    for k in variables:
+        if (not current.has(k)) or (current.get(k) != variables[k]):
+            current.set(k, variables[k])
+
+
+def execute_sub_flow(container, collector, token, variables=None):
+    """
+    Executes the sub-flow with the specified token.
+
+    :param container: the sub-flow to execute
+    :type container: SubFlowContainer
+    :param collector: the collector for the output, can be None
+    :type collector: OutputCollector
+    :param token: the input token
+    :param variables: the variables to apply before the execution (name -> value), ignored if None
+    :type variables: dict
+    :return: the tuple of error message (None if successful) and list of generated output
+    :rtype: tuple
+    """
+    if variables is not None:
+        update_sub_flow_variables(container, variables)
+    container.input(token)
+    try:
+        msg = container.execute()
+    except Exception:
+        msg = "Failed to execute sub-flow:\n%s" % traceback.format_exc()
+    output = []
+    if collector is not None:
+        output = collector.collected
+        collector.collected = []
+    return msg, output
+
+
+def flush_sub_flow(container, collector):
+    """
+    Flushes the sub-flow at the end of the stream.
+
+    :param container: the sub-flow to flush
+    :type container: SubFlowContainer
+    :param collector: the collector for the output, can be None
+    :type collector: OutputCollector
+    :return: the tuple of error message (None if successful) and list of generated output
+    :rtype: tuple
+    """
+    try:
+        msg = container.flush()
+    except Exception:
+        msg = "Failed to flush sub-flow:\n%s" % traceback.format_exc()
+    output = []
+    if collector is not None:
+        output = collector.collected
+        collector.collected = []
+    return msg, output
+
+
+class _LogCollector(logging.Handler):
+    """
+    Records the log messages in the worker process, to be sent back to the parent.
+    """
+
+    def __init__(self):
+        """
+        Initializes the handler.
+        """
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        """
+        Records the log record.
+
+        :param record: the record to add
+        :type record: logging.LogRecord
+        """
+        self.records.append((record.name, record.levelno, record.getMessage()))
+
+    def flush_records(self):
+        """
+        Returns the recorded messages and clears the buffer.
+
+        :return: the list of (logger name, level, message) tuples
+        :rtype: list
+        """
+        result = self.records
+        self.records = []
+        return result
+
+
+def _worker_main(conn, actor_dicts):
+    """
+    The main method of the worker process: deserializes the actors, sets them up
+    and executes them whenever a token arrives.
+
+    :param conn: the connection to the parent process
+    :type conn: multiprocessing.connection.Connection
+    :param actor_dicts: the serialized actors of the sub-flow
+    :type actor_dicts: list
+    """
+    log_collector = _LogCollector()
+    logging.getLogger().addHandler(log_collector)
+    container = None
+    collector = None
+    try:
+        actors = [dict_to_optionhandler(x) for x in actor_dicts]
+        container, collector, msg = new_sub_flow(actors, variables=dict())
+    except Exception:
+        msg = "Failed to create sub-flow:\n%s" % traceback.format_exc()
+    conn.send((MSG_READY, msg, log_collector.flush_records()))
+    if msg is not None:
+        conn.close()
+        return
+
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request[0] == MSG_STOP:
+            break
+        if request[0] == MSG_STORAGE:
+            try:
+                items = dict()
+                for k in container.storage.keys():
+                    items[k] = container.storage.get(k)
+                conn.send((MSG_STORAGE, None, items))
+            except Exception:
+                conn.send((MSG_STORAGE, "Failed to send storage back:\n%s" % traceback.format_exc(), dict()))
+            continue
+        start = time.perf_counter()
+        if request[0] == MSG_FLUSH:
+            msg, output = flush_sub_flow(container, collector)
+        else:
+            _, token, variables = request
+            msg, output = execute_sub_flow(container, collector, token, variables=variables)
+        duration = time.perf_counter() - start
+        try:
+            conn.send((MSG_RESULT, msg, output, log_collector.flush_records(), duration))
+        except Exception:
+            conn.send((MSG_RESULT, "Failed to send output back:\n%s" % traceback.format_exc(), [], log_collector.flush_records(), duration))
+
+    container.wrap_up()
+    container.clean_up()
+    conn.close()
+
+
+class SubFlowProcess(object):
+    """
+    Worker process that holds a deserialized copy of a sub-flow and executes it
+    for each token that it receives. Errors and log messages get sent back to the parent.
+    """
+
+    def __init__(self, actors, name=None):
+        """
+        Initializes the worker, serializes the actors.
+
+        :param actors: the actors making up the sub-flow
+        :type actors: list
+        :param name: the name for the process
+        :type name: str
+        """
+        self._actor_dicts = [optionhandler_to_dict(x) for x in actors]
+        self._name = name
+        self._process = None
+        self._conn = None
+        self._variables = None
+        self._pending = 0
+        self._last_duration = None
+
+    @property
+    def name(self):
+        """
+        Returns the name of the worker.
+
+        :return: the name
+        :rtype: str
+        """
+        return self._name
+
+    @property
+    def is_running(self):
+        """
+        Returns whether the process is running.
+
+        :return: True if running
+        :rtype: bool
+        """
+        return (self._process is not None) and self._process.is_alive()
+
+    @property
+    def last_duration(self):
+        """
+        Returns the time that the worker process spent on executing the sub-flow for the last result.
+
+        :return: the duration in seconds, None if no result received yet
+        :rtype: float
+        """
+        return self._last_duration
+
+    def _relay_logs(self, records):
+        """
+        Re-emits the log messages received from the worker process.
+
+        :param records: the list of (logger name, level, message) tuples
+        :type records: list
+        """
+        for name, level, msg in records:
+            logging.getLogger(name).log(level, "[%s] %s" % (self._name, msg))
+
+    def start(self):
+        """
+        Starts the worker process and waits for the sub-flow to be set up.
+
+        :return: None if successfully started, otherwise error message
+        :rtype: str
+        """
+        self._conn, child_conn = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=_worker_main, args=(child_conn, self._actor_dicts),
+                                                name=self._name, daemon=True)
+        self._process.start()
+        child_conn.close()
+        try:
+            _, msg, records = self._conn.recv()
+            self._relay_logs(records)
+        except EOFError:
+            msg = "Worker process terminated prematurely: %s" % self._name
+        if msg is not None:
+            self.stop()
+        return msg
+
+    def submit(self, token, variables=None):
+        """
+        Sends the token to the worker process for processing.
+
+        :param token: the token to process
+        :param variables: the current variables (name -> value), only get sent if they changed
+        :type variables: dict
+        """
+        if variables == self._variables:
+            variables = None
+        else:
+            self._variables = variables
+        self._conn.send((MSG_TOKEN, token, variables))
+        self._pending += 1
+
+    def flush(self, is_stopped=None):
+        """
+        Signals the end of the stream to the sub-flow and waits for it to be flushed.
+
+        :param is_stopped: the callable that returns whether to abandon waiting
+        :return: the tuple of error message (None if successful) and list of generated output
+        :rtype: tuple
+        """
+        self._conn.send((MSG_FLUSH,))
+        self._pending += 1
+        return self.result(is_stopped=is_stopped)
+
+    def result(self, is_stopped=None):
+        """
+        Waits for the result of the last token that was submitted.
+
+        :param is_stopped: the callable that returns whether to abandon waiting
+        :return: the tuple of error message (None if successful) and list of generated output
+        :rtype: tuple
+        """
+        msg = None
+        output = []
+        # results of tokens that were abandoned get discarded
+        while self._pending > 0:
+            while not self._conn.poll(POLL_INTERVAL):
+                if (is_stopped is not None) and is_stopped():
+                    return None, []
+                if not self._process.is_alive():
+                    return "Worker process terminated prematurely: %s" % self._name, []
+            try:
+                _, msg, output, records, self._last_duration = self._conn.recv()
+            except EOFError:
+                return "Worker process terminated prematurely: %s" % self._name, []
+            self._pending -= 1
+            self._relay_logs(records)
+        return msg, output
+
+    def get_storage(self, is_stopped=None):
+        """
+        Waits for any pending results and retrieves the content of the storage of the sub-flow.
+
+        :param is_stopped: the callable that returns whether to abandon waiting
+        :return: the tuple of error message (None if successful) and the storage items (name -> value)
+        :rtype: tuple
+        """
+        self.result(is_stopped=is_stopped)
+        if self._pending > 0:
+            return "Abandoned waiting for pending results: %s" % self._name, dict()
+        if not self.is_running:
+            return "Worker process not running: %s" % self._name, dict()
+        self._conn.send((MSG_STORAGE,))
+        try:
+            _, msg, items = self._conn.recv()
+        except EOFError:
+            return "Worker process terminated prematurely: %s" % self._name, dict()
+        return msg, items
+
+    def stop(self, timeout=5.0):
+        """
+        Stops the worker process.
+
+        :param timeout: the number of seconds to wait for the process to finish before terminating it
+        :type timeout: float
+        """
+        if self._process is None:
+            return
+        try:
+            self._conn.send((MSG_STOP,))
+        except Exception:
+            pass
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join()
+        self._conn.close()
+        self._process = None
+        self._conn = None
+        self._variables = None
+        self._pending = 0
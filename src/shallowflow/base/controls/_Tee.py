@@ -4,13 +4,15 @@ from coed.config import Option
 from shallowflow.api.control import MutableActorHandler, ActorHandlerInfo
 from shallowflow.api.transformer import InputConsumer, OutputProducer
 from shallowflow.api.compatibility import Unknown
-from shallowflow.base.directors import SequentialDirector
-from shallowflow.base.conditions import AlwaysTrue
+from shallowflow.api.container import AbstractContainer
+from shallowflow.base.directors import PipelinedDirector, Flushable, pipelined_option, queue_size_option
+from shallowflow.base.conditions import AlwaysTrue, NumExpr, select_masked, compile_condition
+from shallowflow.base.variables import ReappliesOptions
 
 STATE_INPUT = "input"
 
 
-class AbstractTee(MutableActorHandler, InputConsumer, OutputProducer, abc.ABC):
+class AbstractTee(MutableActorHandler, InputConsumer, OutputProducer, ReappliesOptions, abc.ABC):
     """
     Ancestor for Tee-like control actors.
     """
@@ -65,6 +67,25 @@ class AbstractTee(MutableActorHandler, InputConsumer, OutputProducer, abc.ABC):
         """
         return [Unknown]
 
+    @property
+    def reapplied_options(self):
+        """
+        Returns the names of the options that get refreshed by reapply_options.
+
+        :return: the option names
+        :rtype: list
+        """
+        return []
+
+    def reapply_options(self):
+        """
+        Refreshes the state derived from the options after variables that they reference have changed.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        return None
+
     def generates(self):
         """
         Returns the types that get generated.
@@ -154,7 +175,7 @@ class AbstractTee(MutableActorHandler, InputConsumer, OutputProducer, abc.ABC):
         super().wrap_up()
 
 
-class Tee(AbstractTee):
+class Tee(AbstractTee, Flushable):
     """
     Forwards the incoming data to the defined sub-flow before forwarding it.
     """
@@ -168,6 +189,26 @@ class Tee(AbstractTee):
         """
         return "Forwards the incoming data to the defined sub-flow before forwarding it."
 
+    def _define_options(self):
+        """
+        For configuring the options.
+        """
+        super()._define_options()
+        self._option_manager.add(pipelined_option())
+        self._option_manager.add(queue_size_option())
+
+    def setup(self):
+        """
+        Prepares the actor for use.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        result = super().setup()
+        if result is None:
+            self._director.compile(self.actors)
+        return result
+
     def _new_director(self):
         """
         Returns the director to use for executing the actors.
@@ -175,7 +216,7 @@ class Tee(AbstractTee):
         :return: the director
         :rtype: AbstractDirector
         """
-        return SequentialDirector(owner=self, allows_standalones=False, requires_source=False, requires_sink=False)
+        return PipelinedDirector(owner=self, allows_standalones=False, requires_source=False, requires_sink=False)
 
     @property
     def actor_handler_info(self):
@@ -229,6 +270,17 @@ class Tee(AbstractTee):
             self._output = self._input
         return result
 
+    def flush(self):
+        """
+        Signals the end of the stream: flushes the sub-actors.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        if len(self.actors) == 0:
+            return None
+        return self._director.flush(self.actors)
+
 
 class ConditionalTee(Tee):
     """
@@ -250,6 +302,14 @@ class ConditionalTee(Tee):
         """
         super()._define_options()
         self._option_manager.add(Option("condition", AbstractBooleanCondition, AlwaysTrue(), "The boolean condition to use"))
+        self._option_manager.add(Option("split_batches", bool, False, "If enabled and the condition is a NumExpr condition in array mode, only the elements of arrays/lists that satisfy the condition get forwarded to the sub-flow"))
+
+    def _initialize(self):
+        """
+        Initializes the members.
+        """
+        super()._initialize()
+        self._condition = None
 
     def setup(self):
         """
@@ -261,8 +321,44 @@ class ConditionalTee(Tee):
         result = super().setup()
         if result is None:
             self.get("condition").flow_context = self
+            self._condition = compile_condition(self.get("condition"), self)
         return result
 
+    @property
+    def reapplied_options(self):
+        """
+        Returns the names of the options that get refreshed by reapply_options.
+
+        :return: the option names
+        :rtype: list
+        """
+        return super().reapplied_options + ["condition", "split_batches"]
+
+    def reapply_options(self):
+        """
+        Refreshes the state derived from the options after variables that they reference have changed,
+        i.e., compiles the condition again.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        result = super().reapply_options()
+        if result is None:
+            self.get("condition").flow_context = self
+            self._condition = compile_condition(self.get("condition"), self)
+        return result
+
+    def _can_split(self):
+        """
+        Returns whether the input can be split using an element-wise mask.
+
+        :return: True if the input can be split
+        :rtype: bool
+        """
+        condition = self.get("condition")
+        return self.get("split_batches") and isinstance(condition, NumExpr) and condition.get("array_mode") \
+            and not isinstance(self._input, AbstractContainer)
+
     def _can_execute_actors(self):
         """
         Returns whether the sub-actors can be executed.
@@ -272,5 +368,14 @@ class ConditionalTee(Tee):
         """
         result = super()._can_execute_actors()
         if result:
-            result = self.get("condition").evaluate(self._input)
+            if self._can_split():
+                mask = self.get("condition").evaluate_mask(self._input)
+                if mask.ndim == 0:
+                    result = bool(mask)
+                else:
+                    result = bool(mask.any())
+                    if result:
+                        self.actors[0].input(select_masked(self._input, mask))
+            else:
+                result = self._condition(self._input)
         return result
@@ -3,8 +3,8 @@ from coed.config import Option
 from shallowflow.api.control import ActorHandlerInfo
 from shallowflow.api.compatibility import Unknown
 from shallowflow.api.transformer import InputConsumer
-from shallowflow.base.directors import SequentialDirector
-from shallowflow.base.conditions import AlwaysTrue
+from shallowflow.base.directors import PipelinedDirector, pipelined_option, queue_size_option
+from shallowflow.base.conditions import AlwaysTrue, compile_condition
 from shallowflow.base.controls import AbstractTee
 
 
@@ -22,6 +22,26 @@ class Trigger(AbstractTee):
         """
         return "Executes the sub-flow whenever data arrives before forwarding it."
 
+    def _define_options(self):
+        """
+        For configuring the options.
+        """
+        super()._define_options()
+        self._option_manager.add(pipelined_option())
+        self._option_manager.add(queue_size_option())
+
+    def setup(self):
+        """
+        Prepares the actor for use.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        result = super().setup()
+        if result is None:
+            self._director.compile(self.actors)
+        return result
+
     def _new_director(self):
         """
         Returns the director to use for executing the actors.
@@ -29,7 +49,7 @@ class Trigger(AbstractTee):
         :return: the director
         :rtype: AbstractDirector
         """
-        return SequentialDirector(owner=self, allows_standalones=True, requires_source=True, requires_sink=False)
+        return PipelinedDirector(owner=self, allows_standalones=True, requires_source=True, requires_sink=False)
 
     @property
     def actor_handler_info(self):
@@ -111,6 +131,13 @@ class ConditionalTrigger(Trigger):
         super()._define_options()
         self._option_manager.add(Option("condition", AbstractBooleanCondition, AlwaysTrue(), "The boolean condition to use"))
 
+    def _initialize(self):
+        """
+        Initializes the members.
+        """
+        super()._initialize()
+        self._condition = None
+
     def setup(self):
         """
         Prepares the actor for use.
@@ -121,6 +148,31 @@ class ConditionalTrigger(Trigger):
         result = super().setup()
         if result is None:
             self.get("condition").flow_context = self
+            self._condition = compile_condition(self.get("condition"), self)
+        return result
+
+    @property
+    def reapplied_options(self):
+        """
+        Returns the names of the options that get refreshed by reapply_options.
+
+        :return: the option names
+        :rtype: list
+        """
+        return super().reapplied_options + ["condition"]
+
+    def reapply_options(self):
+        """
+        Refreshes the state derived from the options after variables that they reference have changed,
+        i.e., compiles the condition again.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        result = super().reapply_options()
+        if result is None:
+            self.get("condition").flow_context = self
+            self._condition = compile_condition(self.get("condition"), self)
         return result
 
     def _can_execute_actors(self):
@@ -132,5 +184,5 @@ class ConditionalTrigger(Trigger):
         """
         result = super()._can_execute_actors()
         if result:
-            result = self.get("condition").evaluate(self._input)
+            result = self._condition(self._input)
         return result
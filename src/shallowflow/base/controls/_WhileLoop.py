@@ -4,12 +4,13 @@ from coed.config import Option
 from shallowflow.api.condition import AbstractBooleanCondition
 from shallowflow.api.compatibility import Unknown
 from shallowflow.base.directors import SequentialDirector
-from shallowflow.base.conditions import AlwaysTrue
+from shallowflow.base.conditions import AlwaysTrue, compile_condition
+from shallowflow.base.variables import ReappliesOptions
 
 STATE_INPUT = "input"
 
 
-class WhileLoop(MutableActorHandler, InputConsumer):
+class WhileLoop(MutableActorHandler, InputConsumer, ReappliesOptions):
     """
     Encapsulates a complete flow.
     """
@@ -30,6 +31,13 @@ class WhileLoop(MutableActorHandler, InputConsumer):
         super()._define_options()
         self._option_manager.add(Option("condition", AbstractBooleanCondition, AlwaysTrue(), "The boolean condition to use"))
 
+    def _initialize(self):
+        """
+        Initializes the members.
+        """
+        super()._initialize()
+        self._condition = None
+
     def reset(self):
         """
         Resets the state of the actor.
@@ -103,8 +111,32 @@ class WhileLoop(MutableActorHandler, InputConsumer):
                     result = "First sub-actor is not allowed to accept input: %s" % self.actors[0].full_name
         if result is None:
             self.get("condition").flow_context = self
+            self._condition = compile_condition(self.get("condition"), self)
+            self._director.compile(self.actors)
         return result
 
+    @property
+    def reapplied_options(self):
+        """
+        Returns the names of the options that get refreshed by reapply_options.
+
+        :return: the option names
+        :rtype: list
+        """
+        return ["condition"]
+
+    def reapply_options(self):
+        """
+        Refreshes the state derived from the options after variables that they reference have changed,
+        i.e., compiles the condition again.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        self.get("condition").flow_context = self
+        self._condition = compile_condition(self.get("condition"), self)
+        return None
+
     def _new_director(self):
         """
         Returns the director to use for executing the actors.
@@ -122,7 +154,7 @@ class WhileLoop(MutableActorHandler, InputConsumer):
         :rtype: bool
         """
         return (len(self.actors) > 0) \
-               and self.get("condition").evaluate(self._input)
+               and self._condition(self._input)
 
     def _do_execute(self):
         """
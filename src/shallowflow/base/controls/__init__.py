@@ -1,6 +1,10 @@
 from ._Branch import Branch
 from ._GetContainerValue import GetContainerValue
 from ._Flow import Flow, run_flow
+from ._ParallelMap import ParallelMap
+from ._Partition import Partition
+from ._Prefetch import Prefetch
+from ._ScatterGather import ScatterGather
 from ._Sequence import Sequence
 from ._Sleep import Sleep
 from ._Stop import Stop
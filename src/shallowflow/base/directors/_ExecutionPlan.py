@@ -0,0 +1,127 @@
+from shallowflow.api.actor import InputConsumer, OutputProducer, is_standalone
+from ._Flushable import Flushable
+
+
+class ExecutionPlan(object):
+    """
+    Immutable, precompiled representation of a list of actors to be executed as a sequence.
+    Contains the standalones to execute upfront and the remaining, non-skipped actors
+    (the steps) together with their role, so that the director can address actors via
+    their position rather than having to look them up.
+    """
+
+    __slots__ = ("_actors", "_num_actors", "_standalones", "_steps", "_producers", "_flushables", "_source_driven",
+                 "_check_result")
+
+    def __init__(self, actors, allows_standalones, check_result=None):
+        """
+        Compiles the plan.
+
+        :param actors: the actors to compile the plan for
+        :type actors: list
+        :param allows_standalones: whether leading standalones get executed upfront
+        :type allows_standalones: bool
+        :param check_result: the result of checking the actors, None if successful, otherwise error message
+        :type check_result: str
+        """
+        standalones = []
+        start = 0
+        if allows_standalones:
+            for i in range(len(actors)):
+                if actors[i].is_skipped:
+                    continue
+                if is_standalone(actors[i]):
+                    standalones.append(actors[i])
+                else:
+                    start = i
+                    break
+        steps = [x for x in actors[start:] if not x.is_skipped]
+        self._actors = actors
+        self._num_actors = len(actors)
+        self._standalones = tuple(standalones)
+        self._steps = tuple(steps)
+        self._producers = tuple([isinstance(x, OutputProducer) for x in steps])
+        self._flushables = tuple([isinstance(x, Flushable) for x in steps])
+        self._source_driven = (len(steps) > 0) and not isinstance(steps[0], InputConsumer)
+        self._check_result = check_result
+
+    def is_valid_for(self, actors):
+        """
+        Returns whether the plan was compiled for the specified list of actors.
+
+        :param actors: the actors to check against
+        :type actors: list
+        :return: True if the plan can be used
+        :rtype: bool
+        """
+        return (actors is self._actors) and (len(actors) == self._num_actors)
+
+    @property
+    def standalones(self):
+        """
+        Returns the standalones to execute before the other actors.
+
+        :return: the standalones
+        :rtype: tuple
+        """
+        return self._standalones
+
+    @property
+    def steps(self):
+        """
+        Returns the non-skipped actors to execute as sequence.
+
+        :return: the actors
+        :rtype: tuple
+        """
+        return self._steps
+
+    @property
+    def producers(self):
+        """
+        Returns for each step whether the actor generates output.
+
+        :return: the flags
+        :rtype: tuple
+        """
+        return self._producers
+
+    @property
+    def flushables(self):
+        """
+        Returns for each step whether the actor needs flushing at the end of the stream.
+
+        :return: the flags
+        :rtype: tuple
+        """
+        return self._flushables
+
+    @property
+    def source_driven(self):
+        """
+        Returns whether the first step is a source, i.e., whether the end of the stream
+        is reached once the steps have been executed.
+
+        :return: True if the first step is a source
+        :rtype: bool
+        """
+        return self._source_driven
+
+    @property
+    def check_result(self):
+        """
+        Returns the result of checking the actors.
+
+        :return: None if check successful, otherwise error message
+        :rtype: str
+        """
+        return self._check_result
+
+    def __len__(self):
+        """
+        Returns the number of steps.
+
+        :return: the number of steps
+        :rtype: int
+        """
+        return len(self._steps)
@@ -0,0 +1,15 @@
+class Flushable(object):
+    """
+    Mixin for actors that hold on to data across executions (e.g., buffering or
+    processing in the background) and need to be notified once no more input arrives.
+    After flushing, any remaining data is available via has_output/output.
+    """
+
+    def flush(self):
+        """
+        Signals the end of the stream: makes all the data held back available as output.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        raise NotImplementedError()
@@ -0,0 +1,256 @@
+import threading
+import traceback
+from queue import Queue, Empty, Full
+from coed.config import Option
+from shallowflow.api.actor import OutputProducer
+from ._SequentialDirector import SequentialDirector
+
+# the marker that gets passed on once a stage has no more tokens to offer
+END_OF_STREAM = object()
+
+# the number of seconds to wait on a queue before checking whether the pipeline got stopped
+POLL_INTERVAL = 0.1
+
+
+def pipelined_option():
+    """
+    Returns the option for enabling pipelined execution of sub-actors.
+
+    :return: the option
+    :rtype: Option
+    """
+    return Option(name="pipelined", value_type=bool, def_value=False,
+                  help="If enabled, the sub-actors get executed as a pipeline, each in its own thread and connected via bounded queues; only applies if the first sub-actor is a source")
+
+
+def queue_size_option():
+    """
+    Returns the option for the size of the queues between the pipelined sub-actors.
+
+    :return: the option
+    :rtype: Option
+    """
+    return Option(name="queue_size", value_type=int, def_value=10, lower=1,
+                  help="The maximum number of tokens that can be queued up between two actors when executing as pipeline")
+
+
+class PipelinedDirector(SequentialDirector):
+    """
+    Executes a list of actors as a sequence, either on the calling thread or, if the owner's
+    'pipelined' option is enabled, as a pipeline with each actor running in its own thread.
+    The actors get connected via bounded queues (owner option 'queue_size'), preserving the
+    order of the tokens. Only sequences that start with a source get pipelined, sequences
+    processing a single input token always get executed on the calling thread.
+    """
+
+    def _is_pipeline_stopped(self, abort):
+        """
+        Returns whether the pipeline got stopped or aborted.
+
+        :param abort: the event signaling that the pipeline got aborted
+        :type abort: threading.Event
+        :return: True if stopped
+        :rtype: bool
+        """
+        return self.is_stopped or abort.is_set()
+
+    def _get(self, queue, abort):
+        """
+        Obtains the next token from the queue.
+
+        :param queue: the queue to get the token from
+        :type queue: Queue
+        :param abort: the event signaling that the pipeline got aborted
+        :type abort: threading.Event
+        :return: the token, END_OF_STREAM if no more tokens or the pipeline got stopped
+        """
+        while not self._is_pipeline_stopped(abort):
+            try:
+                return queue.get(timeout=POLL_INTERVAL)
+            except Empty:
+                pass
+        return END_OF_STREAM
+
+    def _put(self, queue, token, abort):
+        """
+        Adds the token to the queue, blocking while the queue is full.
+
+        :param queue: the queue to add the token to
+        :type queue: Queue
+        :param token: the token to add
+        :param abort: the event signaling that the pipeline got aborted
+        :type abort: threading.Event
+        :return: True if added, False if the pipeline got stopped in the meantime
+        :rtype: bool
+        """
+        while not self._is_pipeline_stopped(abort):
+            try:
+                queue.put(token, timeout=POLL_INTERVAL)
+                return True
+            except Full:
+                pass
+        return False
+
+    def _execute_stage_actor(self, actor, queue_out, errors, abort):
+        """
+        Executes the actor of a stage and forwards any generated output.
+
+        :param actor: the actor to execute
+        :type actor: Actor
+        :param queue_out: the queue to forward the output to, None if last stage
+        :type queue_out: Queue
+        :param errors: the list for recording error messages
+        :type errors: list
+        :param abort: the event signaling that the pipeline got aborted
+        :type abort: threading.Event
+        """
+        actor_result = actor.execute()
+        if actor_result is not None:
+            self.log(actor_result)
+            errors.append(actor_result)
+            if actor.get("stop_flow_on_error"):
+                abort.set()
+                return
+
+        self._forward_output(actor, queue_out, abort)
+
+    def _flush_stage_actor(self, actor, queue_out, errors, abort):
+        """
+        Flushes the actor of a stage once the end of the stream has been reached
+        and forwards any output that it makes available.
+
+        :param actor: the actor to flush
+        :type actor: Flushable
+        :param queue_out: the queue to forward the output to, None if last stage
+        :type queue_out: Queue
+        :param errors: the list for recording error messages
+        :type errors: list
+        :param abort: the event signaling that the pipeline got aborted
+        :type abort: threading.Event
+        """
+        actor_result = actor.flush()
+        if actor_result is not None:
+            self.log(actor_result)
+            errors.append(actor_result)
+            if actor.get("stop_flow_on_error"):
+                abort.set()
+                return
+
+        self._forward_output(actor, queue_out, abort)
+
+    def _forward_output(self, actor, queue_out, abort):
+        """
+        Forwards the output generated by the actor, if any.
+
+        :param actor: the actor to obtain the output from
+        :type actor: Actor
+        :param queue_out: the queue to forward the output to, None if last stage
+        :type queue_out: Queue
+        :param abort: the event signaling that the pipeline got aborted
+        :type abort: threading.Event
+        """
+        if isinstance(actor, OutputProducer):
+            while actor.has_output():
+                token = actor.output()
+                if queue_out is None:
+                    continue
+                if not self._put(queue_out, token, abort):
+                    break
+
+    def _run_stage(self, actor, queue_in, queue_out, errors, abort, flush):
+        """
+        Executes a single stage of the pipeline: the first stage executes its actor once,
+        all other stages execute their actor once for each token arriving. Once the end
+        of the stream has been reached, the actor gets flushed if required.
+
+        :param actor: the actor of this stage
+        :type actor: Actor
+        :param queue_in: the queue to obtain the tokens from, None for first stage
+        :type queue_in: Queue
+        :param queue_out: the queue to forward the output to, None for last stage
+        :type queue_out: Queue
+        :param errors: the list for recording error messages
+        :type errors: list
+        :param abort: the event signaling that the pipeline got aborted
+        :type abort: threading.Event
+        :param flush: whether to flush the actor at the end of the stream
+        :type flush: bool
+        """
+        try:
+            if queue_in is None:
+                self._execute_stage_actor(actor, queue_out, errors, abort)
+                if flush and not self._is_pipeline_stopped(abort):
+                    self._flush_stage_actor(actor, queue_out, errors, abort)
+            else:
+                while True:
+                    token = self._get(queue_in, abort)
+                    if token is END_OF_STREAM:
+                        break
+                    actor.input(token)
+                    self._execute_stage_actor(actor, queue_out, errors, abort)
+                if flush and not self._is_pipeline_stopped(abort):
+                    self._flush_stage_actor(actor, queue_out, errors, abort)
+        except Exception:
+            msg = "Failed to execute actor %s:\n%s" % (actor.full_name, traceback.format_exc())
+            self.log(msg)
+            errors.append(msg)
+            abort.set()
+        finally:
+            if queue_out is not None:
+                self._put(queue_out, END_OF_STREAM, abort)
+
+    def _execute_pipelined(self, plan):
+        """
+        Executes the (non-standalone) steps of the plan as pipeline.
+
+        :param plan: the execution plan to use
+        :type plan: ExecutionPlan
+        :return: None if successfully executed, otherwise error message
+        :rtype: str
+        """
+        stages = plan.steps
+        if len(stages) == 0:
+            return None
+
+        queue_size = self._owner.get("queue_size")
+        queues = [Queue(maxsize=queue_size) for _ in range(len(stages) - 1)]
+        errors = []
+        abort = threading.Event()
+        threads = []
+        for i, actor in enumerate(stages):
+            queue_in = queues[i - 1] if (i > 0) else None
+            queue_out = queues[i] if (i < len(queues)) else None
+            # the end of the stream is only known when the tokens originate from a source
+            flush = plan.source_driven and plan.flushables[i]
+            thread = threading.Thread(target=self._run_stage, args=(actor, queue_in, queue_out, errors, abort, flush),
+                                      name="pipeline-" + actor.full_name, daemon=True)
+            threads.append(thread)
+        if self._owner.is_debug:
+            self.log("Starting pipeline with %d stages" % len(threads))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # like the sequential execution, report the most recent error
+        if len(errors) > 0:
+            return errors[-1]
+        return None
+
+    def _do_execute(self, actors):
+        """
+        Executes the specified list of actors.
+
+        :param actors: the actors to execute
+        :type actors: list
+        :return: None if successfully executed, otherwise error message
+        :rtype: str
+        """
+        if not self._owner.get("pipelined"):
+            return super()._do_execute(actors)
+        plan = self._get_plan(actors)
+        self._execute_standalones(plan)
+        # a single token (e.g., within a Tee) does not benefit from starting threads for each stage
+        if not plan.source_driven:
+            return self._execute_plan(plan)
+        return self._execute_pipelined(plan)
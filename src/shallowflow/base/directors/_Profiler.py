@@ -0,0 +1,340 @@
+import csv
+import json
+import random
+import threading
+import time
+import numpy as np
+
+# the maximum number of timings to keep per actor for computing the percentiles
+MAX_SAMPLES = 10000
+
+# the percentiles to compute
+PERCENTILES = (50, 90, 99)
+
+# the columns of the reports
+COLUMNS = ["actor", "count", "tokens_in", "tokens_out", "errors",
+           "wall_total", "wall_mean", "wall_min", "wall_max"] \
+          + ["wall_p%d" % x for x in PERCENTILES] \
+          + ["cpu_total", "cpu_mean", "cpu_min", "cpu_max"] \
+          + ["cpu_p%d" % x for x in PERCENTILES]
+
+# the keys that the reports can be sorted by
+SORT_KEYS = ["wall_total", "cpu_total", "wall_max", "count", "errors", "actor"]
+
+# the currently active profiler
+_active = None
+
+
+class ActorProfile(object):
+    """
+    The execution statistics of a single actor. Times are in seconds.
+    """
+
+    def __init__(self, name):
+        """
+        Initializes the statistics.
+
+        :param name: the full name of the actor
+        :type name: str
+        """
+        self.name = name
+        self.count = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.errors = 0
+        self.wall_total = 0.0
+        self.wall_min = None
+        self.wall_max = None
+        self.cpu_total = 0.0
+        self.cpu_min = None
+        self.cpu_max = None
+        self.wall_samples = []
+        self.cpu_samples = []
+
+    def add(self, wall, cpu, has_input, failed, max_samples, rng):
+        """
+        Adds the timings of an execution. Only a random sample of the timings gets kept
+        for computing the percentiles (reservoir sampling).
+
+        :param wall: the wall time in seconds
+        :type wall: float
+        :param cpu: the CPU time of the executing thread in seconds
+        :type cpu: float
+        :param has_input: whether the actor consumed an input token
+        :type has_input: bool
+        :param failed: whether the execution failed
+        :type failed: bool
+        :param max_samples: the maximum number of timings to keep
+        :type max_samples: int
+        :param rng: the random number generator to use for sampling
+        :type rng: random.Random
+        """
+        self.count += 1
+        if has_input:
+            self.tokens_in += 1
+        if failed:
+            self.errors += 1
+        self.wall_total += wall
+        self.cpu_total += cpu
+        if (self.wall_min is None) or (wall < self.wall_min):
+            self.wall_min = wall
+        if (self.wall_max is None) or (wall > self.wall_max):
+            self.wall_max = wall
+        if (self.cpu_min is None) or (cpu < self.cpu_min):
+            self.cpu_min = cpu
+        if (self.cpu_max is None) or (cpu > self.cpu_max):
+            self.cpu_max = cpu
+        if len(self.wall_samples) < max_samples:
+            self.wall_samples.append(wall)
+            self.cpu_samples.append(cpu)
+        else:
+            index = rng.randrange(self.count)
+            if index < max_samples:
+                self.wall_samples[index] = wall
+                self.cpu_samples[index] = cpu
+
+    def to_dict(self):
+        """
+        Returns the statistics as dictionary (see COLUMNS).
+
+        :return: the statistics
+        :rtype: dict
+        """
+        result = {
+            "actor": self.name,
+            "count": self.count,
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "errors": self.errors,
+        }
+        for prefix, total, minimum, maximum, samples in [
+                ("wall", self.wall_total, self.wall_min, self.wall_max, self.wall_samples),
+                ("cpu", self.cpu_total, self.cpu_min, self.cpu_max, self.cpu_samples)]:
+            result[prefix + "_total"] = total
+            result[prefix + "_mean"] = (total / self.count) if (self.count > 0) else None
+            result[prefix + "_min"] = minimum
+            result[prefix + "_max"] = maximum
+            if len(samples) > 0:
+                values = np.percentile(samples, PERCENTILES)
+            else:
+                values = [None] * len(PERCENTILES)
+            for percentile, value in zip(PERCENTILES, values):
+                result["%s_p%d" % (prefix, percentile)] = None if (value is None) else float(value)
+        return result
+
+
+class Profiler(object):
+    """
+    Records the execution statistics of actors, keyed by their full name: number of executions,
+    tokens in/out, errors, and wall and CPU time (total, mean, min, max, percentiles).
+    The times of actor handlers include the times of their sub-actors. The CPU time is
+    the one of the executing thread, i.e., work done in other threads or processes
+    is not included.
+    Directors only record statistics while a profiler is active (see start_profiling). Pipelined stages,
+    the worker threads of Prefetch/ParallelMap/Partition and worker processes do not get profiled.
+    """
+
+    def __init__(self, max_samples=MAX_SAMPLES, seed=1):
+        """
+        Initializes the profiler.
+
+        :param max_samples: the maximum number of timings to keep per actor for the percentiles
+        :type max_samples: int
+        :param seed: the seed for sampling the timings
+        :type seed: int
+        """
+        self.max_samples = max_samples
+        self._profiles = dict()
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+    def _get_profile(self, actor):
+        """
+        Returns the statistics for the actor, creates them if necessary. Must be called with the lock held.
+
+        :param actor: the actor to get the statistics for
+        :type actor: Actor
+        :return: the statistics
+        :rtype: ActorProfile
+        """
+        name = actor.full_name
+        result = self._profiles.get(name)
+        if result is None:
+            result = ActorProfile(name)
+            self._profiles[name] = result
+        return result
+
+    def execute(self, actor, has_input=False):
+        """
+        Executes the actor and records the statistics.
+
+        :param actor: the actor to execute
+        :type actor: Actor
+        :param has_input: whether the actor received an input token
+        :type has_input: bool
+        :return: None if successfully executed, otherwise error message
+        :rtype: str
+        """
+        failed = True
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            result = actor.execute()
+            failed = result is not None
+        finally:
+            self.record(actor, time.perf_counter() - wall, time.thread_time() - cpu, has_input, failed)
+        return result
+
+    def record(self, actor, wall, cpu, has_input=False, failed=False):
+        """
+        Records the timings of an execution of the actor.
+
+        :param actor: the actor that was executed
+        :type actor: Actor
+        :param wall: the wall time in seconds
+        :type wall: float
+        :param cpu: the CPU time in seconds
+        :type cpu: float
+        :param has_input: whether the actor consumed an input token
+        :type has_input: bool
+        :param failed: whether the execution failed
+        :type failed: bool
+        """
+        with self._lock:
+            self._get_profile(actor).add(wall, cpu, has_input, failed, self.max_samples, self._rng)
+
+    def record_output(self, actor):
+        """
+        Records that a token generated by the actor got passed on.
+
+        :param actor: the actor that generated the token
+        :type actor: Actor
+        """
+        with self._lock:
+            self._get_profile(actor).tokens_out += 1
+
+    def reset(self):
+        """
+        Discards all statistics.
+        """
+        with self._lock:
+            self._profiles = dict()
+
+    def to_list(self, sort="wall_total"):
+        """
+        Returns the statistics of all actors.
+
+        :param sort: the key to sort by (see SORT_KEYS), descending except for 'actor'
+        :type sort: str
+        :return: the list of dictionaries (see COLUMNS)
+        :rtype: list
+        """
+        with self._lock:
+            result = [x.to_dict() for x in self._profiles.values()]
+        if sort == "actor":
+            result.sort(key=lambda x: x["actor"])
+        else:
+            result.sort(key=lambda x: (x[sort] is not None, 0 if (x[sort] is None) else x[sort]), reverse=True)
+        return result
+
+    def to_table(self, sort="wall_total"):
+        """
+        Generates a plain text table of the statistics, with the times in milliseconds.
+
+        :param sort: the key to sort by (see SORT_KEYS)
+        :type sort: str
+        :return: the table
+        :rtype: str
+        """
+        rows = self.to_list(sort=sort)
+        width = max([len("actor")] + [len(x["actor"]) for x in rows])
+        header = ["count", "in", "out", "errors", "wall", "mean", "min", "max"] \
+                 + ["p%d" % x for x in PERCENTILES] + ["cpu", "cpu mean"]
+        keys = ["wall_total", "wall_mean", "wall_min", "wall_max"] \
+               + ["wall_p%d" % x for x in PERCENTILES] + ["cpu_total", "cpu_mean"]
+        lines = [("%-" + str(width) + "s") % "actor" + "".join(["%10s" % x for x in header])]
+        for row in rows:
+            line = ("%-" + str(width) + "s") % row["actor"]
+            line += "%10d%10d%10d%10d" % (row["count"], row["tokens_in"], row["tokens_out"], row["errors"])
+            for key in keys:
+                line += "%10s" % ("-" if (row[key] is None) else ("%.3f" % (row[key] * 1000)))
+            lines.append(line)
+        return "\n".join(lines)
+
+    def save_json(self, fname, sort="wall_total"):
+        """
+        Writes the statistics to the JSON file, with the times in seconds.
+
+        :param fname: the file to write to
+        :type fname: str
+        :param sort: the key to sort by (see SORT_KEYS)
+        :type sort: str
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        try:
+            with open(fname, "w") as f:
+                json.dump(self.to_list(sort=sort), f, indent=2)
+        except Exception as e:
+            return "Failed to write profile to '%s': %s" % (fname, str(e))
+        return None
+
+    def save_csv(self, fname, sort="wall_total"):
+        """
+        Writes the statistics to the CSV file, with the times in seconds.
+
+        :param fname: the file to write to
+        :type fname: str
+        :param sort: the key to sort by (see SORT_KEYS)
+        :type sort: str
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        try:
+            with open(fname, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=COLUMNS)
+                writer.writeheader()
+                for row in self.to_list(sort=sort):
+                    writer.writerow(row)
+        except Exception as e:
+            return "Failed to write profile to '%s': %s" % (fname, str(e))
+        return None
+
+
+def start_profiling(profiler=None):
+    """
+    Activates the profiler, i.e., directors record the execution statistics of the actors from now on.
+
+    :param profiler: the profiler to use, creates a new one if None
+    :type profiler: Profiler
+    :return: the active profiler
+    :rtype: Profiler
+    """
+    global _active
+    if profiler is None:
+        profiler = Profiler()
+    _active = profiler
+    return profiler
+
+
+def stop_profiling():
+    """
+    Deactivates the current profiler.
+
+    :return: the profiler that was active, None if none active
+    :rtype: Profiler
+    """
+    global _active
+    result = _active
+    _active = None
+    return result
+
+
+def active_profiler():
+    """
+    Returns the currently active profiler.
+
+    :return: the profiler, None if profiling is disabled
+    :rtype: Profiler
+    """
+    return _active
@@ -2,6 +2,8 @@ from shallowflow.api.director import AbstractDirector
 from shallowflow.api.actor import InputConsumer, OutputProducer, is_source, is_sink, is_standalone
 from shallowflow.api.compatibility import is_compatible
 from coed.class_utils import get_class_name
+from ._ExecutionPlan import ExecutionPlan
+from ._Profiler import active_profiler
 
 
 class SequentialDirector(AbstractDirector):
@@ -25,12 +27,13 @@ class SequentialDirector(AbstractDirector):
         self.requires_source = requires_source
         self.requires_sink = requires_sink
         self._actors = None
+        self._plan = None
 
-    def _check(self, actors):
+    def _check_actors(self, actors):
         """
-        For performing checks.
+        Performs the actual checks on the actors.
 
-        :param actors: the actors to execute
+        :param actors: the actors to check
         :type actors: list
         :return: None if check successful, otherwise error message
         :rtype: str
@@ -70,115 +73,204 @@ class SequentialDirector(AbstractDirector):
 
         return result
 
-    def _execute_standalones(self, actors):
+    def compile(self, actors):
         """
-        Executes all the standalones and returns the first non-standalone actor or None.
+        Compiles the actors into an execution plan, which gets used as long as the
+        same list of actors gets executed. Checks the actors as well.
 
-        :param actors: the actors to iterate
+        :param actors: the actors to compile
         :type actors: list
-        :return: non-standalone actor or None
-        :rtype: Actor
+        :return: the plan
+        :rtype: ExecutionPlan
         """
-        result = None
+        self._plan = ExecutionPlan(actors, self.allows_standalones, check_result=self._check_actors(actors))
+        return self._plan
 
-        if not self.allows_standalones:
-            return result
+    def invalidate(self):
+        """
+        Discards the current execution plan, e.g., when the actors got reconfigured.
+        The skip flags and the result of checking the actors are part of the plan.
+        """
+        self._plan = None
 
-        for i in range(len(actors)):
-            if actors[i].is_skipped:
-                continue
-            if is_standalone(actors[i]):
-                msg = actors[i].execute()
-                if msg is not None:
-                    raise Exception(msg)
-            else:
-                result = actors[i]
-                break
-        return result
+    def _get_plan(self, actors):
+        """
+        Returns the execution plan for the actors, compiles it if necessary.
 
-    def _do_execute(self, actors):
+        :param actors: the actors to get the plan for
+        :type actors: list
+        :return: the plan
+        :rtype: ExecutionPlan
         """
-        Executes the specified list of actors.
+        plan = self._plan
+        if (plan is None) or not plan.is_valid_for(actors):
+            plan = self.compile(actors)
+        return plan
+
+    def _check(self, actors):
+        """
+        For performing checks. Only checks the actors when compiling the execution plan.
 
         :param actors: the actors to execute
         :type actors: list
+        :return: None if check successful, otherwise error message
+        :rtype: str
+        """
+        return self._get_plan(actors).check_result
+
+    def _execute_standalones(self, plan):
+        """
+        Executes all the leading standalones of the plan.
+
+        :param plan: the execution plan to use
+        :type plan: ExecutionPlan
+        """
+        profiler = active_profiler()
+        for standalone in plan.standalones:
+            msg = standalone.execute() if (profiler is None) else profiler.execute(standalone)
+            if msg is not None:
+                raise Exception(msg)
+
+    def _execute_plan(self, plan, resume=None):
+        """
+        Executes the (non-standalone) steps of the plan. Actors with pending output are
+        tracked via their position in the plan, from where execution gets resumed.
+        Once a source-driven plan has been executed, the flushable steps get flushed.
+
+        :param plan: the execution plan to use
+        :type plan: ExecutionPlan
+        :param resume: the position of the step with pending output to resume execution from, None to execute from the start
+        :type resume: int
         :return: None if successfully executed, otherwise error message
         :rtype: str
         """
         result = None
-        start = self._execute_standalones(actors)
-        not_finished_actor = start
-        pending_actors = []
-        finished = False
+        steps = plan.steps
+        producers = plan.producers
+        num_steps = len(steps)
+        profiler = active_profiler()
+        if num_steps == 0:
+            return result
+        if resume is None:
+            pending = []
+            first = True
+        else:
+            pending = [resume]
+            first = False
 
-        while not self.is_stopped and not finished:
+        while not self.is_stopped and (first or (len(pending) > 0)):
             # determine starting point
-            if len(pending_actors) > 0:
-                start = pending_actors[-1]
+            if len(pending) > 0:
+                start = pending[-1]
             else:
-                start = not_finished_actor
-                not_finished_actor = None
-            if start is None:
-                start = actors[0]
+                start = 0
+            first = False
 
             # iterate over actors
             token = None
-            curr = None
-            for i in range(actors.index(start), len(actors), 1):
-                curr = actors[i]
-                if curr.is_skipped:
-                    continue
+            for i in range(start, num_steps):
+                curr = steps[i]
+                producer = producers[i]
                 if token is None:
-                    if isinstance(curr, OutputProducer) and curr.has_output():
-                        if len(pending_actors) > 0:
-                            pending_actors.pop()
+                    if producer and curr.has_output():
+                        if len(pending) > 0:
+                            pending.pop()
                     else:
-                        actor_result = curr.execute()
+                        if profiler is None:
+                            actor_result = curr.execute()
+                        else:
+                            actor_result = profiler.execute(curr, has_input=(i == 0) and not plan.source_driven)
                         if actor_result is not None:
                             self.log(actor_result)
                             result = actor_result
-                            not_finished_actor = None
                             if curr.get("stop_flow_on_error"):
                                 break
-
-                    if isinstance(curr, OutputProducer) and curr.has_output():
-                        token = curr.output()
-                    else:
-                        token = None
-
-                    # more to come?
-                    if isinstance(curr, OutputProducer) and curr.has_output():
-                        pending_actors.append(curr)
-
                 else:
                     curr.input(token)
-                    actor_result = curr.execute()
+                    actor_result = curr.execute() if (profiler is None) else profiler.execute(curr, has_input=True)
                     if actor_result is not None:
                         self.log(actor_result)
                         result = actor_result
-                        not_finished_actor = None
                         if curr.get("stop_flow_on_error"):
                             break
 
-                    # token produced?
-                    if isinstance(curr, OutputProducer):
-                        if curr.has_output():
-                            token = curr.output()
-                        else:
-                            token = None
+                # token produced? more to come?
+                if producer:
+                    token = curr.output() if curr.has_output() else None
+                    if (profiler is not None) and (token is not None):
+                        profiler.record_output(curr)
+                    if curr.has_output():
+                        pending.append(i)
+                    if token is None:
+                        break
+                else:
+                    token = None
 
-                        if curr.has_output():
-                            pending_actors.append(curr)
-                    else:
-                        token = None
+        if (resume is None) and plan.source_driven and not self.is_stopped:
+            flush_result = self._flush_plan(plan, 0)
+            if flush_result is not None:
+                result = flush_result
 
-                if isinstance(curr, OutputProducer) and (token is None):
-                    break
+        return result
 
-            finished = (not_finished_actor is None) and (len(pending_actors) == 0)
+    def _flush_plan(self, plan, start):
+        """
+        Flushes the flushable steps of the plan in order, starting at the specified position.
+        The output that a step makes available gets passed on to the following steps
+        before the next step gets flushed.
 
+        :param plan: the execution plan to use
+        :type plan: ExecutionPlan
+        :param start: the position of the first step to consider
+        :type start: int
+        :return: None if successfully flushed, otherwise error message
+        :rtype: str
+        """
+        result = None
+        steps = plan.steps
+        for i in range(start, len(steps)):
+            if self.is_stopped:
+                break
+            if not plan.flushables[i]:
+                continue
+            curr = steps[i]
+            actor_result = curr.flush()
+            if actor_result is not None:
+                self.log(actor_result)
+                result = actor_result
+                if curr.get("stop_flow_on_error"):
+                    break
+            if plan.producers[i] and curr.has_output():
+                actor_result = self._execute_plan(plan, resume=i)
+                if actor_result is not None:
+                    result = actor_result
         return result
 
+    def flush(self, actors):
+        """
+        Flushes the flushable actors, passing on the output that they make available
+        to the following actors.
+
+        :param actors: the actors to flush
+        :type actors: list
+        :return: None if successfully flushed, otherwise error message
+        :rtype: str
+        """
+        return self._flush_plan(self._get_plan(actors), 0)
+
+    def _do_execute(self, actors):
+        """
+        Executes the specified list of actors.
+
+        :param actors: the actors to execute
+        :type actors: list
+        :return: None if successfully executed, otherwise error message
+        :rtype: str
+        """
+        plan = self._get_plan(actors)
+        self._execute_standalones(plan)
+        return self._execute_plan(plan)
+
     def stop_execution(self):
         """
         Stops the actor execution.
@@ -187,3 +279,17 @@ class SequentialDirector(AbstractDirector):
             for actor in self._actors:
                 actor.stop_execution()
         super().stop_execution()
+
+
+def invalidate_plan(handler):
+    """
+    Discards the execution plan of the handler's director (if it uses one), e.g., after
+    one of the sub-actors got reconfigured or (un)skipped without the handler being set up again.
+    The plan gets compiled again the next time the sub-actors get executed.
+
+    :param handler: the actor handler whose plan to discard
+    :type handler: ActorHandler
+    """
+    director = getattr(handler, "_director", None)
+    if isinstance(director, SequentialDirector):
+        director.invalidate()
@@ -0,0 +1,104 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class WorkerPool(object):
+    """
+    Pool of worker threads that can be shared by all the actors of a flow.
+    The threads get created on demand and remain available until the pool gets shut down.
+    """
+
+    def __init__(self, max_workers):
+        """
+        Initializes the pool.
+
+        :param max_workers: the maximum number of worker threads
+        :type max_workers: int
+        """
+        self._max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def max_workers(self):
+        """
+        Returns the maximum number of worker threads.
+
+        :return: the number of threads
+        :rtype: int
+        """
+        return self._max_workers
+
+    @property
+    def is_running(self):
+        """
+        Returns whether the pool is currently running.
+
+        :return: True if running
+        :rtype: bool
+        """
+        return self._executor is not None
+
+    def start(self):
+        """
+        Starts the pool, if not already running.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="shallowflow-worker")
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Schedules the callable for execution, starting the pool if necessary.
+
+        :param fn: the callable to execute
+        :return: the future for the result
+        :rtype: Future
+        """
+        if self._executor is None:
+            self.start()
+        return self._executor.submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait=True):
+        """
+        Shuts down the pool. Cancels any work that hasn't started yet.
+
+        :param wait: whether to wait for the running work to finish
+        :type wait: bool
+        """
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+class WorkerPoolHandler(object):
+    """
+    Mixin for actors that manage a worker pool for their sub-actors.
+    """
+
+    @property
+    def worker_pool(self):
+        """
+        Returns the worker pool.
+
+        :return: the pool, None if not available
+        :rtype: WorkerPool
+        """
+        raise NotImplementedError()
+
+
+def find_worker_pool(actor):
+    """
+    Locates the worker pool managed by the root actor of the flow the actor belongs to.
+
+    :param actor: the actor to get the pool for
+    :type actor: Actor
+    :return: the pool, None if not available
+    :rtype: WorkerPool
+    """
+    root = actor.root
+    if isinstance(root, WorkerPoolHandler):
+        return root.worker_pool
+    return None
@@ -1 +1,6 @@
-from ._SequentialDirector import SequentialDirector
+from ._ExecutionPlan import ExecutionPlan
+from ._Flushable import Flushable
+from ._SequentialDirector import SequentialDirector, invalidate_plan
+from ._Profiler import Profiler, ActorProfile, start_profiling, stop_profiling, active_profiler, SORT_KEYS
+from ._PipelinedDirector import PipelinedDirector, pipelined_option, queue_size_option
+from ._WorkerPool import WorkerPool, WorkerPoolHandler, find_worker_pool
@@ -0,0 +1,56 @@
+import sys
+
+# the maximum nesting depth to descend into when estimating sizes
+MAX_DEPTH = 10
+
+
+def estimate_size(obj, depth=MAX_DEPTH):
+    """
+    Estimates the memory footprint of the object in bytes, including the items of
+    (nested) lists, tuples, sets and dictionaries. For objects that provide the 'nbytes'
+    attribute (e.g., numpy arrays) that value gets used instead. Objects shared between
+    containers get counted only once.
+
+    :param obj: the object to estimate the size for
+    :param depth: the maximum nesting depth to descend into
+    :type depth: int
+    :return: the estimated number of bytes
+    :rtype: int
+    """
+    return _estimate_size(obj, depth, set())
+
+
+def _estimate_size(obj, depth, seen):
+    """
+    Estimates the memory footprint of the object in bytes.
+
+    :param obj: the object to estimate the size for
+    :param depth: the remaining nesting depth to descend into
+    :type depth: int
+    :param seen: the IDs of the objects already accounted for
+    :type seen: set
+    :return: the estimated number of bytes
+    :rtype: int
+    """
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    nbytes = getattr(obj, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    try:
+        result = sys.getsizeof(obj)
+    except TypeError:
+        result = 0
+    if depth <= 0:
+        return result
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            result += _estimate_size(k, depth - 1, seen)
+            result += _estimate_size(v, depth - 1, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            result += _estimate_size(item, depth - 1, seen)
+    elif hasattr(obj, "__dict__"):
+        result += _estimate_size(obj.__dict__, depth - 1, seen)
+    return result
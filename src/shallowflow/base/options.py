@@ -0,0 +1,42 @@
+from collections import namedtuple
+
+# the tuple of field names -> snapshot type
+_snapshot_types = dict()
+
+
+def _snapshot_type(names):
+    """
+    Returns the (cached) named tuple type for the field names.
+
+    :param names: the field names
+    :type names: tuple
+    :return: the type
+    """
+    result = _snapshot_types.get(names)
+    if result is None:
+        result = namedtuple("OptionsSnapshot", names)
+        _snapshot_types[names] = result
+    return result
+
+
+def snapshot_options(handler, **derived):
+    """
+    Takes an immutable snapshot of the current option values of the handler, which provides
+    attribute access to the values (e.g., snapshot.debug). Actors take the snapshot at setup,
+    i.e., it gets refreshed whenever they get reconfigured, and use it in their execution paths
+    instead of querying the option manager for every token. Consequently, actors that must see
+    changes to options attached to variables depend on being re-applied when these variables
+    change. Values that are not purely defined by the options (e.g., is_debug, which also takes
+    the enclosing actors into account) should not be taken from the snapshot.
+
+    :param handler: the option handler to take the snapshot from
+    :type handler: AbstractOptionHandler
+    :param derived: additional values to store (e.g., pre-processed option values), these replace option values with the same name
+    :return: the snapshot
+    :rtype: tuple
+    """
+    values = dict()
+    for option in handler.option_manager.options():
+        values[option.name] = handler.get(option.name)
+    values.update(derived)
+    return _snapshot_type(tuple(values.keys()))(**values)
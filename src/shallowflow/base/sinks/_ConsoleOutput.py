@@ -1,6 +1,7 @@
 import threading
 from shallowflow.api.sink import AbstractSimpleSink
 from coed.config import Option
+from shallowflow.base.options import snapshot_options
 
 print_mutex = threading.Semaphore(1)
 
@@ -27,6 +28,13 @@ class ConsoleOutput(AbstractSimpleSink):
         self._option_manager.add(Option(name="prefix", value_type=str, def_value="",
                                         help="The prefix to prepend to the output"))
 
+    def _initialize(self):
+        """
+        Initializes the members.
+        """
+        super()._initialize()
+        self._opts = None
+
     def accepts(self):
         """
         Returns the types that are accepted.
@@ -36,6 +44,18 @@ class ConsoleOutput(AbstractSimpleSink):
         """
         return [object]
 
+    def setup(self):
+        """
+        Prepares the actor for use.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        result = super().setup()
+        if result is None:
+            self._opts = snapshot_options(self)
+        return result
+
     def _do_execute(self):
         """
         Performs the actual execution.
@@ -44,6 +64,6 @@ class ConsoleOutput(AbstractSimpleSink):
         :rtype: str
         """
         print_mutex.acquire()
-        print(self.get("prefix") + str(self._input), flush=True)
+        print(self._opts.prefix + str(self._input), flush=True)
         print_mutex.release()
         return None
@@ -1,9 +1,10 @@
 import pickle
 from shallowflow.api.sink import AbstractFileWriter
 from shallowflow.api.compatibility import Unknown
+from shallowflow.base.variables import ExpandsVariables, compile_template
 
 
-class PickledFileWriter(AbstractFileWriter):
+class PickledFileWriter(AbstractFileWriter, ExpandsVariables):
     """
     Pickles the incoming object and writes it to the specified file.
     """
@@ -26,6 +27,35 @@ class PickledFileWriter(AbstractFileWriter):
         """
         return [Unknown]
 
+    @property
+    def expanded_options(self):
+        """
+        Returns the names of the options whose variables get expanded at execution time.
+
+        :return: the option names
+        :rtype: list
+        """
+        return ["output_file"]
+
+    def _initialize(self):
+        """
+        Initializes the members.
+        """
+        super()._initialize()
+        self._output_file = None
+
+    def setup(self):
+        """
+        Prepares the actor for use.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        result = super().setup()
+        if result is None:
+            self._output_file = compile_template(self.get("output_file"))
+        return result
+
     def _do_execute(self):
         """
         Performs the actual execution.
@@ -34,7 +64,7 @@ class PickledFileWriter(AbstractFileWriter):
         :rtype: str
         """
         result = None
-        fname = self.variables.expand(self.get("output_file"))
+        fname = self._output_file.render(self.variables)
         try:
             with open(fname, "wb") as f:
                 pickle.dump(self._input, f)
@@ -0,0 +1,115 @@
+import abc
+import traceback
+from coed.config import Option
+from shallowflow.api.source import AbstractListOutputSource
+from shallowflow.base.directors import Flushable
+
+
+class AbstractStreamingListOutputSource(AbstractListOutputSource, Flushable, abc.ABC):
+    """
+    Ancestor for list output sources whose items can be generated on demand,
+    i.e., only when the next actor requests the next item.
+    An error that occurs while generating the items on demand ends the stream and
+    gets reported when the source gets flushed at the end of the stream.
+    """
+
+    def _define_options(self):
+        """
+        For configuring the options.
+        """
+        super()._define_options()
+        self._option_manager.add(Option(name="streaming", value_type=bool, def_value=False,
+                                        help="If enabled, the items get generated one at a time when requested rather than all at once; ignored when outputting a list"))
+
+    def reset(self):
+        """
+        Resets the state of the actor.
+        """
+        super().reset()
+        self._generator = None
+        self._generator_error = None
+
+    def _is_streaming(self):
+        """
+        Returns whether the items get generated on demand.
+
+        :return: True if generated on demand
+        :rtype: bool
+        """
+        return self.get("streaming") and not self.get("output_as_list")
+
+    def _generate(self):
+        """
+        Generates the items to output.
+
+        :return: the generator for the items
+        """
+        raise NotImplementedError()
+
+    def _do_execute(self):
+        """
+        Performs the actual execution.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        self._close_generator()
+        self._generator_error = None
+        if self._is_streaming():
+            self._generator = self._generate()
+        else:
+            self._output.extend(self._generate())
+        return None
+
+    def _close_generator(self):
+        """
+        Closes the generator, if any.
+        """
+        if self._generator is not None:
+            self._generator.close()
+            self._generator = None
+
+    def _fetch_next(self):
+        """
+        Obtains the next item from the generator, if possible.
+        """
+        if self.is_stopped:
+            self._close_generator()
+            return
+        try:
+            self._output.append(next(self._generator))
+        except StopIteration:
+            self._generator = None
+        except Exception:
+            self._generator_error = "Failed to generate next item:\n%s" % traceback.format_exc()
+            self._generator = None
+
+    def has_output(self):
+        """
+        Returns whether output data is available.
+
+        :return: true if available
+        :rtype: bool
+        """
+        if (len(self._output) == 0) and (self._generator is not None):
+            self._fetch_next()
+        return super().has_output()
+
+    def flush(self):
+        """
+        Signals the end of the stream: returns the error that ended the generation of the items, if any.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        result = self._generator_error
+        self._generator_error = None
+        return result
+
+    def wrap_up(self):
+        """
+        For finishing up the execution.
+        Does not affect graphical output.
+        """
+        self._close_generator()
+        super().wrap_up()
@@ -1,11 +1,23 @@
+import heapq
+import itertools
 import os
+import pickle
 import re
-from shallowflow.api.source import AbstractListOutputSource
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from coed.config import Option
 from shallowflow.api.io import Directory, File
+from shallowflow.api.performance import actual_num_threads, num_threads_option
+from shallowflow.base.options import snapshot_options
+from shallowflow.base.variables import compile_template
+from ._AbstractStreamingListOutputSource import AbstractStreamingListOutputSource
 
+# the maximum number of directory scans in flight per thread when scanning ahead
+READ_AHEAD_PER_THREAD = 2
 
-class DirectoryLister(AbstractListOutputSource):
+
+class DirectoryLister(AbstractStreamingListOutputSource):
     """
     Lists files or dirs in a directory.
     """
@@ -38,6 +50,35 @@ class DirectoryLister(AbstractListOutputSource):
                                         help="If enabled, looking for files/dirs recursively"))
         self._option_manager.add(Option(name="sort", value_type=bool, def_value=False,
                                         help="If enabled, the located files/dirs get sorted"))
+        self._option_manager.add(num_threads_option())
+        self._option_manager.add(Option(name="incremental", value_type=bool, def_value=False,
+                                        help="If enabled, only files that are new or changed (size/modification time) since the last run get listed, using the snapshot file; directories never get listed"))
+        self._option_manager.add(Option(name="snapshot_file", value_type=File, def_value=File("."),
+                                        help="The file for storing the snapshot of the directory tree between runs in incremental mode"))
+        self._option_manager.add(Option(name="skip_unchanged_dirs", value_type=bool, def_value=False,
+                                        help="If enabled, the files of directories whose modification time has not changed do not get checked in incremental mode (their sub-directories still get checked); only detects files that were added, removed or renamed"))
+
+    def _initialize(self):
+        """
+        Initializes the members.
+        """
+        super()._initialize()
+        self._snapshot = None
+        self._snapshot_file = None
+        self._snapshot_modified = False
+        self._snapshot_lock = threading.Lock()
+        self._scanned = None
+        self._changed = None
+        self._walk_completed = False
+        self._in_flight = 0
+        self._max_in_flight = 0
+
+    def reset(self):
+        """
+        Resets the state of the actor.
+        """
+        super().reset()
+        self._opts = None
 
     def _get_item_type(self):
         """
@@ -60,41 +101,292 @@ class DirectoryLister(AbstractListOutputSource):
                 result = "Directory does not exist: %s" % self._option_manager.get("dir")
             elif not os.path.isdir(self._option_manager.get("dir")):
                 result = "Does not point to a directory: %s" % self._option_manager.get("dir")
+        if result is None:
+            pattern = None
+            if len(self.get("regexp")) > 0:
+                try:
+                    pattern = re.compile(self.get("regexp"))
+                except re.error as e:
+                    result = "Invalid regular expression '%s': %s" % (self.get("regexp"), str(e))
+            if result is None:
+                self._opts = snapshot_options(
+                    self,
+                    dir=str(self.get("dir")),
+                    pattern=pattern,
+                    num_threads=actual_num_threads(self.get("num_threads")),
+                    snapshot_file=compile_template(self.get("snapshot_file")).render(self.variables))
+        if (result is None) and self._opts.incremental:
+            if not self._opts.list_files:
+                result = "Incremental mode requires files to be listed!"
+            elif (self._snapshot is None) or (self._snapshot_file != self._opts.snapshot_file):
+                result = self._load_snapshot(self._opts.snapshot_file)
         return result
 
-    def _search(self, dir):
+    def _load_snapshot(self, fname):
         """
-        Searches the specified directory.
+        Loads the snapshot of the directory tree from the previous run, if available.
 
-        :param dir: the directory to search
+        :param fname: the file to load the snapshot from
+        :type fname: str
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        if os.path.isdir(fname):
+            return "Snapshot file points to a directory: %s" % fname
+        snapshot = dict()
+        if os.path.exists(fname):
+            try:
+                with open(fname, "rb") as f:
+                    snapshot = pickle.load(f)
+            except Exception:
+                return self._handle_exception("Failed to load snapshot from: %s" % fname)
+            if not isinstance(snapshot, dict):
+                return "Snapshot file does not contain a dictionary: %s" % fname
+        self._snapshot = snapshot
+        self._snapshot_file = fname
+        self._snapshot_modified = False
+        return None
+
+    def _save_snapshot(self):
+        """
+        Saves the current snapshot of the directory tree, replacing the previous one.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        tmp = self._snapshot_file + ".tmp"
+        try:
+            with open(tmp, "wb") as f:
+                pickle.dump(self._snapshot, f)
+            os.replace(tmp, self._snapshot_file)
+        except Exception:
+            return self._handle_exception("Failed to save snapshot to: %s" % self._snapshot_file)
+        self._snapshot_modified = False
+        return None
+
+    def _scan(self, dir):
+        """
+        Scans the specified directory, applying the filters.
+
+        :param dir: the directory to scan
         :type dir: str
+        :return: the list of (path, emit, recurse) tuples for the relevant entries
+        :rtype: list
         """
+        opts = self._opts
         if self.is_debug:
             self.log("Entering dir: %s" % dir)
-        for f in os.listdir(dir):
-            if self.is_stopped:
-                break
-            full = os.path.join(dir, f)
-            if (self.get("max_items") > 0) and (len(self._output) >= self.get("max_items")):
-                if self.is_debug:
-                    self.log("Max items reached: %d" % self.get("max_items"))
-                break
-            if len(self.get("regexp")) > 0:
-                if not re.search(self.get("regexp"), f):
+        if opts.incremental:
+            return self._scan_incremental(dir)
+        pattern = opts.pattern
+        list_files = opts.list_files
+        list_dirs = opts.list_dirs
+        recursive = opts.recursive
+        result = []
+        with os.scandir(dir) as it:
+            for entry in it:
+                if (pattern is not None) and (pattern.search(entry.name) is None):
                     continue
-            if self.get("list_files") and os.path.isfile(full):
-                self._output.append(File(full))
-            elif self.get("list_dirs") and os.path.isdir(full):
-                self._output.append(File(full))
-            if os.path.isdir(full) and self.get("recursive"):
-                self._search(full)
+                is_dir = entry.is_dir()
+                emit = (list_files and entry.is_file()) or (list_dirs and is_dir)
+                recurse = recursive and is_dir
+                if emit or recurse:
+                    result.append((entry.path, emit, recurse))
+        return result
 
-    def _do_execute(self):
+    def _scan_incremental(self, dir):
         """
-        Performs the actual execution.
+        Scans the specified directory in incremental mode, applying the filters. Only files
+        that differ from the snapshot get emitted. The record of the directory for the new
+        snapshot only contains a changed file once it has been output, see _commit.
 
-        :return: None if successful, otherwise error message
-        :rtype: str
+        :param dir: the directory to scan
+        :type dir: str
+        :return: the list of (path, emit, recurse) tuples for the relevant entries
+        :rtype: list
         """
-        self._search(self.get("dir"))
-        return None
+        opts = self._opts
+        pattern = opts.pattern
+        recursive = opts.recursive
+        old = self._snapshot.get(dir)
+        mtime = os.stat(dir).st_mtime_ns
+        if opts.skip_unchanged_dirs and (old is not None) and (old["mtime"] == mtime):
+            if self.is_debug:
+                self.log("Unchanged dir: %s" % dir)
+            # only the files of this directory are known to be unchanged, the sub-directories get scanned as usual
+            with self._snapshot_lock:
+                self._scanned[dir] = old
+            return [(path, False, True) for path in old["dirs"]]
+        old_files = dict() if (old is None) else old["files"]
+        record = {"mtime": mtime, "files": dict(), "dirs": []}
+        changed = dict()
+        result = []
+        with os.scandir(dir) as it:
+            for entry in it:
+                if (pattern is not None) and (pattern.search(entry.name) is None):
+                    continue
+                if entry.is_dir():
+                    if recursive:
+                        record["dirs"].append(entry.path)
+                        result.append((entry.path, False, True))
+                elif entry.is_file():
+                    stat = entry.stat()
+                    state = (stat.st_size, stat.st_mtime_ns)
+                    if old_files.get(entry.name) == state:
+                        record["files"][entry.name] = state
+                    else:
+                        changed[entry.path] = (record, entry.name, state)
+                        result.append((entry.path, True, False))
+        with self._snapshot_lock:
+            self._scanned[dir] = record
+            self._changed.update(changed)
+        return result
+
+    def _commit(self, path):
+        """
+        Records the file that is being output as processed in the new snapshot.
+
+        :param path: the file that is being output
+        :type path: str
+        """
+        with self._snapshot_lock:
+            change = self._changed.pop(path, None)
+        if change is not None:
+            record, name, state = change
+            record["files"][name] = state
+
+    def _walk_root(self, executor):
+        """
+        Walks the directory tree, starting from the top-level directory.
+
+        :param executor: the executor for scanning sub-directories, None for scanning in the calling thread
+        :type executor: ThreadPoolExecutor
+        :return: the generator for the located files/dirs
+        """
+        yield from self._walk(self._scan(self._opts.dir), executor)
+        self._walk_completed = not self.is_stopped
+
+    def _read_ahead(self, queued, pending, executor):
+        """
+        Submits the queued sub-directories for scanning, as long as the number of scans
+        in flight is below the limit.
+
+        :param queued: the sub-directories that have not been submitted yet, in walk order
+        :type queued: deque
+        :param pending: the submitted sub-directories (path -> future)
+        :type pending: dict
+        :param executor: the executor for scanning sub-directories
+        :type executor: ThreadPoolExecutor
+        """
+        while (len(queued) > 0) and (self._in_flight < self._max_in_flight):
+            path = queued.popleft()
+            pending[path] = executor.submit(self._scan, path)
+            self._in_flight += 1
+
+    def _walk(self, entries, executor):
+        """
+        Walks the scanned entries depth-first. When using an executor, the sub-directories
+        get scanned ahead in the background while the entries are being consumed, with the
+        number of scans in flight across the whole walk being bounded (see READ_AHEAD_PER_THREAD).
+
+        :param entries: the scanned entries, see _scan
+        :type entries: list
+        :param executor: the executor for scanning sub-directories, None for scanning in the calling thread
+        :type executor: ThreadPoolExecutor
+        :return: the generator for the located files/dirs
+        """
+        queued = deque()
+        pending = dict()
+        if executor is not None:
+            queued.extend([path for path, _, recurse in entries if recurse])
+        try:
+            for path, emit, recurse in entries:
+                if self.is_stopped:
+                    break
+                if executor is not None:
+                    self._read_ahead(queued, pending, executor)
+                if emit:
+                    yield File(path)
+                if recurse:
+                    future = pending.pop(path, None)
+                    if future is not None:
+                        self._in_flight -= 1
+                        sub_entries = future.result()
+                    else:
+                        # no capacity left for scanning this one ahead
+                        if (len(queued) > 0) and (queued[0] == path):
+                            queued.popleft()
+                        sub_entries = self._scan(path)
+                    yield from self._walk(sub_entries, executor)
+        finally:
+            for future in pending.values():
+                future.cancel()
+            self._in_flight -= len(pending)
+
+    def _generate(self):
+        """
+        Generates the items to output.
+
+        :return: the generator for the items
+        """
+        opts = self._opts
+        max_items = opts.max_items
+        incremental = opts.incremental
+        if incremental:
+            self._scanned = dict()
+            self._changed = dict()
+        self._walk_completed = False
+        executor = None
+        self._in_flight = 0
+        self._max_in_flight = opts.num_threads * READ_AHEAD_PER_THREAD
+        if opts.num_threads > 1:
+            executor = ThreadPoolExecutor(max_workers=opts.num_threads, thread_name_prefix="shallowflow-dirlister")
+        items = None
+        try:
+            items = self._walk_root(executor)
+            if opts.sort:
+                if max_items > 0:
+                    selected = heapq.nsmallest(max_items, items)
+                else:
+                    selected = sorted(items)
+            elif max_items > 0:
+                selected = itertools.islice(items, max_items)
+            else:
+                selected = items
+            for item in selected:
+                if incremental:
+                    self._commit(item)
+                yield item
+        finally:
+            if items is not None:
+                items.close()
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+            if incremental:
+                self._update_snapshot()
+
+    def _update_snapshot(self):
+        """
+        Turns the records of the directories scanned during the last walk into the new snapshot.
+        If the walk did not complete, the records get merged into the previous snapshot instead.
+        """
+        with self._snapshot_lock:
+            if self._walk_completed:
+                self._snapshot = self._scanned
+            else:
+                self._snapshot = dict(self._snapshot)
+                self._snapshot.update(self._scanned)
+            self._snapshot_modified = True
+            self._scanned = None
+            self._changed = None
+
+    def wrap_up(self):
+        """
+        For finishing up the execution.
+        Does not affect graphical output.
+        """
+        super().wrap_up()
+        if self._snapshot_modified:
+            msg = self._save_snapshot()
+            if msg is not None:
+                self.log(msg)
@@ -0,0 +1,200 @@
+import os
+import re
+import time
+from coed.config import Option
+from shallowflow.api.io import Directory, File
+from shallowflow.base.options import snapshot_options
+from ._AbstractStreamingListOutputSource import AbstractStreamingListOutputSource
+
+# the maximum number of seconds to sleep before checking whether the execution was stopped
+SLEEP_SLICE = 0.05
+
+
+class DirectoryWatcher(AbstractStreamingListOutputSource):
+    """
+    Monitors a directory and outputs files once they are complete.
+    """
+
+    def description(self):
+        """
+        Returns a description for the actor.
+
+        :return: the actor description
+        :rtype: str
+        """
+        return "Monitors a directory and outputs new or modified files as soon as their size and "\
+               + "modification time no longer change between two polls. "\
+               + "The polling interval doubles (up to the maximum) while nothing changes and drops "\
+               + "back to the minimum as soon as changes are detected. "\
+               + "Keeps running until the flow gets stopped or the timeout has been reached."
+
+    def _define_options(self):
+        """
+        For configuring the options.
+        """
+        super()._define_options()
+        self._option_manager.add(Option(name="dir", value_type=Directory, def_value=Directory("."),
+                                        help="The directory to monitor"))
+        self._option_manager.add(Option(name="regexp", value_type=str, def_value="",
+                                        help="The regular expression that the files must match, ignored if empty string"))
+        self._option_manager.add(Option(name="recursive", value_type=bool, def_value=False,
+                                        help="If enabled, sub-directories get monitored as well"))
+        self._option_manager.add(Option(name="emit_existing", value_type=bool, def_value=False,
+                                        help="If enabled, the files already present at startup get output as well"))
+        self._option_manager.add(Option(name="min_interval", value_type=float, def_value=0.5,
+                                        help="The minimum number of seconds between polls"))
+        self._option_manager.add(Option(name="max_interval", value_type=float, def_value=10.0,
+                                        help="The maximum number of seconds between polls"))
+        self._option_manager.add(Option(name="timeout", value_type=float, def_value=-1.0,
+                                        help="The number of seconds without any files being output after which to stop monitoring, ignored if <=0"))
+
+    def _initialize(self):
+        """
+        Initializes the members.
+        """
+        super()._initialize()
+        self._opts = None
+
+    def _get_item_type(self):
+        """
+        Returns the type of the individual items that get generated, when not outputting a list.
+
+        :return: the type that gets generated
+        """
+        return File
+
+    def _is_streaming(self):
+        """
+        Returns whether the items get generated on demand.
+
+        :return: always True
+        :rtype: bool
+        """
+        return True
+
+    def setup(self):
+        """
+        Prepares the actor for use.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        result = super().setup()
+        if result is None:
+            if self.get("output_as_list"):
+                result = "Cannot output the files as list!"
+            elif not os.path.exists(self.get("dir")):
+                result = "Directory does not exist: %s" % self.get("dir")
+            elif not os.path.isdir(self.get("dir")):
+                result = "Does not point to a directory: %s" % self.get("dir")
+            elif self.get("min_interval") <= 0:
+                result = "Minimum interval must be greater than 0: %f" % self.get("min_interval")
+            elif self.get("max_interval") < self.get("min_interval"):
+                result = "Maximum interval must be at least the minimum interval: %f < %f" \
+                         % (self.get("max_interval"), self.get("min_interval"))
+        if result is None:
+            pattern = None
+            if len(self.get("regexp")) > 0:
+                try:
+                    pattern = re.compile(self.get("regexp"))
+                except re.error as e:
+                    result = "Invalid regular expression '%s': %s" % (self.get("regexp"), str(e))
+            if result is None:
+                self._opts = snapshot_options(self, dir=str(self.get("dir")), pattern=pattern)
+        return result
+
+    def _poll(self, dir, states):
+        """
+        Records size and modification time of all the matching files.
+
+        :param dir: the directory to scan
+        :type dir: str
+        :param states: for storing the states (path -> (size, mtime))
+        :type states: dict
+        """
+        opts = self._opts
+        try:
+            with os.scandir(dir) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir():
+                            if opts.recursive:
+                                self._poll(entry.path, states)
+                        elif entry.is_file():
+                            if (opts.pattern is not None) and (opts.pattern.search(entry.name) is None):
+                                continue
+                            stat = entry.stat()
+                            states[entry.path] = (stat.st_size, stat.st_mtime_ns)
+                    except FileNotFoundError:
+                        # removed in the meantime
+                        pass
+        except FileNotFoundError:
+            if self.is_debug:
+                self.log("Dir disappeared: %s" % dir)
+
+    def _sleep(self, seconds):
+        """
+        Waits for the specified number of seconds or until the execution gets stopped.
+
+        :param seconds: the number of seconds to wait
+        :type seconds: float
+        """
+        end = time.monotonic() + seconds
+        while not self.is_stopped:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, SLEEP_SLICE))
+
+    def _generate(self):
+        """
+        Generates the items to output.
+
+        :return: the generator for the items
+        """
+        opts = self._opts
+        dir = opts.dir
+        min_interval = opts.min_interval
+        max_interval = opts.max_interval
+        timeout = opts.timeout
+        emitted = dict()
+        previous = dict()
+        self._poll(dir, previous)
+        if not opts.emit_existing:
+            emitted.update(previous)
+            if self.is_debug:
+                self.log("Ignoring %d existing file(s)" % len(emitted))
+        interval = min_interval
+        last_output = time.monotonic()
+        while not self.is_stopped:
+            self._sleep(interval)
+            if self.is_stopped:
+                break
+            current = dict()
+            self._poll(dir, current)
+            changes = False
+            ready = []
+            for path, state in current.items():
+                if emitted.get(path) == state:
+                    continue
+                changes = True
+                # only complete once size and modification time are stable across two polls
+                if previous.get(path) == state:
+                    ready.append(path)
+            for path in ready:
+                emitted[path] = current[path]
+            for path in list(emitted.keys()):
+                if path not in current:
+                    del emitted[path]
+            previous = current
+            if changes:
+                interval = min_interval
+            else:
+                interval = min(interval * 2, max_interval)
+            for path in sorted(ready):
+                last_output = time.monotonic()
+                yield File(path)
+            if (timeout > 0) and (time.monotonic() - last_output >= timeout):
+                if self.is_debug:
+                    self.log("Timeout reached: %f" % timeout)
+                break
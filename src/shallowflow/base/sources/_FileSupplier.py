@@ -1,9 +1,9 @@
-from shallowflow.api.source import AbstractListOutputSource
 from coed.config import Option
 from shallowflow.api.io import File
+from ._AbstractStreamingListOutputSource import AbstractStreamingListOutputSource
 
 
-class FileSupplier(AbstractListOutputSource):
+class FileSupplier(AbstractStreamingListOutputSource):
     """
     Outputs the specified files.
     """
@@ -33,12 +33,11 @@ class FileSupplier(AbstractListOutputSource):
         """
         return File
 
-    def _do_execute(self):
+    def _generate(self):
         """
-        Performs the actual execution.
+        Generates the items to output.
 
-        :return: None if successful, otherwise error message
-        :rtype: str
+        :return: the generator for the items
         """
-        self._output.extend(self.get("files"))
-        return None
+        for f in self.get("files"):
+            yield f
@@ -1,8 +1,8 @@
-from shallowflow.api.source import AbstractListOutputSource
 from coed.config import Option
+from ._AbstractStreamingListOutputSource import AbstractStreamingListOutputSource
 
 
-class ForLoop(AbstractListOutputSource):
+class ForLoop(AbstractStreamingListOutputSource):
     """
     Outputs an integer from the specified range.
     """
@@ -49,17 +49,15 @@ class ForLoop(AbstractListOutputSource):
                 result = "End value (%s) must be smaller than start (%d)!" % (self.get("end"), self.get("start"))
         return result
 
-    def _do_execute(self):
+    def _generate(self):
         """
-        Performs the actual execution.
+        Generates the items to output.
 
-        :return: None if successful, otherwise error message
-        :rtype: str
+        :return: the generator for the items
         """
         i = self.get("start")
         step = self.get("step")
         end = self.get("end")
         while i <= end:
-            self._output.append(i)
+            yield i
             i += step
-        return None
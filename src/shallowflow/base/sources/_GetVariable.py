@@ -2,6 +2,7 @@ from shallowflow.api.source import AbstractSimpleSource
 from coed.config import Option
 from coed.vars import VariableName
 from shallowflow.api.compatibility import Unknown
+from shallowflow.base.variables import TypedVariables
 
 
 class GetVariable(AbstractSimpleSource):
@@ -25,6 +26,8 @@ class GetVariable(AbstractSimpleSource):
         super()._define_options()
         self._option_manager.add(Option(name="var_name", value_type=VariableName, def_value=VariableName("var"),
                                         help="The name of the variable"))
+        self._option_manager.add(Option(name="as_string", value_type=bool, def_value=False,
+                                        help="Whether to output the string representation of the value rather than the value itself (typed variables only)"))
 
     def generates(self):
         """
@@ -58,7 +61,10 @@ class GetVariable(AbstractSimpleSource):
         result = None
         name = self.get("var_name")
         if self.variables.has(name):
-            self._output.append(self.variables.get(name))
+            if self.get("as_string") and isinstance(self.variables, TypedVariables):
+                self._output.append(self.variables.get_string(name))
+            else:
+                self._output.append(self.variables.get(name))
         else:
             result = "Variable not available: %s" % name
         return result
@@ -1,5 +1,7 @@
+from ._AbstractStreamingListOutputSource import AbstractStreamingListOutputSource
 from ._CallableSource import CallableSource
 from ._DirectoryLister import DirectoryLister
+from ._DirectoryWatcher import DirectoryWatcher
 from ._FileSupplier import FileSupplier
 from ._ForLoop import ForLoop
 from ._GetStorage import GetStorage
@@ -2,9 +2,10 @@ import os
 from shallowflow.api.actor import Actor
 from coed.config import Option
 from coed.vars import VariableName
+from shallowflow.base.variables import ExpandsVariables, variable_changed, compile_template
 
 
-class SetVariable(Actor):
+class SetVariable(Actor, ExpandsVariables):
     """
     Stores the specified value under the specified name.
     """
@@ -34,6 +35,16 @@ class SetVariable(Actor):
         self._option_manager.add(Option(name="expand", value_type=bool, def_value=False,
                                         help="Whether to expand any variables in the value."))
 
+    @property
+    def expanded_options(self):
+        """
+        Returns the names of the options whose variables get expanded at execution time.
+
+        :return: the option names
+        :rtype: list
+        """
+        return ["var_value"]
+
     def setup(self):
         """
         Prepares the actor for use.
@@ -67,10 +78,11 @@ class SetVariable(Actor):
 
         if result is None:
             if self.get("expand"):
-                value = self.variables.expand(value)
+                value = compile_template(value).render(self.variables)
                 if self.is_debug:
                     self.log("'%s' expanded to '%s'" % (self.get("var_value"), value))
             name = self.get("var_name")
             self.variables.set(name, value)
+            result = variable_changed(self, name)
 
         return result
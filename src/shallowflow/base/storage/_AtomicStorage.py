@@ -0,0 +1,40 @@
+class AtomicStorage(object):
+    """
+    Mixin for storages that offer atomic read-modify-write operations on their items,
+    e.g., for actors that increment counters from multiple threads.
+    """
+
+    def update(self, key, func, default=None):
+        """
+        Atomically replaces the storage item with the result of the function applied to its current value.
+
+        :param key: the name of the storage item
+        :type key: str
+        :param func: the function that takes the current value and returns the new one
+        :param default: the value to pass to the function if the item is not present
+        :return: the new value
+        """
+        raise NotImplementedError()
+
+    def increment(self, key, amount=1, default=0):
+        """
+        Atomically increments the storage item.
+
+        :param key: the name of the storage item
+        :type key: str
+        :param amount: the amount to increment by
+        :param default: the value to start from if the item is not present
+        :return: the new value
+        """
+        return self.update(key, lambda x: x + amount, default=default)
+
+    def setdefault(self, key, value):
+        """
+        Atomically sets the storage item if not present yet.
+
+        :param key: the name of the storage item
+        :type key: str
+        :param value: the value to store if not present
+        :return: the value of the storage item
+        """
+        raise NotImplementedError()
@@ -0,0 +1,133 @@
+import threading
+from shallowflow.api.storage import Storage
+from ._AtomicStorage import AtomicStorage
+
+# the default number of shards (each with its own lock)
+DEFAULT_NUM_SHARDS = 16
+
+
+class ShardedStorage(Storage, AtomicStorage):
+    """
+    Thread-safe storage that distributes the items across shards, each guarded by its own lock.
+    Reads do not lock, modifications only lock the shard of the item. Offers atomic
+    read-modify-write operations (increment, update, setdefault).
+    """
+
+    def __init__(self, num_shards=DEFAULT_NUM_SHARDS):
+        """
+        Initializes the storage.
+
+        :param num_shards: the number of shards to use
+        :type num_shards: int
+        """
+        super().__init__()
+        if num_shards < 1:
+            num_shards = 1
+        self._shards = [dict() for _ in range(num_shards)]
+        self._locks = [threading.Lock() for _ in range(num_shards)]
+
+    def _index(self, key):
+        """
+        Returns the index of the shard for the key.
+
+        :param key: the name of the storage item
+        :type key: str
+        :return: the index
+        :rtype: int
+        """
+        return hash(key) % len(self._shards)
+
+    def has(self, key):
+        """
+        Checks whether the storage item is present.
+
+        :param key: the name of the storage item
+        :type key: str
+        :return: True if present
+        :rtype: bool
+        """
+        return key in self._shards[self._index(key)]
+
+    def get(self, key):
+        """
+        Returns the storage item.
+
+        :param key: the name of the storage item
+        :type key: str
+        :return: the value, None if not present
+        """
+        return self._shards[self._index(key)].get(key)
+
+    def set(self, key, value):
+        """
+        Sets the storage item.
+
+        :param key: the name of the storage item
+        :type key: str
+        :param value: the value to store
+        """
+        index = self._index(key)
+        with self._locks[index]:
+            self._shards[index][key] = value
+
+    def remove(self, key):
+        """
+        Removes the storage item, if present.
+
+        :param key: the name of the storage item
+        :type key: str
+        """
+        index = self._index(key)
+        with self._locks[index]:
+            self._shards[index].pop(key, None)
+
+    def clear(self):
+        """
+        Removes all storage items.
+        """
+        for index in range(len(self._shards)):
+            with self._locks[index]:
+                self._shards[index].clear()
+
+    def keys(self):
+        """
+        Returns the names of all the storage items.
+
+        :return: the names
+        :rtype: list
+        """
+        result = []
+        for index in range(len(self._shards)):
+            with self._locks[index]:
+                result.extend(self._shards[index].keys())
+        return result
+
+    def update(self, key, func, default=None):
+        """
+        Atomically replaces the storage item with the result of the function applied to its current value.
+
+        :param key: the name of the storage item
+        :type key: str
+        :param func: the function that takes the current value and returns the new one
+        :param default: the value to pass to the function if the item is not present
+        :return: the new value
+        """
+        index = self._index(key)
+        with self._locks[index]:
+            shard = self._shards[index]
+            value = func(shard.get(key, default))
+            shard[key] = value
+        return value
+
+    def setdefault(self, key, value):
+        """
+        Atomically sets the storage item if not present yet.
+
+        :param key: the name of the storage item
+        :type key: str
+        :param value: the value to store if not present
+        :return: the value of the storage item
+        """
+        index = self._index(key)
+        with self._locks[index]:
+            return self._shards[index].setdefault(key, value)
@@ -0,0 +1,277 @@
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from shallowflow.api.storage import Storage
+from shallowflow.base.memory import estimate_size
+from ._AtomicStorage import AtomicStorage
+
+
+class SpillStorage(Storage, AtomicStorage):
+    """
+    Thread-safe storage with a memory budget. Once the (estimated) size of the items held
+    in memory exceeds the budget, the least recently used items get pickled to disk and
+    get loaded again transparently when accessed. Items that cannot be pickled stay in memory.
+    """
+
+    def __init__(self, max_memory, spill_dir=None):
+        """
+        Initializes the storage.
+
+        :param max_memory: the maximum number of bytes (estimated) to keep in memory
+        :type max_memory: int
+        :param spill_dir: the directory to pickle the items to, uses a temporary directory if None
+        :type spill_dir: str
+        """
+        super().__init__()
+        self._max_memory = max_memory
+        self._spill_dir = spill_dir
+        self._own_spill_dir = False
+        self._lock = threading.RLock()
+        self._memory = OrderedDict()
+        self._sizes = dict()
+        self._memory_bytes = 0
+        self._disk = dict()
+        self._counter = 0
+        self._hits = 0
+        self._misses = 0
+        self._spills = 0
+
+    @property
+    def max_memory(self):
+        """
+        Returns the memory budget.
+
+        :return: the maximum number of bytes
+        :rtype: int
+        """
+        return self._max_memory
+
+    @property
+    def statistics(self):
+        """
+        Returns statistics about the storage.
+
+        :return: the statistics (hits: accesses served from memory, misses: accesses that required
+                 loading from disk, spills: items written to disk, memory_bytes, memory_items, disk_items)
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "spills": self._spills,
+                "memory_bytes": self._memory_bytes,
+                "memory_items": len(self._memory),
+                "disk_items": len(self._disk),
+            }
+
+    def _get_spill_dir(self):
+        """
+        Returns the directory to pickle the items to, creates a temporary one if necessary.
+
+        :return: the directory
+        :rtype: str
+        """
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix="shallowflow-spill-")
+            self._own_spill_dir = True
+        elif not os.path.exists(self._spill_dir):
+            os.makedirs(self._spill_dir)
+        return self._spill_dir
+
+    def _discard(self, key):
+        """
+        Removes the item from memory and disk.
+
+        :param key: the name of the storage item
+        :type key: str
+        """
+        if key in self._memory:
+            del self._memory[key]
+            self._memory_bytes -= self._sizes.pop(key)
+        if key in self._disk:
+            try:
+                os.remove(self._disk.pop(key))
+            except OSError:
+                pass
+
+    def _spill(self, key):
+        """
+        Pickles the item held in memory to disk.
+
+        :param key: the name of the storage item
+        :type key: str
+        :return: True if successfully spilled
+        :rtype: bool
+        """
+        self._counter += 1
+        filename = os.path.join(self._get_spill_dir(), "%d.pkl" % self._counter)
+        try:
+            with open(filename, "wb") as fp:
+                pickle.dump(self._memory[key], fp, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            if os.path.exists(filename):
+                os.remove(filename)
+            return False
+        del self._memory[key]
+        self._memory_bytes -= self._sizes.pop(key)
+        self._disk[key] = filename
+        self._spills += 1
+        return True
+
+    def _evict(self, keep=None):
+        """
+        Spills the least recently used items to disk until the memory budget is met.
+
+        :param keep: the name of the storage item to keep in memory
+        :type keep: str
+        """
+        if self._max_memory <= 0:
+            return
+        for key in list(self._memory.keys()):
+            if self._memory_bytes <= self._max_memory:
+                break
+            if key != keep:
+                self._spill(key)
+
+    def _put(self, key, value, keep=False):
+        """
+        Stores the item in memory and evicts other items if necessary.
+
+        :param key: the name of the storage item
+        :type key: str
+        :param value: the value to store
+        :param keep: whether to keep the item itself in memory
+        :type keep: bool
+        """
+        self._discard(key)
+        self._memory[key] = value
+        self._sizes[key] = estimate_size(value)
+        self._memory_bytes += self._sizes[key]
+        self._evict(keep=key if keep else None)
+
+    def _load(self, key):
+        """
+        Returns the item, loading it from disk if necessary.
+
+        :param key: the name of the storage item
+        :type key: str
+        :return: the value, None if not present
+        """
+        if key in self._memory:
+            self._hits += 1
+            self._memory.move_to_end(key)
+            return self._memory[key]
+        if key in self._disk:
+            self._misses += 1
+            with open(self._disk[key], "rb") as fp:
+                value = pickle.load(fp)
+            self._put(key, value, keep=True)
+            return value
+        return None
+
+    def has(self, key):
+        """
+        Checks whether the storage item is present.
+
+        :param key: the name of the storage item
+        :type key: str
+        :return: True if present
+        :rtype: bool
+        """
+        with self._lock:
+            return (key in self._memory) or (key in self._disk)
+
+    def get(self, key):
+        """
+        Returns the storage item, loading it from disk if necessary.
+
+        :param key: the name of the storage item
+        :type key: str
+        :return: the value, None if not present
+        """
+        with self._lock:
+            return self._load(key)
+
+    def set(self, key, value):
+        """
+        Sets the storage item.
+
+        :param key: the name of the storage item
+        :type key: str
+        :param value: the value to store
+        """
+        with self._lock:
+            self._put(key, value)
+
+    def remove(self, key):
+        """
+        Removes the storage item, if present.
+
+        :param key: the name of the storage item
+        :type key: str
+        """
+        with self._lock:
+            self._discard(key)
+
+    def clear(self):
+        """
+        Removes all storage items.
+        """
+        with self._lock:
+            for key in self.keys():
+                self._discard(key)
+
+    def keys(self):
+        """
+        Returns the names of all the storage items.
+
+        :return: the names
+        :rtype: list
+        """
+        with self._lock:
+            return list(self._memory.keys()) + list(self._disk.keys())
+
+    def update(self, key, func, default=None):
+        """
+        Atomically replaces the storage item with the result of the function applied to its current value.
+
+        :param key: the name of the storage item
+        :type key: str
+        :param func: the function that takes the current value and returns the new one
+        :param default: the value to pass to the function if the item is not present
+        :return: the new value
+        """
+        with self._lock:
+            value = func(self._load(key) if self.has(key) else default)
+            self._put(key, value)
+        return value
+
+    def setdefault(self, key, value):
+        """
+        Atomically sets the storage item if not present yet.
+
+        :param key: the name of the storage item
+        :type key: str
+        :param value: the value to store if not present
+        :return: the value of the storage item
+        """
+        with self._lock:
+            if self.has(key):
+                return self._load(key)
+            self._put(key, value)
+            return value
+
+    def close(self):
+        """
+        Removes all storage items and the temporary spill directory, if any.
+        """
+        with self._lock:
+            self.clear()
+            if self._own_spill_dir and (self._spill_dir is not None):
+                shutil.rmtree(self._spill_dir, ignore_errors=True)
+                self._spill_dir = None
+                self._own_spill_dir = False
@@ -0,0 +1,3 @@
+from ._AtomicStorage import AtomicStorage
+from ._ShardedStorage import ShardedStorage
+from ._SpillStorage import SpillStorage
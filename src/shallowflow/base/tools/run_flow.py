@@ -4,6 +4,7 @@ import traceback
 from coed.vars import Variables
 from shallowflow.api.io import load_actor, get_reader_extensions
 from shallowflow.base.controls import run_flow
+from shallowflow.base.directors import start_profiling, stop_profiling, SORT_KEYS
 
 
 def main(args=None):
@@ -19,6 +20,10 @@ def main(args=None):
         formatter_class=argparse.ArgumentDefaultsHelpFormatter)
     parser.add_argument("-f", "--flow", metavar="FILE", help="the flow to execute, supported extensions: " + ", ".join(get_reader_extensions()), required=True)
     parser.add_argument("-v", "--variable", metavar="KEY=VALUE", nargs='+', default=None, help="For supplying variables to the flow.")
+    parser.add_argument("--profile", action="store_true", help="Whether to record the execution statistics of the actors and output them as table (times in milliseconds; the JSON/CSV files use seconds). Implied by --profile_json/--profile_csv. Pipelined stages, the worker threads of Prefetch/ParallelMap/Partition and worker processes do not get profiled.")
+    parser.add_argument("--profile_sort", choices=SORT_KEYS, default="wall_total", help="The statistic to sort the profile by.")
+    parser.add_argument("--profile_json", metavar="FILE", default=None, help="The JSON file to write the profile to, implies --profile.")
+    parser.add_argument("--profile_csv", metavar="FILE", default=None, help="The CSV file to write the profile to, implies --profile.")
     parsed = parser.parse_args(args=args)
 
     # any variables?
@@ -32,8 +37,26 @@ def main(args=None):
             else:
                 print("Invalid key=value pair: %s" % pair)
 
+    # writing the profile to a file implies profiling
+    profile = parsed.profile or (parsed.profile_json is not None) or (parsed.profile_csv is not None)
+
     flow = load_actor(parsed.flow)
-    run_flow(flow, variables=variables)
+    if profile:
+        start_profiling()
+    try:
+        run_flow(flow, variables=variables)
+    finally:
+        profiler = stop_profiling() if profile else None
+    if profiler is not None:
+        print(profiler.to_table(sort=parsed.profile_sort))
+        if parsed.profile_json is not None:
+            msg = profiler.save_json(parsed.profile_json, sort=parsed.profile_sort)
+            if msg is not None:
+                print(msg)
+        if parsed.profile_csv is not None:
+            msg = profiler.save_csv(parsed.profile_csv, sort=parsed.profile_sort)
+            if msg is not None:
+                print(msg)
 
 
 def sys_main() -> int:
@@ -0,0 +1,189 @@
+import time
+from coed.config import Option
+from shallowflow.api.transformer import AbstractSimpleTransformer
+from shallowflow.api.compatibility import Unknown
+from shallowflow.base.directors import Flushable
+from shallowflow.base.memory import estimate_size
+from shallowflow.base.options import snapshot_options
+
+STATE_BATCH = "batch"
+
+
+class Batch(AbstractSimpleTransformer, Flushable):
+    """
+    Groups the incoming data into lists, based on number of items, estimated size and/or time window.
+    """
+
+    def description(self):
+        """
+        Returns a description for the actor.
+
+        :return: the actor description
+        :rtype: str
+        """
+        return "Groups the incoming data into lists. A batch gets forwarded once it contains the maximum "\
+               + "number of items, once the estimated size of its items reaches the maximum number of bytes "\
+               + "or once a token arrives after the time window (measured from the first item of the batch) "\
+               + "has passed. Any incomplete batch gets forwarded once the end of the stream has been reached, "\
+               + "unless the flow has been stopped."
+
+    def _define_options(self):
+        """
+        For configuring the options.
+        """
+        super()._define_options()
+        self._option_manager.add(Option(name="max_items", value_type=int, def_value=100,
+                                        help="The maximum number of items per batch, ignored if <=0"))
+        self._option_manager.add(Option(name="max_bytes", value_type=int, def_value=-1,
+                                        help="The maximum (estimated) number of bytes per batch, ignored if <=0"))
+        self._option_manager.add(Option(name="max_wait", value_type=float, def_value=-1.0,
+                                        help="The time window in seconds after which to forward a batch, ignored if <=0"))
+
+    def _initialize(self):
+        """
+        Initializes the members.
+        """
+        super()._initialize()
+        self._opts = None
+        self._batch = []
+        self._batch_bytes = 0
+        self._batch_start = None
+
+    def reset(self):
+        """
+        Resets the state of the actor.
+        """
+        super().reset()
+        self._clear_batch()
+
+    def _clear_batch(self):
+        """
+        Starts a new batch.
+        """
+        self._batch = []
+        self._batch_bytes = 0
+        self._batch_start = None
+
+    def _backup_state(self):
+        """
+        For backing up the internal state before reconfiguring due to variable changes.
+
+        :return: the state dictionary
+        :rtype: dict
+        """
+        result = super()._backup_state()
+        if len(self._batch) > 0:
+            result[STATE_BATCH] = (self._batch, self._batch_bytes, self._batch_start)
+        return result
+
+    def _restore_state(self, state):
+        """
+        Restores the state from the state dictionary after being reconfigured due to variable changes.
+
+        :param state: the state dictionary to use
+        :type state: dict
+        """
+        if STATE_BATCH in state:
+            self._batch, self._batch_bytes, self._batch_start = state[STATE_BATCH]
+            del state[STATE_BATCH]
+        super()._restore_state(state)
+
+    def accepts(self):
+        """
+        Returns the types that are accepted.
+
+        :return: the list of types
+        :rtype: list
+        """
+        return [Unknown]
+
+    def generates(self):
+        """
+        Returns the types that get generated.
+
+        :return: the list of types
+        :rtype: list
+        """
+        return [list]
+
+    def setup(self):
+        """
+        Prepares the actor for use.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        result = super().setup()
+        if result is None:
+            if (self.get("max_items") <= 0) and (self.get("max_bytes") <= 0) and (self.get("max_wait") <= 0):
+                result = "At least one of max_items, max_bytes and max_wait must be >0!"
+        if result is None:
+            self._opts = snapshot_options(self)
+            self._clear_batch()
+        return result
+
+    def _forward_batch(self):
+        """
+        Forwards the current batch (if not empty) and starts a new one.
+        """
+        if len(self._batch) > 0:
+            self._output.append(self._batch)
+        self._clear_batch()
+
+    def _is_complete(self):
+        """
+        Returns whether the current batch is complete.
+
+        :return: True if complete
+        :rtype: bool
+        """
+        opts = self._opts
+        max_items = opts.max_items
+        if (max_items > 0) and (len(self._batch) >= max_items):
+            return True
+        max_bytes = opts.max_bytes
+        if (max_bytes > 0) and (self._batch_bytes >= max_bytes):
+            return True
+        max_wait = opts.max_wait
+        if (max_wait > 0) and (time.monotonic() - self._batch_start >= max_wait):
+            return True
+        return False
+
+    def _do_execute(self):
+        """
+        Performs the actual execution.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        if len(self._batch) == 0:
+            self._batch_start = time.monotonic()
+        self._batch.append(self._input)
+        if self._opts.max_bytes > 0:
+            self._batch_bytes += estimate_size(self._input)
+        if self._is_complete():
+            self._forward_batch()
+        return None
+
+    def flush(self):
+        """
+        Signals the end of the stream: forwards the incomplete batch, unless the flow has been stopped.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        if self.is_stopped:
+            self._clear_batch()
+        else:
+            self._forward_batch()
+        return None
+
+    def wrap_up(self):
+        """
+        For finishing up the execution.
+        Does not affect graphical output.
+        """
+        if (len(self._batch) > 0) and not self.is_stopped:
+            self.log("Discarding incomplete batch of %d item(s), the actor never got flushed!" % len(self._batch))
+        self._clear_batch()
+        super().wrap_up()
@@ -0,0 +1,174 @@
+from coed.config import Option
+from shallowflow.api.condition import AbstractBooleanCondition
+from shallowflow.api.transformer import AbstractSimpleTransformer
+from shallowflow.api.compatibility import Unknown
+from shallowflow.base.conditions import AlwaysTrue, compile_condition, evaluate_batch
+from shallowflow.base.directors import Flushable
+from shallowflow.base.options import snapshot_options
+
+STATE_BATCH = "batch"
+
+
+class Filter(AbstractSimpleTransformer, Flushable):
+    """
+    Only forwards the data that satisfies the boolean condition, optionally evaluating it on micro-batches.
+    """
+
+    def description(self):
+        """
+        Returns a description for the actor.
+
+        :return: the actor description
+        :rtype: str
+        """
+        return "Only forwards the data that satisfies the boolean condition. "\
+               + "With a batch size larger than 1, the incoming data gets accumulated and the condition "\
+               + "gets evaluated on the whole batch (if the condition supports it, e.g., NumExpr), "\
+               + "forwarding the data that satisfies the condition in the original order. "\
+               + "Since the variables are only evaluated once the batch is complete, "\
+               + "any changes to them in between do not affect the already accumulated data. "\
+               + "Any incomplete batch gets evaluated once the end of the stream has been reached."
+
+    def _define_options(self):
+        """
+        For configuring the options.
+        """
+        super()._define_options()
+        self._option_manager.add(Option(name="condition", value_type=AbstractBooleanCondition, def_value=AlwaysTrue(),
+                                        help="The boolean condition that the data must satisfy"))
+        self._option_manager.add(Option(name="batch_size", value_type=int, def_value=1, lower=1,
+                                        help="The number of tokens to accumulate before evaluating the condition"))
+
+    def _initialize(self):
+        """
+        Initializes the members.
+        """
+        super()._initialize()
+        self._opts = None
+        self._condition = None
+        self._batch = []
+
+    def reset(self):
+        """
+        Resets the state of the actor.
+        """
+        super().reset()
+        self._batch = []
+
+    def _backup_state(self):
+        """
+        For backing up the internal state before reconfiguring due to variable changes.
+
+        :return: the state dictionary
+        :rtype: dict
+        """
+        result = super()._backup_state()
+        if len(self._batch) > 0:
+            result[STATE_BATCH] = self._batch
+        return result
+
+    def _restore_state(self, state):
+        """
+        Restores the state from the state dictionary after being reconfigured due to variable changes.
+
+        :param state: the state dictionary to use
+        :type state: dict
+        """
+        if STATE_BATCH in state:
+            self._batch = state[STATE_BATCH]
+            del state[STATE_BATCH]
+        super()._restore_state(state)
+
+    def accepts(self):
+        """
+        Returns the types that are accepted.
+
+        :return: the list of types
+        :rtype: list
+        """
+        return [Unknown]
+
+    def generates(self):
+        """
+        Returns the types that get generated.
+
+        :return: the list of types
+        :rtype: list
+        """
+        return [Unknown]
+
+    def setup(self):
+        """
+        Prepares the actor for use.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        result = super().setup()
+        if result is None:
+            self.get("condition").flow_context = self
+            self._condition = compile_condition(self.get("condition"), self)
+            self._batch = []
+            self._opts = snapshot_options(self)
+        return result
+
+    def _evaluate_batch(self):
+        """
+        Evaluates the condition on the accumulated data and forwards the data that satisfies it.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        result = None
+        batch = self._batch
+        self._batch = []
+        try:
+            mask = evaluate_batch(self._opts.condition, batch, func=self._condition)
+            for item, keep in zip(batch, mask):
+                if keep:
+                    self._output.append(item)
+        except Exception:
+            result = self._handle_exception("Failed to evaluate condition on batch of %d item(s)!" % len(batch))
+        return result
+
+    def _do_execute(self):
+        """
+        Performs the actual execution.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        result = None
+        batch_size = self._opts.batch_size
+        if batch_size <= 1:
+            try:
+                if self._condition(self._input):
+                    self._output.append(self._input)
+            except Exception:
+                result = self._handle_exception("Failed to evaluate condition!")
+        else:
+            self._batch.append(self._input)
+            if len(self._batch) >= batch_size:
+                result = self._evaluate_batch()
+        return result
+
+    def flush(self):
+        """
+        Signals the end of the stream: evaluates the condition on the incomplete batch.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        if (len(self._batch) == 0) or self.is_stopped:
+            return None
+        return self._evaluate_batch()
+
+    def wrap_up(self):
+        """
+        For finishing up the execution.
+        Does not affect graphical output.
+        """
+        if (len(self._batch) > 0) and not self.is_stopped:
+            self.log("Discarding %d item(s) that were not evaluated, the actor never got flushed!" % len(self._batch))
+        self._batch = []
+        super().wrap_up()
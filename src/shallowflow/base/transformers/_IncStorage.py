@@ -2,6 +2,8 @@ from shallowflow.api.transformer import AbstractSimpleTransformer
 from coed.config import Option
 from shallowflow.api.storage import StorageUser, StorageName
 from shallowflow.api.compatibility import Unknown
+from shallowflow.base.options import snapshot_options
+from shallowflow.base.storage import AtomicStorage
 
 
 class IncStorage(AbstractSimpleTransformer, StorageUser):
@@ -28,6 +30,13 @@ class IncStorage(AbstractSimpleTransformer, StorageUser):
         self._option_manager.add(Option(name="inc_value", value_type=str, def_value="1",
                                         help="The value to increment the storage item by"))
 
+    def _initialize(self):
+        """
+        Initializes the members.
+        """
+        super()._initialize()
+        self._opts = None
+
     def accepts(self):
         """
         Returns the types that are accepted.
@@ -74,30 +83,54 @@ class IncStorage(AbstractSimpleTransformer, StorageUser):
                 result = "No storage name provided!"
             elif len(value) == 0:
                 result = "No increment value provided!"
+        if result is None:
+            self._opts = snapshot_options(self)
         return result
 
-    def _do_execute(self):
+    def _increment(self, value, inc):
         """
-        Performs the actual execution.
+        Increments the value.
 
-        :return: None if successful, otherwise error message
-        :rtype: str
+        :param value: the current value, None if not present
+        :param inc: the increment value
+        :type inc: str
+        :return: the new value
         """
-        inc = self.get("inc_value")
-        name = self.get("storage_name")
-        if self.storage_handler.storage.has(name):
-            value = self.storage_handler.storage.get(name)
-        else:
+        if value is None:
             try:
                 int(inc)
                 value = 0
             except Exception:
                 value = 0.0
         if isinstance(value, float):
-            value_new = value + float(inc)
+            return value + float(inc)
+        else:
+            return value + int(inc)
+
+    def _do_execute(self):
+        """
+        Performs the actual execution.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        opts = self._opts
+        inc = opts.inc_value
+        name = opts.storage_name
+        storage = self.storage_handler.storage
+        if isinstance(storage, AtomicStorage):
+            values = []
+
+            def _increment(current):
+                values.append(current)
+                return self._increment(current, inc)
+
+            value_new = storage.update(name, _increment, default=None)
+            value = values[-1]
         else:
-            value_new = value + int(inc)
-        self.storage_handler.storage.set(name, value_new)
+            value = storage.get(name) if storage.has(name) else None
+            value_new = self._increment(value, inc)
+            storage.set(name, value_new)
         if self.is_debug:
             self.log("Incremented storage: %s -> %s" % (str(value), str(value_new)))
         self._output.append(self._input)
@@ -2,6 +2,8 @@ from shallowflow.api.transformer import AbstractSimpleTransformer
 from coed.config import Option
 from coed.vars import VariableName
 from shallowflow.api.compatibility import Unknown
+from shallowflow.base.options import snapshot_options
+from shallowflow.base.variables import TypedVariables, variable_changed
 
 
 class IncVariable(AbstractSimpleTransformer):
@@ -30,6 +32,13 @@ class IncVariable(AbstractSimpleTransformer):
         self._option_manager.add(Option(name="is_float", value_type=bool, def_value=False,
                                         help="Whether to increment an integer or float variable"))
 
+    def _initialize(self):
+        """
+        Initializes the members.
+        """
+        super()._initialize()
+        self._opts = None
+
     def accepts(self):
         """
         Returns the types that are accepted.
@@ -73,6 +82,8 @@ class IncVariable(AbstractSimpleTransformer):
                     float(value)
                 except Exception:
                     result = "Increment value is not a float: %s" % value
+        if result is None:
+            self._opts = snapshot_options(self)
         return result
 
     def _do_execute(self):
@@ -82,9 +93,10 @@ class IncVariable(AbstractSimpleTransformer):
         :return: None if successful, otherwise error message
         :rtype: str
         """
-        inc = self.get("inc_value")
-        name = self.get("var_name")
-        is_float = self.get("is_float")
+        opts = self._opts
+        inc = opts.inc_value
+        name = opts.var_name
+        is_float = opts.is_float
         if self.variables.has(name):
             value = self.variables.get(name)
         else:
@@ -93,9 +105,11 @@ class IncVariable(AbstractSimpleTransformer):
             value_new = float(value) + float(inc)
         else:
             value_new = int(value) + int(inc)
-        value_new = str(value_new)
+        # typed variables store the number as is
+        if not isinstance(self.variables, TypedVariables):
+            value_new = str(value_new)
         self.variables.set(name, value_new)
         if self.is_debug:
             self.log("Incremented variable: %s -> %s" % (value, value_new))
         self._output.append(self._input)
-        return None
+        return variable_changed(self, name)
@@ -2,6 +2,7 @@ from shallowflow.api.transformer import AbstractSimpleTransformer
 from coed.config import Option
 from shallowflow.api.storage import StorageUser, StorageName
 from shallowflow.api.compatibility import Unknown
+from shallowflow.base.options import snapshot_options
 
 
 class SetStorage(AbstractSimpleTransformer, StorageUser):
@@ -26,6 +27,13 @@ class SetStorage(AbstractSimpleTransformer, StorageUser):
         self._option_manager.add(Option(name="storage_name", value_type=StorageName, def_value=StorageName("storage"),
                                         help="The name of the storage item"))
 
+    def _initialize(self):
+        """
+        Initializes the members.
+        """
+        super()._initialize()
+        self._opts = None
+
     def accepts(self):
         """
         Returns the types that are accepted.
@@ -68,6 +76,8 @@ class SetStorage(AbstractSimpleTransformer, StorageUser):
         if result is None:
             if len(self.get("storage_name")) == 0:
                 result = "No storage name provided!"
+        if result is None:
+            self._opts = snapshot_options(self)
         return result
 
     def _do_execute(self):
@@ -77,7 +87,7 @@ class SetStorage(AbstractSimpleTransformer, StorageUser):
         :return: None if successful, otherwise error message
         :rtype: str
         """
-        name = self.get("storage_name")
+        name = self._opts.storage_name
         value = self._input
         self.storage_handler.storage.set(name, value)
         self._output.append(self._input)
@@ -3,9 +3,11 @@ from coed.config import Option
 from coed.vars import VariableName
 from shallowflow.api.compatibility import Unknown
 import coed.serialization.vars as ser_vars
+from shallowflow.base.options import snapshot_options
+from shallowflow.base.variables import TypedVariables, ExpandsVariables, to_string, variable_changed, compile_template
 
 
-class SetVariable(AbstractSimpleTransformer):
+class SetVariable(AbstractSimpleTransformer, ExpandsVariables):
     """
     Stores the value coming through as variable under the specified name.
     """
@@ -31,6 +33,23 @@ class SetVariable(AbstractSimpleTransformer):
         self._option_manager.add(Option(name="expand", value_type=bool, def_value=False,
                                         help="Whether to expand any variables in the value."))
 
+    @property
+    def expanded_options(self):
+        """
+        Returns the names of the options whose variables get expanded at execution time.
+
+        :return: the option names
+        :rtype: list
+        """
+        return ["var_value"]
+
+    def _initialize(self):
+        """
+        Initializes the members.
+        """
+        super()._initialize()
+        self._opts = None
+
     def accepts(self):
         """
         Returns the types that are accepted.
@@ -60,6 +79,8 @@ class SetVariable(AbstractSimpleTransformer):
         if result is None:
             if len(self.get("var_name")) == 0:
                 result = "No variable name provided!"
+        if result is None:
+            self._opts = snapshot_options(self, template=compile_template(self.get("var_value")))
         return result
 
     def _do_execute(self):
@@ -69,22 +90,29 @@ class SetVariable(AbstractSimpleTransformer):
         :return: None if successful, otherwise error message
         :rtype: str
         """
-        value = self.get("var_value")
-        if self.get("expand"):
-            value = self.variables.expand(value)
+        opts = self._opts
+        if opts.expand:
+            value = opts.template.render(self.variables)
             if self.is_debug:
-                self.log("'%s' expanded to '%s'" % (self.get("var_value"), value))
-        name = self.get("var_name")
+                self.log("'%s' expanded to '%s'" % (opts.var_value, value))
+        else:
+            value = opts.var_value
+        name = opts.var_name
         if len(value) == 0:
             value = self._input
-        if ser_vars.has_string_writer(type(value)):
-            writer = ser_vars.get_string_writer(type(value))()
-            value_str = writer.convert(value)
+        if isinstance(self.variables, TypedVariables):
+            if self.is_debug:
+                self.log("%s -> %s" % (name, to_string(value)))
+            self.variables.set(name, value)
         else:
-            self.log("Failed to determine string conversion for type: %s" % str(type(value)))
-            value_str = str(value)
-        if self.is_debug:
-            self.log("%s -> %s" % (name, value_str))
-        self.variables.set(name, value_str)
+            if ser_vars.has_string_writer(type(value)):
+                writer = ser_vars.get_string_writer(type(value))()
+                value_str = writer.convert(value)
+            else:
+                self.log("Failed to determine string conversion for type: %s" % str(type(value)))
+                value_str = str(value)
+            if self.is_debug:
+                self.log("%s -> %s" % (name, value_str))
+            self.variables.set(name, value_str)
         self._output.append(self._input)
-        return None
+        return variable_changed(self, name)
@@ -0,0 +1,48 @@
+from shallowflow.api.transformer import AbstractSimpleTransformer
+from shallowflow.api.compatibility import Unknown
+
+
+class Unbatch(AbstractSimpleTransformer):
+    """
+    Forwards the items of the incoming lists, tuples or arrays one by one.
+    """
+
+    def description(self):
+        """
+        Returns a description for the actor.
+
+        :return: the actor description
+        :rtype: str
+        """
+        return "Forwards the items of the incoming lists, tuples or arrays one by one, e.g., as generated by Batch."
+
+    def accepts(self):
+        """
+        Returns the types that are accepted.
+
+        :return: the list of types
+        :rtype: list
+        """
+        return [list, tuple, Unknown]
+
+    def generates(self):
+        """
+        Returns the types that get generated.
+
+        :return: the list of types
+        :rtype: list
+        """
+        return [Unknown]
+
+    def _do_execute(self):
+        """
+        Performs the actual execution.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        try:
+            self._output.extend(self._input)
+        except TypeError:
+            return "Cannot iterate input data: %s" % str(type(self._input))
+        return None
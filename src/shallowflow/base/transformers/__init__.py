@@ -1,8 +1,11 @@
+from ._Batch import Batch
 from ._CallableTransformer import CallableTransformer
 from ._Convert import Convert
+from ._Filter import Filter
 from ._IncStorage import IncStorage
 from ._IncVariable import IncVariable
 from ._PassThrough import PassThrough
 from ._PickledFileReader import PickledFileReader
 from ._SetStorage import SetStorage
 from ._SetVariable import SetVariable
+from ._Unbatch import Unbatch
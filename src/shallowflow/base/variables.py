@@ -0,0 +1,493 @@
+import re
+import coed.serialization.vars as ser_vars
+from coed.config import AbstractOptionHandler, optionhandler_to_dict
+from coed.vars import Variables
+from shallowflow.api.control import ActorHandler
+from shallowflow.base.directors import invalidate_plan
+
+# the pattern for variable references
+VARIABLE_PATTERN = re.compile(r"@\{([^}]+)\}")
+
+# the types of native values whose string representation gets cached
+CACHEABLE_TYPES = (bool, int, float)
+
+
+def to_string(value):
+    """
+    Turns the native value into its string representation, using the string writers
+    of coed.serialization.vars if available.
+
+    :param value: the value to convert
+    :return: the string representation
+    :rtype: str
+    """
+    if isinstance(value, str):
+        return value
+    if ser_vars.has_string_writer(type(value)):
+        writer = ser_vars.get_string_writer(type(value))()
+        return writer.convert(value)
+    return str(value)
+
+
+class TypedVariables(Variables):
+    """
+    Variables that keep native Python values (e.g., ints or lists) as they are, rather than
+    turning them into strings when being set. The string representation only gets generated
+    when the variables get expanded in text (and is cached for immutable types).
+    String values behave the same as with regular variables.
+    """
+
+    def __init__(self):
+        """
+        Initializes the variables.
+        """
+        super().__init__()
+        self._strings = dict()
+
+    def set(self, key, value):
+        """
+        Sets the value of the variable, native values are stored as is.
+
+        :param key: the name of the variable
+        :type key: str
+        :param value: the value
+        """
+        self._strings.pop(key, None)
+        super().set(key, value)
+
+    def get_string(self, key, default=None):
+        """
+        Returns the string representation of the variable value.
+
+        :param key: the name of the variable
+        :type key: str
+        :param default: the value to return if the variable is not present
+        :return: the string representation, the default if not present
+        :rtype: str
+        """
+        if not self.has(key):
+            return default
+        value = self.get(key)
+        if isinstance(value, str):
+            return value
+        cached = self._strings.get(key)
+        if (cached is not None) and (cached[0] is value):
+            return cached[1]
+        result = to_string(value)
+        if isinstance(value, CACHEABLE_TYPES):
+            self._strings[key] = (value, result)
+        return result
+
+    def expand(self, s):
+        """
+        Expands the variables in the string in a single pass, i.e., variable references
+        inside the values do not get expanded. Unknown variables get handled as with
+        regular variables.
+
+        :param s: the string to expand
+        :type s: str
+        :return: the expanded string
+        :rtype: str
+        """
+        if "@{" not in s:
+            return s
+
+        def _replace(match):
+            key = match.group(1)
+            if self.has(key):
+                return self.get_string(key)
+            return super(TypedVariables, self).expand(match.group(0))
+
+        return VARIABLE_PATTERN.sub(_replace, s)
+
+
+# the maximum number of compiled templates to cache
+MAX_TEMPLATE_CACHE_SIZE = 1024
+
+# text -> ExpansionTemplate
+_templates = dict()
+
+
+class ExpansionTemplate(object):
+    """
+    Text with variable references, split into literal and variable segments once.
+    Rendering joins the segments with the current variable values and caches the result
+    until one of the referenced variables changes.
+    """
+
+    def __init__(self, text):
+        """
+        Parses the text.
+
+        :param text: the text with variable references
+        :type text: str
+        """
+        self.text = text
+        self.names = []
+        self._parts = []
+        self._slots = []
+        pos = 0
+        for match in VARIABLE_PATTERN.finditer(text):
+            if match.start() > pos:
+                self._parts.append(text[pos:match.start()])
+            name = match.group(1)
+            if name not in self.names:
+                self.names.append(name)
+            self._slots.append((len(self._parts), self.names.index(name)))
+            self._parts.append(match.group(0))
+            pos = match.end()
+        if pos < len(text):
+            self._parts.append(text[pos:])
+        self._cache = None
+
+    def render(self, variables):
+        """
+        Expands the variables in the text.
+
+        :param variables: the variables to use
+        :type variables: Variables
+        :return: the expanded text
+        :rtype: str
+        """
+        if len(self.names) == 0:
+            return self.text
+        typed = isinstance(variables, TypedVariables)
+        values = []
+        for name in self.names:
+            if not variables.has(name):
+                # leave the handling of unknown variables to the variables themselves
+                return variables.expand(self.text)
+            value = variables.get_string(name) if typed else variables.get(name)
+            if not isinstance(value, str):
+                value = to_string(value)
+            values.append(value)
+        values = tuple(values)
+        cache = self._cache
+        if (cache is not None) and (cache[0] == values):
+            return cache[1]
+        parts = list(self._parts)
+        for index, name_index in self._slots:
+            parts[index] = values[name_index]
+        result = "".join(parts)
+        self._cache = (values, result)
+        return result
+
+
+def compile_template(text):
+    """
+    Returns the expansion template for the text, using the cache.
+
+    :param text: the text with variable references
+    :type text: str
+    :return: the template
+    :rtype: ExpansionTemplate
+    """
+    result = _templates.get(text)
+    if result is None:
+        result = ExpansionTemplate(text)
+        if len(_templates) >= MAX_TEMPLATE_CACHE_SIZE:
+            _templates.clear()
+        _templates[text] = result
+    return result
+
+
+def find_variables(value):
+    """
+    Returns the names of the variables referenced in the value (string, or lists/tuples/dictionaries of strings).
+
+    :param value: the value to inspect
+    :return: the variable names
+    :rtype: set
+    """
+    result = set()
+    if isinstance(value, str):
+        result.update(VARIABLE_PATTERN.findall(value))
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            result.update(find_variables(item))
+    elif isinstance(value, dict):
+        for item in value.values():
+            result.update(find_variables(item))
+    return result
+
+
+class ExpandsVariables(object):
+    """
+    Mixin for option handlers that expand the variables in some of their options themselves
+    at execution time, i.e., these options do not require the handler to get re-applied
+    when the variables change.
+    """
+
+    @property
+    def expanded_options(self):
+        """
+        Returns the names of the options whose variables get expanded at execution time.
+
+        :return: the option names
+        :rtype: list
+        """
+        raise NotImplementedError()
+
+
+class ReappliesOptions(object):
+    """
+    Mixin for actor handlers that can refresh the state derived from some of their options
+    when variables referenced by these options change, without setting up their sub-actors again.
+    """
+
+    @property
+    def reapplied_options(self):
+        """
+        Returns the names of the options (besides the ones of all actors, see ACTOR_OPTIONS)
+        that get refreshed by reapply_options.
+
+        :return: the option names
+        :rtype: list
+        """
+        raise NotImplementedError()
+
+    def reapply_options(self):
+        """
+        Refreshes the state derived from the options after variables that they reference have changed.
+
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        raise NotImplementedError()
+
+
+# the options of all actors that do not require any state to be refreshed when re-applied
+ACTOR_OPTIONS = ["skip", "annotation", "name", "stop_flow_on_error"]
+
+
+def _find_value_variables(live, value):
+    """
+    Returns the names of the variables referenced by the serialized value of an option
+    (including nested option handlers like conditions).
+
+    :param live: the current value of the option, None if not available
+    :param value: the serialized value of the option
+    :return: the variable names
+    :rtype: set
+    """
+    result = set()
+    if isinstance(live, AbstractOptionHandler) and isinstance(value, dict) and ("options" in value):
+        for names in _find_option_variables(live, value["options"]).values():
+            result.update(names)
+    elif isinstance(live, list) and isinstance(value, list) and (len(live) == len(value)):
+        for live_item, item in zip(live, value):
+            result.update(_find_value_variables(live_item, item))
+    else:
+        result.update(find_variables(value))
+    return result
+
+
+def _find_option_variables(handler, options):
+    """
+    Returns the names of the variables referenced by the options of the handler (including
+    nested option handlers like conditions), skipping options that get expanded at execution time.
+
+    :param handler: the option handler to inspect
+    :type handler: AbstractOptionHandler
+    :param options: the serialized options of the handler
+    :type options: dict
+    :return: the option name -> variable names mapping, only options that reference variables
+    :rtype: dict
+    """
+    result = dict()
+    expanded = handler.expanded_options if isinstance(handler, ExpandsVariables) else []
+    for name in options:
+        if (name in expanded) or ((name == "actors") and isinstance(handler, ActorHandler)):
+            continue
+        live = handler.get(name) if handler.option_manager.has(name) else None
+        names = _find_value_variables(live, options[name])
+        if len(names) > 0:
+            result[name] = names
+    return result
+
+
+def reapply_variables(actor, options=None):
+    """
+    Reconfigures the actor after variables that it references have changed,
+    i.e., sets it up again while retaining its internal state. Actor handlers that
+    can refresh all of the affected options themselves (see ReappliesOptions) do
+    not get set up again, i.e., their sub-actors remain untouched.
+
+    :param actor: the actor to reconfigure
+    :type actor: Actor
+    :param options: the names of the options that reference the changed variables, None if unknown
+    :type options: list
+    :return: None if successful, otherwise error message
+    :rtype: str
+    """
+    if isinstance(actor, ReappliesOptions) and (options is not None) \
+            and all([(x in ACTOR_OPTIONS) or (x in actor.reapplied_options) for x in options]):
+        result = actor.reapply_options()
+    else:
+        state = actor._backup_state()
+        result = actor.setup()
+        actor._restore_state(state)
+    # the plan of the enclosing handler covers the skip flag and checks of the actor
+    if actor.parent is not None:
+        invalidate_plan(actor.parent)
+    return result
+
+
+class VariableIndex(object):
+    """
+    Maps variable names to the actors that reference them in their options (and need
+    re-applying when the variables change). Options that get expanded at execution time
+    (see ExpandsVariables) are not considered.
+    """
+
+    def __init__(self, actor):
+        """
+        Builds the index for the actor and all its sub-actors.
+
+        :param actor: the actor to index
+        :type actor: Actor
+        """
+        self._index = dict()
+        self._options = dict()
+        self._add(actor)
+
+    def _add(self, actor):
+        """
+        Adds the actor and its sub-actors to the index.
+
+        :param actor: the actor to add
+        :type actor: Actor
+        """
+        if not actor.is_skipped:
+            options = _find_option_variables(actor, optionhandler_to_dict(actor)["options"])
+            for option in options:
+                for name in options[option]:
+                    if name not in self._index:
+                        self._index[name] = []
+                    if actor not in self._index[name]:
+                        self._index[name].append(actor)
+                    key = (name, id(actor))
+                    if key not in self._options:
+                        self._options[key] = []
+                    self._options[key].append(option)
+        if isinstance(actor, ActorHandler):
+            for sub_actor in actor.actors:
+                self._add(sub_actor)
+
+    @property
+    def variables(self):
+        """
+        Returns the names of all the variables that are referenced.
+
+        :return: the variable names
+        :rtype: list
+        """
+        return list(self._index.keys())
+
+    def actors(self, name):
+        """
+        Returns the actors that reference the variable.
+
+        :param name: the name of the variable
+        :type name: str
+        :return: the actors
+        :rtype: list
+        """
+        return self._index.get(name, [])
+
+    def options(self, name, actor):
+        """
+        Returns the options of the actor that reference the variable.
+
+        :param name: the name of the variable
+        :type name: str
+        :param actor: the actor to get the options for
+        :type actor: Actor
+        :return: the option names
+        :rtype: list
+        """
+        return self._options.get((name, id(actor)), [])
+
+    def detach(self, variables):
+        """
+        Removes the indexed actors, i.e., the ones referencing variables, from the listeners
+        of the variables, as re-applying them when variables change is handled via the index.
+
+        :param variables: the variables to detach the actors from
+        :type variables: Variables
+        """
+        if not hasattr(variables, "remove_listener"):
+            return
+        detached = set()
+        for actors in self._index.values():
+            for actor in actors:
+                if id(actor) not in detached:
+                    detached.add(id(actor))
+                    variables.remove_listener(actor)
+
+    def reapply(self, name, source=None):
+        """
+        Re-applies the actors that reference the variable. The actor that changed
+        the variable and the actors enclosing it (i.e., currently executing) get skipped.
+
+        :param name: the name of the variable that changed
+        :type name: str
+        :param source: the actor that changed the variable
+        :type source: Actor
+        :return: None if successful, otherwise error message
+        :rtype: str
+        """
+        actors = self._index.get(name)
+        if actors is None:
+            return None
+        executing = set()
+        while source is not None:
+            executing.add(id(source))
+            source = source.parent
+        errors = []
+        for actor in actors:
+            if id(actor) in executing:
+                continue
+            msg = reapply_variables(actor, options=self.options(name, actor))
+            if msg is not None:
+                errors.append("Failed to re-apply variable '%s' to %s: %s" % (name, actor.full_name, msg))
+        if len(errors) > 0:
+            return "\n".join(errors)
+        return None
+
+
+class VariableIndexHandler(object):
+    """
+    Mixin for actors that maintain an index of the variables referenced by their sub-actors.
+    """
+
+    @property
+    def variable_index(self):
+        """
+        Returns the variable index.
+
+        :return: the index, None if not available
+        :rtype: VariableIndex
+        """
+        raise NotImplementedError()
+
+
+def variable_changed(actor, name):
+    """
+    Notifies the actors that reference the variable that it got changed by the specified actor,
+    using the variable index of the root actor (if available).
+
+    :param actor: the actor that changed the variable
+    :type actor: Actor
+    :param name: the name of the variable
+    :type name: str
+    :return: None if successful, otherwise error message
+    :rtype: str
+    """
+    root = actor.root
+    if not isinstance(root, VariableIndexHandler):
+        return None
+    index = root.variable_index
+    if index is None:
+        return None
+    return index.reapply(name, source=actor)
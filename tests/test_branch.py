@@ -0,0 +1,147 @@
+from coed.config import Option
+from shallowflow.api.compatibility import Unknown
+from shallowflow.api.sink import AbstractSimpleSink
+from shallowflow.base.controls import Flow, Branch, Sequence, Sleep, run_flow
+from shallowflow.base.sources import ForLoop
+
+
+class _Recorder(AbstractSimpleSink):
+    """
+    Records the tokens.
+    """
+
+    def _initialize(self):
+        super()._initialize()
+        self.tokens = []
+
+    def description(self):
+        return "Records the tokens."
+
+    def accepts(self):
+        return [Unknown]
+
+    def _do_execute(self):
+        self.tokens.append(self._input)
+        return None
+
+
+class _AppendToFile(AbstractSimpleSink):
+    """
+    Appends the tokens to a text file, one per line.
+    """
+
+    def description(self):
+        return "Appends the tokens to a file."
+
+    def _define_options(self):
+        super()._define_options()
+        self._option_manager.add(Option(name="path", value_type=str, def_value="",
+                                        help="The file to append the tokens to"))
+
+    def accepts(self):
+        return [Unknown]
+
+    def _do_execute(self):
+        with open(self.get("path"), "a") as fp:
+            fp.write("%s\n" % str(self._input))
+        return None
+
+
+class _FailOn(AbstractSimpleSink):
+    """
+    Fails when receiving the specified token.
+    """
+
+    def description(self):
+        return "Fails on a token."
+
+    def _define_options(self):
+        super()._define_options()
+        self._option_manager.add(Option(name="token", value_type=int, def_value=1,
+                                        help="The token to fail on"))
+
+    def accepts(self):
+        return [Unknown]
+
+    def _do_execute(self):
+        if self._input == self.get("token"):
+            return "Failed on token: %s" % str(self._input)
+        return None
+
+
+def _read_tokens(path):
+    with open(path) as fp:
+        return [int(x) for x in fp.read().split()]
+
+
+def test_process_branches_receive_tokens_in_order(tmp_path):
+    paths = [str(tmp_path / ("branch%d.txt" % i)) for i in range(3)]
+    flow = Flow().manage([
+        ForLoop(options={"end": 10}),
+        Branch(options={"use_processes": True}).manage([_AppendToFile(options={"path": x}) for x in paths]),
+    ])
+    assert run_flow(flow) is None
+    for path in paths:
+        assert _read_tokens(path) == list(range(1, 11))
+
+
+def test_process_branch_error_gets_propagated(tmp_path):
+    path = str(tmp_path / "branch.txt")
+    flow = Flow().manage([
+        ForLoop(options={"end": 5}),
+        Branch(options={"use_processes": True}).manage([
+            _AppendToFile(options={"path": path}),
+            _FailOn(options={"token": 3}),
+        ]),
+    ])
+    msg = run_flow(flow)
+    assert msg is not None
+    assert "Failed on token: 3" in msg
+    # the other branch is not affected by the error
+    assert _read_tokens(path) == list(range(1, 6))
+
+
+def test_threaded_branches_receive_tokens_in_order():
+    recorders = [_Recorder() for _ in range(3)]
+    flow = Flow().manage([
+        ForLoop(options={"end": 20}),
+        Branch(options={"num_threads": 3}).manage(recorders),
+    ])
+    assert run_flow(flow) is None
+    for recorder in recorders:
+        assert recorder.tokens == list(range(1, 21))
+
+
+def test_threaded_branch_fails_fast():
+    recorders = [_Recorder() for _ in range(2)]
+    flow = Flow().manage([
+        ForLoop(options={"end": 1}),
+        Branch(options={"num_threads": 2}).manage([
+            _FailOn(options={"token": 1}),
+            Sequence().manage([Sleep(options={"seconds": 0.2}), _Recorder()]),
+        ] + recorders),
+    ])
+    assert run_flow(flow) == "Failed to execute flow: Failed on token: 1"
+    # the queued up branches got discarded
+    for recorder in recorders:
+        assert recorder.tokens == []
+
+
+def test_branch_combines_errors():
+    for options in [{"num_threads": 3}, {"use_processes": True}]:
+        recorder = _Recorder()
+        flow = Flow().manage([
+            ForLoop(options={"end": 1}),
+            Branch(options=options).manage([
+                _FailOn(options={"name": "fail1", "token": 1, "stop_flow_on_error": False}),
+                _FailOn(options={"name": "fail2", "token": 1, "stop_flow_on_error": False}),
+                recorder,
+            ]),
+        ])
+        msg = run_flow(flow)
+        assert msg is not None
+        assert "2 branches failed:" in msg
+        assert "fail1: Failed on token: 1" in msg
+        assert "fail2: Failed on token: 1" in msg
+        if not options.get("use_processes", False):
+            assert recorder.tokens == [1]
@@ -0,0 +1,48 @@
+import threading
+from shallowflow.api.compatibility import Unknown
+from shallowflow.api.sink import AbstractSimpleSink
+from shallowflow.base.controls import Flow, Tee, run_flow
+from shallowflow.base.sinks import Null
+from shallowflow.base.sources import ForLoop
+
+
+class _Recorder(AbstractSimpleSink):
+    """
+    Records the tokens and the threads that they got processed in.
+    """
+
+    def _initialize(self):
+        super()._initialize()
+        self.tokens = []
+        self.threads = set()
+
+    def description(self):
+        return "Records the tokens."
+
+    def accepts(self):
+        return [Unknown]
+
+    def _do_execute(self):
+        self.tokens.append(self._input)
+        self.threads.add(threading.current_thread().name)
+        return None
+
+
+def test_pipelined_flow_preserves_order():
+    recorder = _Recorder()
+    flow = Flow(options={"pipelined": True, "queue_size": 2}).manage([ForLoop(options={"end": 50}), recorder])
+    assert run_flow(flow) is None
+    assert recorder.tokens == list(range(1, 51))
+    assert threading.current_thread().name not in recorder.threads
+
+
+def test_pipelined_tee_without_source_runs_on_calling_thread():
+    recorder = _Recorder()
+    flow = Flow().manage([
+        ForLoop(options={"end": 5}),
+        Tee(options={"pipelined": True}).manage([recorder]),
+        Null(),
+    ])
+    assert run_flow(flow) is None
+    assert recorder.tokens == [1, 2, 3, 4, 5]
+    assert recorder.threads == {threading.current_thread().name}
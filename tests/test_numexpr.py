@@ -0,0 +1,94 @@
+import numpy as np
+from coed.vars import Variables
+from shallowflow.base.conditions import NumExpr
+from shallowflow.base.conditions._NumExpr import compile_expression, to_operand
+
+
+def _variables(**values):
+    result = Variables()
+    for k in values:
+        result.set(k, values[k])
+    return result
+
+
+def test_compile_expression_is_cached():
+    assert compile_expression("@{a} > 1") is compile_expression("@{a} > 1")
+
+
+def test_variables_get_replaced_by_locals():
+    compiled = compile_expression("@{a} + @{b} > @{a}")
+    assert compiled.names == ["a", "b"]
+    assert len(compiled.locals) == 2
+    assert "@{" not in compiled.rewritten
+    assert compiled.compilable
+
+
+def test_evaluate_with_numeric_strings():
+    compiled = compile_expression("@{a} * 2 > @{b}")
+    assert compiled.evaluate(_variables(a="3", b="5"))
+    assert not compiled.evaluate(_variables(a="2", b="5"))
+
+
+def test_evaluate_with_native_values():
+    compiled = compile_expression("@{x} + 0.5 == 2.0")
+    assert compiled.evaluate(_variables(x=1.5))
+    assert not compiled.evaluate(_variables(x=1))
+
+
+def test_evaluate_without_variables():
+    assert compile_expression("1 + 1 == 2").evaluate(_variables())
+
+
+def test_evaluate_falls_back_for_non_numeric_or_missing_values():
+    compiled = compile_expression("@{a} > 1")
+    assert compiled.evaluate(_variables(a="abc")) is None
+    assert compiled.evaluate(_variables()) is None
+
+
+def test_variables_inside_string_literals_are_not_compilable():
+    compiled = compile_expression("'@{a}' == 'x'")
+    assert not compiled.compilable
+    assert compiled.evaluate(_variables(a="x")) is None
+
+
+def test_evaluate_with_array_operands():
+    compiled = compile_expression("x > @{t}")
+    mask = compiled.evaluate(_variables(t="2"), arrays={"x": (np.arange(5, dtype=np.int64), np.int64)})
+    assert mask.tolist() == [False, False, False, True, True]
+
+
+def test_to_operand():
+    assert to_operand("True")[1] is bool
+    assert to_operand(" 42 ")[1] is np.int64
+    assert to_operand("4.2")[1] is np.float64
+    assert to_operand("abc") is None
+
+
+def test_adjacent_variables_are_not_compilable():
+    for expression in ["@{a}@{b} > 5", "1@{a} == 11", "@{a}.5 > 1", "@{a}e3 > 10"]:
+        assert not compile_expression(expression).compilable, expression
+
+
+class _Context(object):
+
+    def __init__(self, variables):
+        self.variables = variables
+
+
+def _evaluate_condition(expression, **values):
+    condition = NumExpr(options={"expression": expression})
+    condition.flow_context = _Context(_variables(**values))
+    return condition.evaluate(None)
+
+
+def test_adjacent_variables_get_substituted_as_text():
+    assert _evaluate_condition("@{a}@{b} > 5", a="1", b="2")
+    assert _evaluate_condition("1@{a} == 11", a="1")
+    assert _evaluate_condition("@{a}.5 > 1", a="1")
+    assert _evaluate_condition("@{a}e3 > 10", a="1")
+
+
+def test_negative_values_get_substituted_as_text():
+    assert compile_expression("@{x}**2 == 4").evaluate(_variables(x="-2")) is None
+    assert not _evaluate_condition("@{x}**2 == 4", x="-2")
+    assert _evaluate_condition("@{x}**2 == -4", x="-2")
@@ -0,0 +1,34 @@
+import pytest
+from shallowflow.base.controls import Sleep
+from shallowflow.base.options import snapshot_options
+
+
+def test_snapshot_contains_option_values():
+    actor = Sleep(options={"seconds": 0.5})
+    opts = snapshot_options(actor)
+    assert opts.seconds == 0.5
+    assert opts.skip is False
+
+
+def test_snapshot_is_immutable():
+    opts = snapshot_options(Sleep())
+    with pytest.raises(AttributeError):
+        opts.seconds = 1.0
+
+
+def test_snapshot_does_not_follow_option_changes():
+    actor = Sleep(options={"seconds": 0.5})
+    opts = snapshot_options(actor)
+    actor.set("seconds", 1.0)
+    assert opts.seconds == 0.5
+    assert snapshot_options(actor).seconds == 1.0
+
+
+def test_derived_values_replace_option_values():
+    opts = snapshot_options(Sleep(options={"seconds": 0.5}), seconds=2.0, extra="x")
+    assert opts.seconds == 2.0
+    assert opts.extra == "x"
+
+
+def test_snapshot_types_get_reused():
+    assert type(snapshot_options(Sleep())) is type(snapshot_options(Sleep(options={"seconds": 1.0})))
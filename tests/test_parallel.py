@@ -0,0 +1,259 @@
+import time
+from shallowflow.api.compatibility import Unknown
+from shallowflow.api.sink import AbstractSimpleSink
+from shallowflow.api.storage import StorageUser
+from shallowflow.api.transformer import AbstractSimpleTransformer
+from shallowflow.base.controls import Flow, ParallelMap, Partition, Prefetch, ScatterGather, run_flow
+from shallowflow.base.sources import ForLoop
+from shallowflow.base.transformers import Batch, IncStorage, SetVariable
+
+
+class _Recorder(AbstractSimpleSink):
+    """
+    Records the tokens.
+    """
+
+    def _initialize(self):
+        super()._initialize()
+        self.tokens = []
+
+    def description(self):
+        return "Records the tokens."
+
+    def accepts(self):
+        return [Unknown]
+
+    def _do_execute(self):
+        self.tokens.append(self._input)
+        return None
+
+
+class _ReadVariable(AbstractSimpleTransformer):
+    """
+    Forwards the token together with the value of variable 'v', after waiting a bit.
+    """
+
+    def description(self):
+        return "Forwards token and variable."
+
+    def accepts(self):
+        return [Unknown]
+
+    def generates(self):
+        return [Unknown]
+
+    def _do_execute(self):
+        time.sleep(0.01)
+        self._output.append((self._input, str(self.variables.get("v"))))
+        return None
+
+
+class _SlowSquare(AbstractSimpleTransformer):
+    """
+    Squares the token, the smaller the token (modulo 5) the longer it takes.
+    """
+
+    def description(self):
+        return "Squares the token."
+
+    def accepts(self):
+        return [Unknown]
+
+    def generates(self):
+        return [Unknown]
+
+    def _do_execute(self):
+        time.sleep((5 - self._input % 5) * 0.01)
+        self._output.append(self._input * self._input)
+        return None
+
+
+class _FailOn(AbstractSimpleTransformer):
+    """
+    Forwards the tokens, fails on token 3.
+    """
+
+    def description(self):
+        return "Fails on token 3."
+
+    def accepts(self):
+        return [Unknown]
+
+    def generates(self):
+        return [Unknown]
+
+    def _do_execute(self):
+        if self._input == 3:
+            return "Failed on token: 3"
+        self._output.append(self._input)
+        return None
+
+
+class _DoubleChunk(AbstractSimpleTransformer):
+    """
+    Doubles the items of the chunk, the earlier the chunk the longer it takes. Fails on chunks containing 23.
+    """
+
+    def description(self):
+        return "Doubles the items."
+
+    def accepts(self):
+        return [Unknown]
+
+    def generates(self):
+        return [Unknown]
+
+    def _do_execute(self):
+        if 23 in self._input:
+            return "Failed on chunk: %s" % str(self._input)
+        time.sleep(0.1 / self._input[0])
+        self._output.append([x * 2 for x in self._input])
+        return None
+
+
+class _StorePairs(AbstractSimpleSink, StorageUser):
+    """
+    Appends the tokens to the list in storage item 'pairs'.
+    """
+
+    def description(self):
+        return "Stores the tokens."
+
+    def accepts(self):
+        return [Unknown]
+
+    def _do_execute(self):
+        storage = self.storage_handler.storage
+        if not storage.has("pairs"):
+            storage.set("pairs", [])
+        storage.get("pairs").append(self._input)
+        return None
+
+
+def _variable_flow(handler):
+    recorder = _Recorder()
+    flow = Flow().manage([
+        ForLoop(options={"end": 20}),
+        SetVariable(options={"var_name": "v"}),
+        handler.manage([_ReadVariable()]),
+        recorder,
+    ])
+    return flow, recorder
+
+
+def test_copies_use_variables_at_submission_time():
+    for handler in [Prefetch(options={"num_threads": 4, "max_tokens": 8}),
+                    ParallelMap(options={"num_threads": 4, "max_tokens": 8})]:
+        flow, recorder = _variable_flow(handler)
+        assert run_flow(flow) is None
+        assert recorder.tokens == [(i, str(i)) for i in range(1, 21)]
+
+
+def test_partition_replicas_use_variables_at_submission_time():
+    for use_processes in [False, True]:
+        flow = Flow().manage([
+            ForLoop(options={"end": 20}),
+            SetVariable(options={"var_name": "v"}),
+            Partition(options={"num_partitions": 3, "use_processes": use_processes}).manage([
+                _ReadVariable(),
+                _StorePairs(),
+            ]),
+        ])
+        assert run_flow(flow) is None
+        assert sorted(flow.storage.get("pairs")) == [(i, str(i)) for i in range(1, 21)]
+
+
+def test_parallel_map_output():
+    for options in [{}, {"use_processes": True}, {"unordered": True}, {"use_processes": True, "unordered": True}]:
+        options.update({"num_threads": 4, "max_tokens": 8})
+        recorder = _Recorder()
+        flow = Flow().manage([
+            ForLoop(options={"end": 12}),
+            ParallelMap(options=options).manage([_SlowSquare()]),
+            recorder,
+        ])
+        assert run_flow(flow) is None
+        if options.get("unordered", False):
+            assert sorted(recorder.tokens) == [i * i for i in range(1, 13)]
+        else:
+            assert recorder.tokens == [i * i for i in range(1, 13)]
+
+
+def test_parallel_map_error():
+    for use_processes in [False, True]:
+        recorder = _Recorder()
+        flow = Flow().manage([
+            ForLoop(options={"end": 5}),
+            ParallelMap(options={"num_threads": 2, "use_processes": use_processes}).manage([_FailOn()]),
+            recorder,
+        ])
+        msg = run_flow(flow)
+        assert msg is not None
+        assert "Failed on token: 3" in msg
+        assert 3 not in recorder.tokens
+
+
+def _scatter_gather_flow(options, end=20):
+    recorder = _Recorder()
+    flow = Flow().manage([
+        ForLoop(options={"end": end}),
+        Batch(options={"max_items": 10}),
+        ScatterGather(options=options).manage([_DoubleChunk()]),
+        recorder,
+    ])
+    return flow, recorder
+
+
+def test_scatter_gather_keeps_chunk_order():
+    for options in [{"num_threads": 4}, {"num_threads": 4, "chunk_size": 3}, {"num_threads": 1}]:
+        flow, recorder = _scatter_gather_flow(options)
+        assert run_flow(flow) is None
+        assert recorder.tokens == [[x * 2 for x in range(1, 11)], [x * 2 for x in range(11, 21)]]
+
+
+def test_scatter_gather_combine():
+    flow, recorder = _scatter_gather_flow({"num_threads": 4, "chunk_size": 3, "combine": "builtins.len"})
+    assert run_flow(flow) is None
+    assert recorder.tokens == [4, 4]
+
+
+def test_scatter_gather_error():
+    flow, recorder = _scatter_gather_flow({"num_threads": 4, "chunk_size": 3}, end=30)
+    msg = run_flow(flow)
+    assert msg is not None
+    assert "Failed on chunk: [21, 22, 23]" in msg
+    assert recorder.tokens == [[x * 2 for x in range(1, 11)], [x * 2 for x in range(11, 21)]]
+
+
+def test_partition_merges_storage_at_wrap_up():
+    for use_processes in [False, True]:
+        flow = Flow().manage([
+            ForLoop(options={"end": 40}),
+            Partition(options={"num_partitions": 4, "use_processes": use_processes}).manage([
+                IncStorage(options={"storage_name": "count"}),
+            ]),
+        ])
+        assert flow.setup() is None
+        flow.storage.set("count", 100)
+        assert flow.execute() is None
+        flow.wrap_up()
+        assert flow.storage.get("count") == 140
+        flow.clean_up()
+
+
+def test_partition_error():
+    for use_processes in [False, True]:
+        flow = Flow().manage([
+            ForLoop(options={"end": 5}),
+            Partition(options={"num_partitions": 2, "use_processes": use_processes}).manage([
+                _FailOn(),
+                _StorePairs(),
+            ]),
+        ])
+        assert flow.setup() is None
+        msg = flow.execute()
+        assert msg is not None
+        assert "Failed on token: 3" in msg
+        flow.wrap_up()
+        assert sorted(flow.storage.get("pairs")) == [1, 2, 4, 5]
+        flow.clean_up()
@@ -0,0 +1,72 @@
+import csv
+import json
+from shallowflow.base.directors import Profiler
+from shallowflow.base.directors._Profiler import COLUMNS
+
+
+class _Actor(object):
+
+    def __init__(self, full_name):
+        self.full_name = full_name
+
+
+def _profiler():
+    result = Profiler()
+    fast = _Actor("Flow.fast")
+    slow = _Actor("Flow.slow")
+    result.record(fast, 0.001, 0.001, has_input=True)
+    result.record(fast, 0.003, 0.002, has_input=True, failed=True)
+    result.record_output(fast)
+    result.record(slow, 0.5, 0.25)
+    return result
+
+
+def test_to_list_statistics():
+    rows = {x["actor"]: x for x in _profiler().to_list()}
+    fast = rows["Flow.fast"]
+    assert fast["count"] == 2
+    assert fast["tokens_in"] == 2
+    assert fast["tokens_out"] == 1
+    assert fast["errors"] == 1
+    assert abs(fast["wall_total"] - 0.004) < 1e-9
+    assert abs(fast["wall_mean"] - 0.002) < 1e-9
+    assert fast["wall_min"] == 0.001
+    assert fast["wall_max"] == 0.003
+    assert fast["cpu_max"] == 0.002
+    assert set(fast.keys()) == set(COLUMNS)
+
+
+def test_to_list_sorting():
+    profiler = _profiler()
+    assert [x["actor"] for x in profiler.to_list()] == ["Flow.slow", "Flow.fast"]
+    assert [x["actor"] for x in profiler.to_list(sort="count")] == ["Flow.fast", "Flow.slow"]
+    assert [x["actor"] for x in profiler.to_list(sort="actor")] == ["Flow.fast", "Flow.slow"]
+
+
+def test_reset():
+    profiler = _profiler()
+    profiler.reset()
+    assert profiler.to_list() == []
+
+
+def test_save_csv(tmp_path):
+    fname = str(tmp_path / "profile.csv")
+    assert _profiler().save_csv(fname) is None
+    with open(fname, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert list(rows[0].keys()) == COLUMNS
+    assert [x["actor"] for x in rows] == ["Flow.slow", "Flow.fast"]
+    assert int(rows[1]["count"]) == 2
+
+
+def test_save_json(tmp_path):
+    fname = str(tmp_path / "profile.json")
+    assert _profiler().save_json(fname, sort="actor") is None
+    with open(fname) as f:
+        rows = json.load(f)
+    assert [x["actor"] for x in rows] == ["Flow.fast", "Flow.slow"]
+
+
+def test_save_reports_errors(tmp_path):
+    fname = str(tmp_path / "missing" / "profile.csv")
+    assert _profiler().save_csv(fname) is not None
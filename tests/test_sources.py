@@ -0,0 +1,141 @@
+import os
+import threading
+import time
+from shallowflow.api.compatibility import Unknown
+from shallowflow.api.io import Directory, File
+from shallowflow.api.sink import AbstractSimpleSink
+from shallowflow.base.controls import Flow, run_flow
+from shallowflow.base.sources import DirectoryLister, DirectoryWatcher
+
+
+class _RecordSize(AbstractSimpleSink):
+    """
+    Records the files together with their size at the time they get received.
+    """
+
+    def _initialize(self):
+        super()._initialize()
+        self.files = []
+
+    def description(self):
+        return "Records the files and their size."
+
+    def accepts(self):
+        return [Unknown]
+
+    def _do_execute(self):
+        self.files.append((os.path.basename(self._input), os.path.getsize(self._input)))
+        return None
+
+
+class _Recorder(AbstractSimpleSink):
+    """
+    Records the tokens.
+    """
+
+    def _initialize(self):
+        super()._initialize()
+        self.tokens = []
+
+    def description(self):
+        return "Records the tokens."
+
+    def accepts(self):
+        return [Unknown]
+
+    def _do_execute(self):
+        self.tokens.append(self._input)
+        return None
+
+
+def _write(path, content):
+    with open(path, "w") as fp:
+        fp.write(content)
+
+
+def _list_incremental(dir, snapshot, skip_unchanged_dirs=False):
+    recorder = _Recorder()
+    flow = Flow().manage([
+        DirectoryLister(options={"dir": Directory(dir), "list_files": True, "recursive": True,
+                                 "incremental": True, "snapshot_file": File(snapshot),
+                                 "skip_unchanged_dirs": skip_unchanged_dirs}),
+        recorder,
+    ])
+    assert run_flow(flow) is None
+    return sorted([os.path.relpath(x, dir) for x in recorder.tokens])
+
+
+def test_directory_lister_incremental(tmp_path):
+    dir = str(tmp_path / "data")
+    snapshot = str(tmp_path / "snapshot.pkl")
+    os.makedirs(os.path.join(dir, "sub"))
+    _write(os.path.join(dir, "a.txt"), "a")
+    _write(os.path.join(dir, "b.txt"), "b")
+    _write(os.path.join(dir, "sub", "c.txt"), "c")
+    assert _list_incremental(dir, snapshot) == ["a.txt", "b.txt", os.path.join("sub", "c.txt")]
+    assert os.path.exists(snapshot)
+    assert _list_incremental(dir, snapshot) == []
+    _write(os.path.join(dir, "b.txt"), "bb")
+    _write(os.path.join(dir, "sub", "d.txt"), "d")
+    assert _list_incremental(dir, snapshot) == ["b.txt", os.path.join("sub", "d.txt")]
+    os.remove(os.path.join(dir, "a.txt"))
+    assert _list_incremental(dir, snapshot) == []
+    _write(os.path.join(dir, "a.txt"), "a")
+    assert _list_incremental(dir, snapshot) == ["a.txt"]
+
+
+def test_directory_lister_incremental_skips_unchanged_dirs(tmp_path):
+    dir = str(tmp_path / "data")
+    snapshot = str(tmp_path / "snapshot.pkl")
+    os.makedirs(os.path.join(dir, "sub"))
+    _write(os.path.join(dir, "a.txt"), "a")
+    assert _list_incremental(dir, snapshot, skip_unchanged_dirs=True) == ["a.txt"]
+    # sub-directories of unchanged directories still get checked
+    _write(os.path.join(dir, "sub", "b.txt"), "b")
+    assert _list_incremental(dir, snapshot, skip_unchanged_dirs=True) == [os.path.join("sub", "b.txt")]
+
+
+def _watch(dir, **options):
+    recorder = _RecordSize()
+    options.update({"dir": Directory(dir), "min_interval": 0.05, "max_interval": 0.2})
+    flow = Flow().manage([DirectoryWatcher(options=options), recorder])
+    start = time.monotonic()
+    assert run_flow(flow) is None
+    return recorder.files, time.monotonic() - start
+
+
+def test_directory_watcher_waits_for_stable_size(tmp_path):
+    dir = str(tmp_path)
+    _write(os.path.join(dir, "old.txt"), "old")
+
+    def write():
+        time.sleep(0.1)
+        with open(os.path.join(dir, "new.txt"), "w") as fp:
+            for _ in range(20):
+                fp.write("x")
+                fp.flush()
+                time.sleep(0.01)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    files, _ = _watch(dir, timeout=0.8)
+    writer.join()
+    # existing files get ignored, the new file only gets output once completely written
+    assert files == [("new.txt", 20)]
+
+
+def test_directory_watcher_emits_existing_files(tmp_path):
+    dir = str(tmp_path)
+    os.makedirs(os.path.join(dir, "sub"))
+    _write(os.path.join(dir, "a.txt"), "a")
+    _write(os.path.join(dir, "sub", "b.txt"), "bb")
+    files, _ = _watch(dir, timeout=0.3, emit_existing=True)
+    assert files == [("a.txt", 1)]
+    files, _ = _watch(dir, timeout=0.3, emit_existing=True, recursive=True)
+    assert sorted(files) == [("a.txt", 1), ("b.txt", 2)]
+
+
+def test_directory_watcher_timeout(tmp_path):
+    files, duration = _watch(str(tmp_path), timeout=0.3)
+    assert files == []
+    assert 0.3 <= duration < 2.0
@@ -0,0 +1,105 @@
+import os
+import threading
+from shallowflow.base.controls import Flow, Branch, Sequence
+from shallowflow.base.sources import ForLoop
+from shallowflow.base.storage import ShardedStorage, SpillStorage
+from shallowflow.base.transformers import IncStorage, SetStorage
+
+
+def test_sharded_storage_operations():
+    storage = ShardedStorage(num_shards=4)
+    for i in range(10):
+        storage.set("k%d" % i, i)
+    assert sorted(storage.keys()) == sorted(["k%d" % i for i in range(10)])
+    assert storage.has("k3")
+    assert storage.get("k3") == 3
+    assert not storage.has("missing")
+    assert storage.get("missing") is None
+    storage.remove("k3")
+    assert not storage.has("k3")
+    storage.clear()
+    assert list(storage.keys()) == []
+
+
+def test_sharded_storage_atomic_operations():
+    storage = ShardedStorage()
+    assert storage.setdefault("s", 1) == 1
+    assert storage.setdefault("s", 2) == 1
+    assert storage.update("u", lambda x: x + ["a"], default=[]) == ["a"]
+    assert storage.increment("f", amount=0.5, default=1.0) == 1.5
+
+    def work():
+        for _ in range(5000):
+            storage.increment("c")
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert storage.get("c") == 40000
+
+
+def test_inc_storage_in_parallel_branches():
+    flow = Flow().manage([
+        ForLoop(options={"end": 200}),
+        Branch(options={"num_threads": 4}).manage([
+            Sequence(options={"name": "b%d" % i}).manage([IncStorage(options={"storage_name": "n"})]) for i in range(8)
+        ]),
+    ])
+    assert flow.setup() is None
+    assert flow.execute() is None
+    assert flow.storage.get("n") == 1600
+    flow.wrap_up()
+    flow.clean_up()
+
+
+def test_spill_storage_spills_and_reloads(tmp_path):
+    storage = SpillStorage(3000, spill_dir=str(tmp_path))
+    for i in range(5):
+        storage.set("a%d" % i, bytes([i]) * 1000)
+    stats = storage.statistics
+    assert stats["memory_bytes"] <= 3000
+    assert stats["spills"] == 3
+    assert stats["disk_items"] == 3
+    assert len(os.listdir(str(tmp_path))) == 3
+    assert sorted(storage.keys()) == ["a%d" % i for i in range(5)]
+    # least recently used got spilled first
+    assert storage.get("a0") == bytes([0]) * 1000
+    assert storage.statistics["misses"] == 1
+    assert storage.get("a0") == bytes([0]) * 1000
+    assert storage.statistics["hits"] == 1
+    storage.remove("a1")
+    assert not storage.has("a1")
+    assert storage.get("a1") is None
+    storage.close()
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_spill_storage_keeps_unpicklable_items_in_memory():
+    storage = SpillStorage(100)
+    storage.set("func", lambda x: x)
+    storage.set("data", bytes(1000))
+    assert storage.get("func")(1) == 1
+    assert storage.increment("n") == 1
+    assert storage.increment("n", amount=2) == 3
+    assert storage.setdefault("n", 9) == 3
+    spill_dir = storage._spill_dir
+    assert os.path.exists(spill_dir)
+    storage.close()
+    assert not os.path.exists(spill_dir)
+
+
+def test_flow_with_storage_budget(tmp_path):
+    flow = Flow(options={"storage_max_memory": 100, "storage_spill_dir": str(tmp_path)}).manage([
+        ForLoop(options={"end": 5}),
+        IncStorage(options={"storage_name": "c"}),
+        SetStorage(options={"storage_name": "x"}),
+    ])
+    assert flow.setup() is None
+    assert isinstance(flow.storage, SpillStorage)
+    assert flow.execute() is None
+    assert flow.storage.get("c") == 5
+    assert flow.storage.get("x") == 5
+    flow.wrap_up()
+    flow.clean_up()
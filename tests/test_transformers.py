@@ -0,0 +1,35 @@
+from shallowflow.base.transformers import Batch, Filter
+from shallowflow.base.variables import reapply_variables
+
+
+def _feed(actor, tokens):
+    for token in tokens:
+        actor.input(token)
+        assert actor.execute() is None
+
+
+def _drain(actor):
+    result = []
+    while actor.has_output():
+        result.append(actor.output())
+    return result
+
+
+def test_filter_keeps_pending_batch_when_reapplied():
+    actor = Filter(options={"batch_size": 3})
+    assert actor.setup() is None
+    _feed(actor, [1, 2])
+    assert _drain(actor) == []
+    assert reapply_variables(actor) is None
+    assert actor.flush() is None
+    assert _drain(actor) == [1, 2]
+
+
+def test_batch_keeps_pending_batch_when_reapplied():
+    actor = Batch(options={"max_items": 3})
+    assert actor.setup() is None
+    _feed(actor, [1, 2])
+    assert _drain(actor) == []
+    assert reapply_variables(actor) is None
+    _feed(actor, [3])
+    assert _drain(actor) == [[1, 2, 3]]
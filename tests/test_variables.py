@@ -0,0 +1,149 @@
+from coed.vars import Variables
+from shallowflow.api.compatibility import Unknown
+from shallowflow.api.sink import AbstractSimpleSink
+from shallowflow.base.conditions import NumExpr
+from shallowflow.base.controls import Flow, ConditionalTee, run_flow
+from shallowflow.base.sinks import Null
+from shallowflow.base.sources import Start, ForLoop
+from shallowflow.base.transformers import Batch
+from shallowflow.base.variables import TypedVariables, ExpansionTemplate, compile_template, find_variables
+
+
+def test_typed_variables_keep_native_variables():
+    variables = TypedVariables()
+    variables.set("i", 1)
+    assert variables.get("i") == 1
+    assert variables.get_string("i") == "1"
+    assert variables.get_string("missing", "x") == "x"
+
+
+def test_typed_variables_expand_in_single_pass():
+    variables = TypedVariables()
+    variables.set("a", "@{b}")
+    variables.set("b", 2)
+    assert variables.expand("x@{a}y@{b}") == "x@{b}y2"
+
+
+def test_typed_variables_expand_without_variables():
+    assert TypedVariables().expand("plain text") == "plain text"
+
+
+def test_find_variables():
+    assert find_variables("@{a} and @{b}, again @{a}") == {"a", "b"}
+    assert find_variables(["@{a}", ("@{b}",), {"key": "@{c}"}]) == {"a", "b", "c"}
+    assert find_variables("no variables, @{unclosed") == set()
+    assert find_variables(42) == set()
+
+
+def _flow(condition):
+    sink = Null()
+    tee = ConditionalTee(options={"condition": condition}).manage([sink])
+    flow = Flow().manage([Start(), tee])
+    assert flow.setup() is None
+    return flow, tee, sink
+
+
+def test_variable_index_skips_expanded_options():
+    flow, tee, _ = _flow(NumExpr(options={"expression": "@{e} > 1", "token_name": "@{t}"}))
+    index = flow.variable_index
+    assert index.variables == ["t"]
+    assert index.actors("t") == [tee]
+    assert index.options("t", tee) == ["condition"]
+    assert index.actors("e") == []
+
+
+def test_reapply_does_not_set_up_sub_actors():
+    flow, tee, sink = _flow(NumExpr(options={"token_name": "@{t}"}))
+    calls = []
+    sink.setup = lambda: calls.append(sink)
+    compiled = tee._condition
+    assert flow.variable_index.reapply("t") is None
+    assert calls == []
+    assert tee._condition is not compiled
+
+
+def test_reapply_skips_executing_actors():
+    flow, tee, sink = _flow(NumExpr(options={"token_name": "@{t}"}))
+    compiled = tee._condition
+    assert flow.variable_index.reapply("t", source=sink) is None
+    assert tee._condition is compiled
+
+
+class _ListeningVariables(Variables):
+
+    def __init__(self):
+        super().__init__()
+        self.removed = []
+
+    def remove_listener(self, listener):
+        self.removed.append(listener)
+
+
+def test_variable_index_detaches_indexed_actors_only():
+    flow, tee, sink = _flow(NumExpr(options={"token_name": "@{t}"}))
+    variables = _ListeningVariables()
+    flow.update_variables(variables)
+    assert variables.removed == [tee]
+
+
+class _Recorder(AbstractSimpleSink):
+    """
+    Records the tokens.
+    """
+
+    def _initialize(self):
+        super()._initialize()
+        self.tokens = []
+
+    def description(self):
+        return "Records the tokens."
+
+    def accepts(self):
+        return [Unknown]
+
+    def _do_execute(self):
+        self.tokens.append(self._input)
+        return None
+
+
+def test_run_flow_variables_reach_setup():
+    batch = Batch(options={"max_items": "@{n}"})
+    sink = _Recorder()
+    flow = Flow().manage([ForLoop(options={"end": 4}), batch, sink])
+    assert run_flow(flow, variables=_variables(n="2")) is None
+    assert sink.tokens == [[1, 2], [3, 4]]
+
+
+def _variables(**values):
+    result = Variables()
+    for k in values:
+        result.set(k, values[k])
+    return result
+
+
+def test_expansion_template_renders_variables():
+    template = ExpansionTemplate("a=@{a}, b=@{b}, a=@{a}")
+    assert template.names == ["a", "b"]
+    assert template.render(_variables(a="1", b="2")) == "a=1, b=2, a=1"
+    assert template.render(_variables(a="3", b="2")) == "a=3, b=2, a=3"
+
+
+def test_expansion_template_without_variables():
+    template = ExpansionTemplate("plain text")
+    assert template.names == []
+    assert template.render(_variables()) == "plain text"
+
+
+def test_expansion_template_with_typed_variables():
+    variables = TypedVariables()
+    variables.set("i", 42)
+    assert ExpansionTemplate("i=@{i}").render(variables) == "i=42"
+
+
+def test_expansion_template_leaves_unknown_variables_to_variables():
+    variables = _variables(a="1")
+    assert ExpansionTemplate("@{a}/@{b}").render(variables) == variables.expand("@{a}/@{b}")
+
+
+def test_compile_template_is_cached():
+    assert compile_template("x=@{x}") is compile_template("x=@{x}")